@@ -0,0 +1,125 @@
+"""Run many prompts concurrently against one shared model client.
+
+Input is JSONL, one object per line with a "prompt" and an optional "id".
+Output is JSONL, one result record per prompt, written as sessions finish.
+"""
+import asyncio
+import json
+import time
+
+
+class RateLimiter:
+    """Async token bucket allowing `rate_per_minute` acquisitions per minute."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.interval = 60.0 / rate_per_minute
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.interval)
+
+
+class RateLimitedClient:
+    """`ModelClient` wrapper that waits on a `RateLimiter` before every request."""
+
+    def __init__(self, client, limiter):
+        self._client = client
+        self._limiter = limiter
+
+    async def generate_content(self, *, model, contents, config):
+        await self._limiter.acquire()
+        return await self._client.generate_content(model=model, contents=contents, config=config)
+
+    def __getattr__(self, name):
+        # Optional capabilities such as create_cached_content
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._client, name)
+
+
+def read_prompts(path):
+    """Return [(id, prompt)] from a JSONL file; ids default to the line number."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path}:{number}: invalid JSON ({exc})") from None
+            if isinstance(data, str):
+                data = {"prompt": data}
+            if not isinstance(data, dict) or not isinstance(data.get("prompt"), str):
+                raise ValueError(f'{path}:{number}: expected an object with a "prompt" string')
+            records.append((data.get("id", number), data["prompt"]))
+    return records
+
+
+def result_record(record_id, prompt, result):
+    """Build the JSON-serializable output record for one finished session."""
+    return {
+        "id": record_id,
+        "prompt": prompt,
+        "final_text": result.final_text,
+        "tool_calls": result.tool_calls,
+        "iterations": result.iterations,
+        "prompt_tokens": result.prompt_tokens,
+        "response_tokens": result.response_tokens,
+        "cached_tokens": result.cached_tokens,
+        "model_stats": result.model_stats,
+        "latency_s": round(result.elapsed, 3),
+        "error": result.error,
+    }
+
+
+async def run_batch(records, run_agent, client, output, concurrency=4, session_factory=None, **agent_kwargs):
+    """Run `records` ([(id, prompt)]) with at most `concurrency` live sessions.
+
+    `run_agent` is `main.run_agent`; every session shares `client`, and gets
+    its tool state from `session_factory()` when one is given. One JSON line
+    per prompt is written to the `output` file object as soon as its session
+    finishes. Returns the list of records in completion order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = []
+
+    async def one(record_id, prompt):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                kwargs = dict(agent_kwargs)
+                if session_factory is not None:
+                    kwargs["session"] = session_factory()
+                result = await run_agent(client, prompt, echo=_silent, **kwargs)
+                record = result_record(record_id, prompt, result)
+            except Exception as exc:
+                record = {
+                    "id": record_id,
+                    "prompt": prompt,
+                    "final_text": None,
+                    "latency_s": round(time.perf_counter() - started, 3),
+                    "error": str(exc),
+                }
+        output.write(json.dumps(record, default=str) + "\n")
+        output.flush()
+        finished.append(record)
+
+    await asyncio.gather(*(one(record_id, prompt) for record_id, prompt in records))
+    return finished
+
+
+def _silent(*args, **kwargs):
+    pass
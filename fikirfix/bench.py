@@ -0,0 +1,90 @@
+"""Offline benchmark of the agent loop over recorded cassettes.
+
+Each cassette is replayed through `main.run_agent`. Model time per iteration
+is taken from the cassette (the latency seen while recording); tool time is
+measured live as the gap between one model reply and the next request, which
+covers tool execution and loop overhead. Tools run against the working
+directory recorded in the cassette, in a throwaway copy of it made for each
+replay, so recorded edits never touch the real tree and every replay starts
+from the same files. A cassette without a working directory is refused,
+since its tool results could not be reproduced.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from fikirfix.cassette import ReplayModelClient
+from fikirfix.snapshot import create_snapshot
+from functions.session import ToolSession
+
+
+class TimedClient:
+    """`ModelClient` wrapper recording when each request started and ended."""
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = []
+
+    async def generate_content(self, *, model, contents, config):
+        started = time.perf_counter()
+        response = await self._client.generate_content(model=model, contents=contents, config=config)
+        self.calls.append((started, time.perf_counter(), response))
+        return response
+
+
+def _usage(response, name):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, name, None) or 0
+
+
+async def bench_cassette(path, run_agent, simulate_latency=False):
+    """Replay one cassette and return its per-iteration and total metrics."""
+    replay = ReplayModelClient(path, simulate_latency=simulate_latency)
+    working_directory = replay.working_directory
+    if not working_directory:
+        raise ValueError("cassette does not record its working directory; record it again with --record")
+    if not os.path.isdir(working_directory):
+        raise ValueError(f"recorded working directory not found: {working_directory}")
+    client = TimedClient(replay)
+    scratch = tempfile.mkdtemp(prefix="fikirfix-bench-")
+    try:
+        tree = os.path.join(scratch, os.path.basename(working_directory.rstrip(os.sep)) or "tree")
+        create_snapshot(working_directory, tree, mode="copy")
+        started = time.perf_counter()
+        result = await run_agent(
+            client,
+            replay.prompt or "",
+            session=ToolSession(working_directory=tree),
+            echo=lambda *args, **kwargs: None,
+        )
+        finished = time.perf_counter()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    iterations = []
+    for index, (call_start, call_end, response) in enumerate(client.calls):
+        next_start = client.calls[index + 1][0] if index + 1 < len(client.calls) else finished
+        iterations.append(
+            {
+                "iteration": index + 1,
+                "model_s": replay.entries[index].get("latency_s", 0.0),
+                "replay_s": call_end - call_start,
+                "tool_s": next_start - call_end,
+                "prompt_tokens": _usage(response, "prompt_token_count"),
+                "response_tokens": _usage(response, "candidates_token_count"),
+            }
+        )
+
+    return {
+        "cassette": str(path),
+        "working_directory": working_directory,
+        "iterations": iterations,
+        "model_s": sum(i["model_s"] for i in iterations),
+        "tool_s": sum(i["tool_s"] for i in iterations),
+        "prompt_tokens": sum(i["prompt_tokens"] for i in iterations),
+        "response_tokens": sum(i["response_tokens"] for i in iterations),
+        "wall_s": finished - started,
+        "unused_responses": len(replay.entries) - replay.calls,
+        "error": result.error,
+    }
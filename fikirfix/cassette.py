@@ -0,0 +1,102 @@
+"""Record model responses to a cassette file and replay them offline.
+
+A cassette is JSONL: a header line {"type": "session", "prompt",
+"working_directory", ...}
+followed by one {"type": "response", "model", "latency_s", "response"} line
+per `generate_content` call, in call order. Replaying a cassette feeds the
+same responses back to the agent loop, so a session can be re-run (and
+timed) deterministically without network access.
+"""
+import asyncio
+import json
+import os
+import time
+
+
+class RecordingModelClient:
+    """`ModelClient` wrapper that appends every response to a cassette.
+
+    `working_directory` is the tree the session's tools ran against; replays
+    need the same tree to get the same tool results.
+    """
+
+    def __init__(self, client, path, prompt=None, working_directory=None):
+        self._client = client
+        self.path = path
+        header = {
+            "type": "session",
+            "prompt": prompt,
+            "working_directory": os.path.abspath(working_directory) if working_directory else None,
+            "recorded_at": time.time(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+
+    async def generate_content(self, *, model, contents, config):
+        started = time.perf_counter()
+        response = await self._client.generate_content(model=model, contents=contents, config=config)
+        entry = {
+            "type": "response",
+            "model": model,
+            "latency_s": round(time.perf_counter() - started, 6),
+            "response": response.model_dump(mode="json", exclude_none=True),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return response
+
+    def __getattr__(self, name):
+        # Optional capabilities such as create_cached_content
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._client, name)
+
+
+def load_cassette(path):
+    """Return (header, response entries) from a cassette file."""
+    header = {}
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if data.get("type") == "session":
+                header = data
+            elif data.get("type") == "response":
+                entries.append(data)
+            else:
+                raise ValueError(f"{path}:{number}: unknown cassette entry")
+    return header, entries
+
+
+class ReplayModelClient:
+    """`ModelClient` that returns the responses stored in a cassette, in order.
+
+    With `simulate_latency`, each reply is delayed by its recorded latency.
+    """
+
+    def __init__(self, path, simulate_latency=False):
+        self.path = path
+        self.header, self.entries = load_cassette(path)
+        self.simulate_latency = simulate_latency
+        self.calls = 0
+
+    @property
+    def prompt(self):
+        return self.header.get("prompt")
+
+    @property
+    def working_directory(self):
+        return self.header.get("working_directory")
+
+    async def generate_content(self, *, model, contents, config):
+        from google.genai import types
+
+        if self.calls >= len(self.entries):
+            raise RuntimeError(f"cassette {self.path} has no response left for request {self.calls + 1}")
+        entry = self.entries[self.calls]
+        self.calls += 1
+        if self.simulate_latency:
+            await asyncio.sleep(entry.get("latency_s", 0))
+        return types.GenerateContentResponse.model_validate(entry["response"])
@@ -2,66 +2,494 @@ import os
 import sys
 from pathlib import Path
 import runpy
+import time
+from functools import lru_cache
+
 import typer
-from rich.console import Console
-from rich.panel import Panel
-from rich.text import Text
-from rich.table import Table
 
 from fikirfix import __version__
 
+# Heavy dependencies (rich, the model SDK, main.py) are imported inside the
+# commands that need them, so `fikirfix version` and friends start fast.
+
 app = typer.Typer(help="FikirFix — Agentic development helpers")
-console = Console()
+
+
+@lru_cache(maxsize=None)
+def _console():
+    from rich.console import Console
+
+    return Console()
 
 
 def _project_root() -> Path:
     return Path(__file__).resolve().parents[1]
 
 
+def _import_agent():
+    """Import the agent runtime (main.py lives next to the package, not in it)."""
+    root = str(_project_root())
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import main
+
+    return main
+
+
 @app.callback(invoke_without_command=True)
 def root(ctx: typer.Context):
     if ctx.invoked_subcommand is None:
-        console.print(Panel(Text("FikirFix — run `fikirfix --help` for commands", justify="center"), subtitle=f"v{__version__}"))
+        from rich.panel import Panel
+        from rich.text import Text
+
+        _console().print(Panel(Text("FikirFix — run `fikirfix --help` for commands", justify="center"), subtitle=f"v{__version__}"))
 
 
 @app.command()
-def run(prompt: str = typer.Argument(..., help="Prompt for the agent"), verbose: bool = typer.Option(False, "--verbose", help="Show verbose output")):
+def run(
+    prompt: str = typer.Argument(None, help="Prompt for the agent (optional with --resume)"),
+    verbose: bool = typer.Option(False, "--verbose", help="Show verbose output"),
+    context_budget: int = typer.Option(None, "--context-budget", help="Prompt tokens above which stale tool outputs are compacted"),
+    warm_pool: int = typer.Option(0, "--warm-pool", help="Pre-start this many interpreters for run_python_file"),
+    prefetch: int = typer.Option(0, "--prefetch", min=0, help="After a listing, read up to this many small files ahead into the cache"),
+    record: Path = typer.Option(None, "--record", help="Save every model response to this cassette file"),
+    trace: Path = typer.Option(None, "--trace", help="Write a span trace here (JSONL for *.jsonl, Chrome trace format otherwise)"),
+    resume: str = typer.Option(None, "--resume", help="Continue a logged session (id or log file) without re-running its tools"),
+    workdir: Path = typer.Option(None, "--workdir", help="Directory the agent's tools are confined to (default: calculator)"),
+    model: str = typer.Option(None, "--model", help="Model for every request, or for hard turns and the answer with --fast-model"),
+    fast_model: str = typer.Option(None, "--fast-model", help="Cheaper model used while the agent is only picking tools"),
+    escalate_after: int = typer.Option(None, "--escalate-after", min=0, help="Failing tool turns in a row before switching to --model (0: never)"),
+    deadline: float = typer.Option(None, "--deadline", help="Seconds allowed per model request attempt before retrying"),
+    hedge_after: float = typer.Option(None, "--hedge-after", help="Send a duplicate model request if none answered after this many seconds"),
+    server: bool = typer.Option(False, "--server", help="Run the session in a `fikirfix serve` daemon instead of this process"),
+    socket_path: Path = typer.Option(None, "--socket", help="Socket of the daemon used with --server (default: .fikirfix/fikirfix.sock)"),
+):
     """Run the LLM-backed agent with a prompt.
 
     Example: fikirfix run "fix the bug: 3 + 7 * 2 shouldn't be 20"
+
+    Every session is logged under .fikirfix/sessions/; pass its id to
+    --resume (with an optional follow-up prompt) to pick it up again.
     """
+    if server:
+        if record or trace or warm_pool or prefetch or deadline is not None or hedge_after is not None:
+            typer.echo(
+                "Error: --record, --trace, --warm-pool, --prefetch, --deadline and --hedge-after "
+                "are set on `fikirfix serve`, not with --server",
+                err=True,
+            )
+            raise typer.Exit(code=2)
+        _run_on_server(
+            socket_path,
+            {
+                "type": "run",
+                "prompt": prompt,
+                "working_directory": os.path.abspath(workdir) if workdir else None,
+                "verbose": verbose,
+                "resume": os.path.abspath(resume) if resume and os.path.isfile(resume) else resume,
+                "context_budget": context_budget,
+                "model": model,
+                "fast_model": fast_model,
+                "escalate_after": escalate_after,
+            },
+        )
+        return
     project_root = _project_root()
     main_path = project_root / "main.py"
     if not main_path.exists():
-        console.print("[bold red]Error:[/bold red] main.py not found in project root")
+        _console().print("[bold red]Error:[/bold red] main.py not found in project root")
+        raise typer.Exit(code=2)
+    if not prompt and not resume:
+        _console().print("[bold red]Error:[/bold red] a prompt is required unless --resume is given")
         raise typer.Exit(code=2)
 
-    console.rule("Running agent")
-    console.print(f"[bold]Prompt[/bold]: {prompt}")
-    sys.argv = [str(main_path), prompt]
+    _console().rule("Running agent")
+    if resume:
+        _console().print(f"[bold]Resuming[/bold]: {resume}")
+    if prompt:
+        _console().print(f"[bold]Prompt[/bold]: {prompt}")
+    sys.argv = [str(main_path)] + ([prompt] if prompt else [])
     if verbose:
         sys.argv.append("--verbose")
+    if context_budget is not None:
+        sys.argv += ["--context-budget", str(context_budget)]
+    if warm_pool:
+        sys.argv += ["--warm-pool", str(warm_pool)]
+    if prefetch:
+        sys.argv += ["--prefetch", str(prefetch)]
+    if record:
+        sys.argv += ["--record", str(record)]
+    if trace:
+        sys.argv += ["--trace", str(trace)]
+    if resume:
+        sys.argv += ["--resume", resume]
+    if workdir:
+        sys.argv += ["--workdir", str(workdir)]
+    if model:
+        sys.argv += ["--model", model]
+    if fast_model:
+        sys.argv += ["--fast-model", fast_model]
+    if escalate_after is not None:
+        sys.argv += ["--escalate-after", str(escalate_after)]
+    if deadline is not None:
+        sys.argv += ["--deadline", str(deadline)]
+    if hedge_after is not None:
+        sys.argv += ["--hedge-after", str(hedge_after)]
     try:
         runpy.run_path(str(main_path), run_name="__main__")
     except Exception as exc:
-        console.print(f"[red]Agent execution failed:[/red] {exc}")
+        _console().print(f"[red]Agent execution failed:[/red] {exc}")
         raise typer.Exit(code=3)
 
 
+def _run_on_server(socket_path, request):
+    from fikirfix.server import DEFAULT_SOCKET, request_session
+
+    socket_path = socket_path or DEFAULT_SOCKET
+    if not request["prompt"] and not request["resume"]:
+        typer.echo("Error: a prompt is required unless --resume is given", err=True)
+        raise typer.Exit(code=2)
+    try:
+        event = request_session(socket_path, request, on_echo=typer.echo)
+    except OSError as exc:
+        typer.echo(f"Error: cannot reach the server at {socket_path} ({exc}); start one with `fikirfix serve`", err=True)
+        raise typer.Exit(code=2)
+    if event.get("event") != "result":
+        typer.echo(f"Error: {event.get('message', event)}", err=True)
+        raise typer.Exit(code=3)
+    if event.get("error"):
+        typer.echo(f"Session saved; continue it with --resume {event['session_id']}")
+        raise typer.Exit(code=3)
+
+
+@app.command()
+def serve(
+    socket_path: Path = typer.Option(None, "--socket", help="Unix socket to listen on (default: .fikirfix/fikirfix.sock)"),
+    port: int = typer.Option(None, "--port", help="Also serve HTTP on this localhost port (POST /run, GET /status)"),
+    max_sessions: int = typer.Option(8, "--max-sessions", min=1, help="Sessions running at the same time"),
+    warm_pool: int = typer.Option(0, "--warm-pool", help="Pre-start this many interpreters shared by all sessions"),
+    prefetch: int = typer.Option(0, "--prefetch", min=0, help="After a listing, read up to this many small files ahead into the cache"),
+    deadline: float = typer.Option(None, "--deadline", help="Seconds allowed per model request attempt before retrying"),
+    hedge_after: float = typer.Option(None, "--hedge-after", help="Send a duplicate model request if none answered after this many seconds"),
+    allow_dir: list[Path] = typer.Option(None, "--allow-dir", help="Directory sessions may work in, with its subdirectories; repeatable (default: calculator)"),
+    token_file: Path = typer.Option(None, "--token-file", help="Where to write the HTTP bearer token (default: .fikirfix/server.token)"),
+):
+    """Keep the agent loaded and run sessions sent by `fikirfix run --server`.
+
+    The model client, prompt prefix cache, warm interpreters and each working
+    directory's caches and indexes stay alive between sessions. Sessions are
+    confined to the --allow-dir directories. HTTP requests need the token
+    from --token-file. Stop with Ctrl-C or SIGTERM.
+    """
+    import asyncio
+
+    from fikirfix.retry import DEFAULT_DEADLINE, ResilientClient
+    from fikirfix.server import DEFAULT_SOCKET, DEFAULT_TOKEN_FILE, AgentServer
+
+    agent = _import_agent()
+    client = agent.get_client()
+    if not client:
+        typer.echo("Error: GEMINI_API_KEY not found in environment", err=True)
+        raise typer.Exit(code=2)
+    client = ResilientClient(
+        client, deadline=deadline if deadline is not None else DEFAULT_DEADLINE, hedge_after=hedge_after
+    )
+    socket_path = str(socket_path or DEFAULT_SOCKET)
+    token_file = str(token_file or DEFAULT_TOKEN_FILE)
+
+    def ready(server, listeners):
+        where = [socket_path] + [f"http://127.0.0.1:{port}"] * (port is not None)
+        typer.echo(f"Serving on {' and '.join(where)} (pid {os.getpid()})", err=True)
+        typer.echo(f"Sessions allowed in: {', '.join(server.allowed_directories)}", err=True)
+        if port is not None:
+            typer.echo(f"HTTP bearer token written to {token_file}", err=True)
+
+    async def main():
+        server = AgentServer(
+            agent,
+            client,
+            warm_pool=warm_pool,
+            max_sessions=max_sessions,
+            prefetch=prefetch,
+            allowed_directories=[str(path) for path in allow_dir] if allow_dir else None,
+        )
+        await server.serve(socket_path=socket_path, port=port, ready=ready, token_file=token_file)
+
+    try:
+        asyncio.run(main())
+    except OSError as exc:
+        typer.echo(f"Error: {exc}", err=True)
+        raise typer.Exit(code=2)
+
+
+@app.command()
+def batch(
+    prompts_file: Path = typer.Argument(..., help='JSONL file with one {"id": ..., "prompt": ...} object per line'),
+    output: Path = typer.Option(None, "--output", "-o", help="Write JSONL results here instead of stdout"),
+    concurrency: int = typer.Option(4, "--concurrency", "-c", min=1, help="Sessions running at the same time"),
+    rpm: int = typer.Option(0, "--rpm", min=0, help="Model requests per minute across all sessions (0: unlimited)"),
+    context_budget: int = typer.Option(None, "--context-budget", help="Prompt tokens above which stale tool outputs are compacted"),
+    warm_pool: int = typer.Option(0, "--warm-pool", help="Pre-start this many interpreters shared by all sessions"),
+    workdir: Path = typer.Option(None, "--workdir", help="Directory the agent's tools are confined to (default: calculator)"),
+    model: str = typer.Option(None, "--model", help="Model for every request, or for hard turns and the answer with --fast-model"),
+    fast_model: str = typer.Option(None, "--fast-model", help="Cheaper model used while the agent is only picking tools"),
+    deadline: float = typer.Option(None, "--deadline", help="Seconds allowed per model request attempt before retrying"),
+    hedge_after: float = typer.Option(None, "--hedge-after", help="Send a duplicate model request if none answered after this many seconds"),
+):
+    """Run many prompts concurrently and write one JSONL result per prompt.
+
+    Example: fikirfix batch issues.jsonl -o results.jsonl -c 8 --rpm 120
+    """
+    import asyncio
+
+    from fikirfix.batch import RateLimiter, read_prompts, run_batch
+    from fikirfix.retry import DEFAULT_DEADLINE, ResilientClient
+
+    try:
+        records = read_prompts(prompts_file)
+    except (OSError, ValueError) as exc:
+        typer.echo(f"Error: {exc}", err=True)
+        raise typer.Exit(code=2)
+
+    agent = _import_agent()
+    client = agent.get_client()
+    if not client:
+        typer.echo("Error: GEMINI_API_KEY not found in environment", err=True)
+        raise typer.Exit(code=2)
+    # Retries and hedges are rate limited too; the deadline starts after the limiter
+    client = ResilientClient(
+        client,
+        deadline=deadline if deadline is not None else DEFAULT_DEADLINE,
+        hedge_after=hedge_after,
+        limiter=RateLimiter(rpm) if rpm else None,
+    )
+
+    pool = None
+    if warm_pool > 0 and agent.InterpreterPool.supported():
+        pool = agent.InterpreterPool(size=warm_pool).start()
+
+    kwargs = {}
+    if context_budget is not None:
+        kwargs["context_budget"] = context_budget
+    if model or fast_model:
+        from fikirfix.routing import make_policy
+
+        kwargs["routing"] = make_policy(model or agent.MODEL_NAME, fast_model=fast_model)
+
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    started = time.perf_counter()
+    try:
+        finished = asyncio.run(
+            run_batch(
+                records,
+                agent.run_agent,
+                client,
+                out,
+                concurrency=concurrency,
+                session_factory=lambda: agent.ToolSession(
+                    working_directory=str(workdir or agent.WORKING_DIRECTORY), interpreter_pool=pool
+                ),
+                **kwargs,
+            )
+        )
+    finally:
+        if output:
+            out.close()
+        if pool is not None:
+            pool.close()
+
+    errors = sum(1 for record in finished if record.get("error"))
+    typer.echo(
+        f"Completed {len(finished)} prompts ({errors} with errors) in {time.perf_counter() - started:.1f}s",
+        err=True,
+    )
+
+
+@app.command()
+def fanout(
+    prompt: str = typer.Argument(..., help="Prompt every attempt gets"),
+    attempts: int = typer.Option(3, "--attempts", "-n", min=1, help="Sessions to run in parallel"),
+    workdir: Path = typer.Option(None, "--workdir", help="Tree to snapshot for each attempt (default: calculator)"),
+    snapshot_mode: str = typer.Option("auto", "--snapshot-mode", help="auto (reflink, else copy), reflink, copy, or hardlink (read-only use)"),
+    into: Path = typer.Option(None, "--into", help="Directory for the snapshots (default: .fikirfix/fanout/ID)"),
+    check: str = typer.Option(None, "--check", help="Test file or directory (relative to the workdir) used to score attempts"),
+    apply: bool = typer.Option(False, "--apply", help="Copy the best attempt's changes back into the workdir"),
+    output: Path = typer.Option(None, "--output", "-o", help="Also write one JSON record per attempt here"),
+    context_budget: int = typer.Option(None, "--context-budget", help="Prompt tokens above which stale tool outputs are compacted"),
+    model: str = typer.Option(None, "--model", help="Model for every request, or for hard turns and the answer with --fast-model"),
+    fast_model: str = typer.Option(None, "--fast-model", help="Cheaper model used while the agent is only picking tools"),
+    deadline: float = typer.Option(None, "--deadline", help="Seconds allowed per model request attempt before retrying"),
+):
+    """Run several fix attempts at once, each on its own snapshot, and keep the best.
+
+    Example: fikirfix fanout "fix the bug: 3 + 7 * 2 shouldn't be 20" -n 4 --check tests.py --apply
+
+    Snapshots share unchanged files with the workdir where the filesystem can
+    reflink them, else are plain copies, and are kept for inspection; the
+    workdir itself only changes with --apply.
+    """
+    import asyncio
+    import json
+
+    from rich.table import Table
+
+    from fikirfix.fanout import best_attempt, run_fanout
+    from fikirfix.retry import DEFAULT_DEADLINE, ResilientClient
+    from fikirfix.session_log import new_session_id
+    from fikirfix.snapshot import MODES, apply_changes
+
+    if snapshot_mode not in MODES:
+        _console().print(f"[bold red]Error:[/bold red] --snapshot-mode must be one of {', '.join(MODES)}")
+        raise typer.Exit(code=2)
+    agent = _import_agent()
+    source = str(workdir or agent.WORKING_DIRECTORY)
+    if not os.path.isdir(source):
+        _console().print(f"[bold red]Error:[/bold red] working directory not found: {source}")
+        raise typer.Exit(code=2)
+    client = agent.get_client()
+    if not client:
+        typer.echo("Error: GEMINI_API_KEY not found in environment", err=True)
+        raise typer.Exit(code=2)
+    client = ResilientClient(client, deadline=deadline if deadline is not None else DEFAULT_DEADLINE)
+
+    kwargs = {}
+    if context_budget is not None:
+        kwargs["context_budget"] = context_budget
+    if model or fast_model:
+        from fikirfix.routing import make_policy
+
+        kwargs["routing"] = make_policy(model or agent.MODEL_NAME, fast_model=fast_model)
+
+    root = str(into or Path(".fikirfix", "fanout", new_session_id()))
+    _console().rule(f"Running {attempts} attempts")
+    records = asyncio.run(
+        run_fanout(
+            prompt,
+            agent.run_agent,
+            client,
+            source,
+            root,
+            attempts=attempts,
+            mode=snapshot_mode,
+            check=check,
+            **kwargs,
+        )
+    )
+    best = best_attempt(records)
+
+    table = Table(title=f"Attempts on {source} (snapshots in {root})")
+    for column in ("Attempt", "Snapshot", "Iter", "Prompt tok", "Changed", "Tests", "Error"):
+        table.add_column(column, justify="right" if column in ("Iter", "Prompt tok") else "left")
+    for record in records:
+        tests = record.get("tests") or {}
+        if "error" in tests:
+            tests_text = "not run"
+        else:
+            tests_text = ", ".join(f"{n} {outcome}" for outcome, n in tests.items() if n)
+        table.add_row(
+            f"{record['attempt']}{' *' if record is best else ''}",
+            record.get("snapshot_mode", "-"),
+            str(record.get("iterations", "-")),
+            str(record.get("prompt_tokens", "-")),
+            ", ".join(record.get("changed", []) + [f"-{path}" for path in record.get("deleted", [])]) or "-",
+            tests_text or "-",
+            record.get("error") or "",
+        )
+    _console().print(table)
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    if best is None:
+        _console().print("[bold red]Every attempt failed[/bold red]")
+        raise typer.Exit(code=1)
+    _console().print(f"Best: attempt {best['attempt']} ({best['snapshot']})")
+    if apply:
+        apply_changes(best["snapshot"], source, best["changed"], best["deleted"])
+        _console().print(f"Applied {len(best['changed'])} changed and {len(best['deleted'])} deleted files to {source}")
+
+
+@app.command()
+def bench(
+    cassettes: list[Path] = typer.Argument(..., help="Cassette files, or directories of *.jsonl cassettes"),
+    simulate_latency: bool = typer.Option(False, "--simulate-latency", help="Delay replies by their recorded latency"),
+    per_iteration: bool = typer.Option(False, "--per-iteration", help="Show a row for every iteration"),
+    json_out: Path = typer.Option(None, "--json", help="Also write the metrics to this JSON file"),
+):
+    """Replay recorded sessions offline and report where the time goes.
+
+    Record a cassette with: fikirfix run "prompt" --record session.jsonl
+    """
+    import asyncio
+    import json
+
+    from rich.table import Table
+
+    from fikirfix.bench import bench_cassette
+
+    paths = []
+    for path in cassettes:
+        paths += sorted(path.glob("*.jsonl")) if path.is_dir() else [path]
+    if not paths:
+        _console().print("[bold red]Error:[/bold red] no cassettes found")
+        raise typer.Exit(code=2)
+
+    agent = _import_agent()
+    reports = []
+    for path in paths:
+        try:
+            reports.append(asyncio.run(bench_cassette(path, agent.run_agent, simulate_latency=simulate_latency)))
+        except (OSError, ValueError) as exc:
+            _console().print(f"[bold red]Error:[/bold red] {path}: {exc}")
+            raise typer.Exit(code=2)
+
+    table = Table(title="Agent benchmark")
+    for column in ("Session", "Iter", "Model ms", "Tool ms", "Prompt tok", "Resp tok", "Wall ms"):
+        table.add_column(column, justify="left" if column == "Session" else "right")
+    for report in reports:
+        name = Path(report["cassette"]).name
+        if per_iteration:
+            for item in report["iterations"]:
+                table.add_row(
+                    name,
+                    str(item["iteration"]),
+                    f"{item['model_s'] * 1000:.1f}",
+                    f"{item['tool_s'] * 1000:.1f}",
+                    str(item["prompt_tokens"]),
+                    str(item["response_tokens"]),
+                    "",
+                )
+        table.add_row(
+            f"[bold]{name}[/bold]" + (f" [red]({report['error']})[/red]" if report["error"] else ""),
+            str(len(report["iterations"])),
+            f"{report['model_s'] * 1000:.1f}",
+            f"{report['tool_s'] * 1000:.1f}",
+            str(report["prompt_tokens"]),
+            str(report["response_tokens"]),
+            f"{report['wall_s'] * 1000:.1f}",
+        )
+    _console().print(table)
+
+    if json_out:
+        json_out.write_text(json.dumps(reports, indent=2))
+
+
 @app.command()
 def calc(expression: str = typer.Argument(..., help="Expression to evaluate, e.g. '3 + 7 * 2'")):
     """Evaluate an expression using the bundled `calculator` example."""
     project_root = _project_root()
     calc_main = project_root / "calculator" / "main.py"
     if not calc_main.exists():
-        console.print("[bold red]Error:[/bold red] calculator/main.py not found")
+        _console().print("[bold red]Error:[/bold red] calculator/main.py not found")
         raise typer.Exit(code=2)
-    console.rule("Calculator")
+    _console().rule("Calculator")
     sys.argv = [str(calc_main), expression]
     try:
         runpy.run_path(str(calc_main), run_name="__main__")
     except Exception as exc:
-        console.print(f"[red]Execution failed:[/red] {exc}")
+        _console().print(f"[red]Execution failed:[/red] {exc}")
         raise typer.Exit(code=3)
 
 
@@ -71,9 +499,11 @@ def inspect(path: str = typer.Argument(".", help="Path to list files from (relat
     project_root = _project_root()
     target = project_root / path
     if not target.exists():
-        console.print(f"[bold red]Path not found:[/bold red] {path}")
+        _console().print(f"[bold red]Path not found:[/bold red] {path}")
         raise typer.Exit(code=1)
 
+    from rich.table import Table
+
     table = Table(title=f"Listing: {path}")
     table.add_column("Name")
     table.add_column("Type")
@@ -82,18 +512,20 @@ def inspect(path: str = typer.Argument(".", help="Path to list files from (relat
         typ = "dir" if p.is_dir() else "file"
         size = "-" if p.is_dir() else str(p.stat().st_size)
         table.add_row(p.name, typ, size)
-    console.print(table)
+    _console().print(table)
 
 
 @app.command()
 def version():
     """Show package version."""
-    console.print(f"FikirFix v{__version__}")
+    typer.echo(f"FikirFix v{__version__}")
 
 
 @app.command()
 def doctor():
     """Run quick environment checks to ensure the CLI will work for you."""
+    from rich.table import Table
+
     project_root = _project_root()
     table = Table(title="Environment check")
     table.add_column("Check")
@@ -109,8 +541,12 @@ def doctor():
     # main.py presence
     table.add_row("main.py present", "yes" if (project_root / "main.py").exists() else "no")
 
-    console.print(table)
+    _console().print(table)
 
 
 def main():
     app()
+
+
+if __name__ == "__main__":
+    main()
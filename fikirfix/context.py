@@ -0,0 +1,151 @@
+"""Token-budgeted compaction of the agent's message history.
+
+Every model request re-sends the whole history, so old tool outputs are paid
+for again on each iteration. `ContextCompactor` watches the prompt token count
+reported by the model and, once it exceeds the budget, replaces stale tool
+outputs with short summaries. The most recent tool outputs and the latest read
+of every file are always kept verbatim.
+"""
+
+import os
+
+DEFAULT_TOKEN_BUDGET = 32000
+
+ELIDED_SUFFIX = " characters elided to save context]"
+
+# get_file_content arguments selecting part of a file
+WINDOW_ARGS = ("start_line", "end_line", "offset", "length")
+
+
+class ContextCompactor:
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, keep_recent=2, max_stale_chars=200):
+        self.token_budget = token_budget
+        # Tool outputs from this many most recent model turns are never compacted
+        self.keep_recent = keep_recent
+        # Characters of a stale output kept as its summary
+        self.max_stale_chars = max_stale_chars
+        self.last_prompt_tokens = None
+        self.compactions = 0
+        self.elided_chars = 0
+
+    def observe(self, response):
+        """Record the prompt size reported in `response.usage_metadata`."""
+        usage = getattr(response, "usage_metadata", None)
+        tokens = getattr(usage, "prompt_token_count", None)
+        if isinstance(tokens, int):
+            self.last_prompt_tokens = tokens
+
+    def over_budget(self):
+        return (
+            self.token_budget is not None
+            and self.last_prompt_tokens is not None
+            and self.last_prompt_tokens > self.token_budget
+        )
+
+    def maybe_compact(self, messages):
+        """Compact `messages` in place if the last prompt exceeded the budget."""
+        if not self.over_budget():
+            return 0
+        return self.compact(messages)
+
+    def compact(self, messages):
+        """Replace stale tool outputs in `messages` in place; return how many changed."""
+        from google.genai import types
+
+        responses = _tool_responses(messages)
+        last_turn = max((response[0] for response in responses), default=0)
+
+        latest_read = {}
+        for _, index, part_index, name, path, window in responses:
+            if name == "get_file_content" and path:
+                latest_read[(path, window)] = (index, part_index)
+
+        changed = 0
+        for turn, index, part_index, name, path, window in responses:
+            if turn > last_turn - self.keep_recent:
+                continue
+            if name == "get_file_content" and path and latest_read[(path, window)] == (index, part_index):
+                continue
+            part = messages[index].parts[part_index]
+            response = part.function_response.response
+            text = _response_text(response)
+            if text.startswith("[elided:") or text.endswith(ELIDED_SUFFIX):
+                continue
+            if name == "get_file_content" and path:
+                summary = f"[elided: superseded by a later read of {path}]"
+            elif len(text) > self.max_stale_chars:
+                summary = (
+                    text[: self.max_stale_chars]
+                    + f"\n[... {len(text) - self.max_stale_chars}{ELIDED_SUFFIX}"
+                )
+            else:
+                continue
+            if len(summary) >= len(text):
+                continue
+
+            key = "result"
+            if isinstance(response, dict) and "result" not in response and "error" in response:
+                key = "error"
+            parts = list(messages[index].parts)
+            parts[part_index] = types.Part.from_function_response(name=name, response={key: summary})
+            messages[index] = types.Content(role=messages[index].role, parts=parts)
+            self.elided_chars += len(text) - len(summary)
+            changed += 1
+
+        if changed:
+            self.compactions += 1
+        return changed
+
+
+def _response_text(response):
+    if isinstance(response, dict):
+        if "result" in response:
+            return str(response["result"])
+        if "error" in response:
+            return str(response["error"])
+    return str(response)
+
+
+def _window_value(value):
+    """A window argument as an int (the model may send "10", 10 or 10.0), or None."""
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _tool_responses(messages):
+    """Return (turn, message index, part index, tool name, file_path, window) per tool output.
+
+    `turn` counts the model messages seen so far and `window` holds the
+    line/byte range arguments of a read, so reads of different parts of a
+    file are not treated as superseding each other. Each function response is
+    matched to the oldest pending function call of the same name, which is how
+    the agent loop appends them.
+    """
+    pending = []
+    found = []
+    turn = 0
+    for index, content in enumerate(messages):
+        if getattr(content, "role", None) == "model":
+            turn += 1
+        for part_index, part in enumerate(getattr(content, "parts", None) or []):
+            call = getattr(part, "function_call", None)
+            if call is not None:
+                pending.append(call)
+                continue
+            response = getattr(part, "function_response", None)
+            if response is None:
+                continue
+            path = None
+            window = ()
+            for position, call in enumerate(pending):
+                if call.name == response.name:
+                    args = dict(call.args or {})
+                    if isinstance(args.get("file_path"), str) and args["file_path"]:
+                        path = os.path.normpath(args["file_path"])
+                    window = tuple(_window_value(args.get(key)) for key in WINDOW_ARGS)
+                    del pending[position]
+                    break
+            found.append((turn, index, part_index, response.name, path, window))
+    return found
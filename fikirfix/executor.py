@@ -0,0 +1,102 @@
+"""Concurrent execution of the tool calls requested in a single model turn.
+
+Calls are grouped into ordered batches. Calls inside a batch do not conflict
+with each other and run in a thread pool; batches run one after another, so a
+write or a script run never overlaps with a call that could observe it.
+Results are always returned in the original call order.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Tools that only observe the working directory
+READ_ONLY_TOOLS = frozenset({"get_files_info", "get_file_content", "get_files_content", "search_files"})
+
+# Tools that modify a single file given by their `file_path` argument
+WRITE_TOOLS = frozenset({"write_file", "edit_file"})
+
+
+def _call_args(call):
+    args = getattr(call, "args", None)
+    if args is None:
+        return {}
+    try:
+        return dict(args)
+    except Exception:
+        return {}
+
+
+def _call_path(call):
+    path = _call_args(call).get("file_path")
+    if not isinstance(path, str) or not path:
+        return None
+    return os.path.normpath(path)
+
+
+def conflicts(a, b):
+    """Return True if calls `a` and `b` must not run concurrently."""
+    known = READ_ONLY_TOOLS | WRITE_TOOLS
+    if a.name not in known or b.name not in known:
+        # Script runs and unknown tools may touch anything
+        return True
+    if a.name in READ_ONLY_TOOLS and b.name in READ_ONLY_TOOLS:
+        return False
+    # At least one side writes: listings may observe the change, and any
+    # access to the same path (or an unknown path) must be ordered.
+    if a.name == "get_files_info" or b.name == "get_files_info":
+        return True
+    path_a, path_b = _call_path(a), _call_path(b)
+    return path_a is None or path_b is None or path_a == path_b
+
+
+def plan_batches(calls):
+    """Split `calls` into ordered batches of mutually non-conflicting calls.
+
+    Each batch is a list of (index, call) pairs. A call joins the current batch
+    only if it conflicts with none of its members, so the relative order of any
+    two conflicting calls is preserved.
+    """
+    batches = []
+    for index, call in enumerate(calls):
+        if batches and not any(conflicts(call, other) for _, other in batches[-1]):
+            batches[-1].append((index, call))
+        else:
+            batches.append([(index, call)])
+    return batches
+
+
+class ToolExecutor:
+    """Runs the function calls of one model turn, concurrently where safe."""
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="fikirfix-tool"
+                )
+            return self._pool
+
+    def run(self, calls, fn):
+        """Apply `fn` to every call and return the results in call order."""
+        results = [None] * len(calls)
+        for batch in plan_batches(calls):
+            if len(batch) == 1 or self.max_workers <= 1:
+                for index, call in batch:
+                    results[index] = fn(call)
+                continue
+            pool = self._get_pool()
+            futures = [(index, pool.submit(fn, call)) for index, call in batch]
+            for index, future in futures:
+                results[index] = future.result()
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
@@ -0,0 +1,107 @@
+"""Run several attempts at one prompt in parallel, each on its own snapshot.
+
+Every attempt gets a snapshot of the working directory (see
+`fikirfix.snapshot`) and its own `ToolSession`, so the attempts cannot see
+each other's edits. When they finish, each snapshot is compared with the
+source, optionally scored by running its tests, and `best_attempt` picks the
+one to keep. Nothing is written to the source tree unless the caller applies
+an attempt with `fikirfix.snapshot.apply_changes`.
+"""
+import asyncio
+import os
+import time
+
+from fikirfix.batch import result_record
+from fikirfix.snapshot import changed_files, create_snapshot
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+def score_attempt(snapshot, check, runner="auto"):
+    """Run the tests at `check` in `snapshot`; return outcome counts, or {"error": message}."""
+    from functions.run_tests import run_test_suite
+
+    outcome = run_test_suite(snapshot, check, runner=runner)
+    if isinstance(outcome, str):
+        return {"error": outcome}
+    return outcome.counts()
+
+
+def _rank(record):
+    tests = record.get("tests") or {}
+    failing = tests.get("failed", 0) + tests.get("error", 0) + tests.get("timeout", 0)
+    return (
+        record.get("error") is None,
+        bool(record.get("changed") or record.get("deleted")),
+        "error" not in tests,
+        tests.get("passed", 0),
+        -failing,
+        -(record.get("prompt_tokens") or 0),
+    )
+
+
+def best_attempt(records):
+    """Return the best finished attempt, or None when every attempt failed.
+
+    Attempts that ended without an error and changed something rank first,
+    then those whose tests ran, with the most passing and fewest failing
+    tests; ties go to the attempt that used fewer prompt tokens.
+    """
+    candidates = [r for r in records if r.get("error") is None]
+    return max(candidates, key=_rank) if candidates else None
+
+
+async def run_fanout(
+    prompt,
+    run_agent,
+    client,
+    source,
+    root,
+    attempts=3,
+    mode="auto",
+    check=None,
+    session_factory=None,
+    **agent_kwargs,
+):
+    """Run `attempts` sessions of `prompt` at once, each on a snapshot of `source`.
+
+    Snapshots are created as `root`/attempt-N with `mode`. Each session's
+    tools are confined to its snapshot through `session_factory(path)`
+    (default: a plain `ToolSession`). With `check`, a test path relative to
+    the working directory, each finished snapshot is scored with `run_tests`.
+    Returns one record per attempt, in attempt order, with the batch fields
+    plus "attempt", "snapshot", "snapshot_mode", "changed", "deleted" and
+    "tests".
+    """
+    if session_factory is None:
+        from functions.session import ToolSession
+
+        def session_factory(path):
+            return ToolSession(working_directory=path)
+
+    async def one(number):
+        snapshot = os.path.join(root, f"attempt-{number}")
+        started = time.perf_counter()
+        record = {"attempt": number, "snapshot": snapshot}
+        try:
+            record["snapshot_mode"] = await asyncio.to_thread(create_snapshot, source, snapshot, mode)
+            result = await run_agent(client, prompt, session=session_factory(snapshot), echo=_silent, **agent_kwargs)
+            record.update(result_record(number, prompt, result))
+            record["changed"], record["deleted"] = await asyncio.to_thread(changed_files, source, snapshot)
+            if check is not None:
+                record["tests"] = await asyncio.to_thread(score_attempt, snapshot, check)
+        except Exception as exc:
+            record.update(
+                {
+                    "id": number,
+                    "prompt": prompt,
+                    "final_text": None,
+                    "latency_s": round(time.perf_counter() - started, 3),
+                    "error": str(exc),
+                }
+            )
+        return record
+
+    return list(await asyncio.gather(*(one(number) for number in range(1, attempts + 1))))
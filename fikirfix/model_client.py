@@ -0,0 +1,123 @@
+"""Model-client interface used by the agent loop.
+
+The agent core only needs one coroutine, `generate_content`, so any object
+implementing `ModelClient` can drive it: the Gemini SDK's async client in
+production, or `FakeModelClient` in tests and offline runs.
+"""
+from typing import Protocol
+
+
+class ModelClient(Protocol):
+    async def generate_content(self, *, model, contents, config):
+        """Return a `types.GenerateContentResponse` for the given request."""
+        ...
+
+
+# Clients may also implement
+#
+#     async def create_cached_content(self, *, model, system_instruction, tools, ttl) -> str
+#
+# returning the name of server-side cached content holding that request
+# prefix; `fikirfix.prefix_cache.StaticPrefix` uses it when present.
+
+
+class GeminiModelClient:
+    """`ModelClient` backed by the google-genai async client.
+
+    The SDK client keeps one pooled HTTP connection set, so a single instance
+    should be shared by all sessions of a process. `http_options` (a
+    `types.HttpOptions`) can point it at another endpoint, e.g. a test stub.
+    """
+
+    def __init__(self, api_key=None, client=None, http_options=None):
+        if client is None:
+            from google import genai
+
+            client = genai.Client(api_key=api_key, http_options=http_options)
+        self._client = client
+
+    async def generate_content(self, *, model, contents, config):
+        return await self._client.aio.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+
+    async def create_cached_content(self, *, model, system_instruction, tools, ttl):
+        from google.genai import types
+
+        cached = await self._client.aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(system_instruction=system_instruction, tools=tools, ttl=ttl),
+        )
+        return cached.name
+
+
+class FakeModelClient:
+    """`ModelClient` that replays scripted responses without any network.
+
+    `responses` is a sequence of `GenerateContentResponse` objects (see
+    `text_response` and `function_call_response`) or callables taking the
+    request contents and returning one. Every request is recorded in
+    `requests` for inspection.
+
+    With `caching`, the client also stands in for the API's cached content:
+    created prefixes are kept in `caches`, and requests using one report
+    `cached_tokens` as cached in their usage metadata.
+    """
+
+    def __init__(self, responses, caching=False, cached_tokens=0):
+        self._responses = list(responses)
+        self.requests = []
+        self.caching = caching
+        self.cached_tokens = cached_tokens
+        self.caches = {}
+
+    async def create_cached_content(self, *, model, system_instruction, tools, ttl):
+        if not self.caching:
+            raise NotImplementedError("FakeModelClient was created without caching")
+        name = f"cachedContents/fake-{len(self.caches) + 1}"
+        self.caches[name] = {"model": model, "system_instruction": system_instruction, "tools": tools, "ttl": ttl}
+        return name
+
+    async def generate_content(self, *, model, contents, config):
+        self.requests.append({"model": model, "contents": list(contents), "config": config})
+        cached = getattr(config, "cached_content", None)
+        if cached is not None and cached not in self.caches:
+            raise RuntimeError(f"unknown cached content {cached}")
+        if not self._responses:
+            raise RuntimeError("FakeModelClient has no scripted responses left")
+        response = self._responses.pop(0)
+        if callable(response):
+            response = response(contents)
+        if cached is not None and response.usage_metadata is not None:
+            usage = response.usage_metadata.model_copy(update={"cached_content_token_count": self.cached_tokens})
+            response = response.model_copy(update={"usage_metadata": usage})
+        return response
+
+
+def text_response(text, prompt_tokens=None, response_tokens=None):
+    """Build a final-answer response carrying `text`."""
+    from google.genai import types
+
+    return _response(types.Part(text=text), prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+
+
+def function_call_response(*calls, prompt_tokens=None, response_tokens=None):
+    """Build a response requesting `calls`, given as (name, args) pairs."""
+    from google.genai import types
+
+    parts = [types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in calls]
+    return _response(*parts, prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+
+
+def _response(*parts, prompt_tokens=None, response_tokens=None):
+    from google.genai import types
+
+    usage = None
+    if prompt_tokens is not None or response_tokens is not None:
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens, candidates_token_count=response_tokens
+        )
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=list(parts)))],
+        usage_metadata=usage,
+    )
@@ -0,0 +1,128 @@
+"""Build the static request prefix once and reuse it across requests.
+
+The system prompt and tool declarations are identical in every request.
+`StaticPrefix` builds their `GenerateContentConfig` once per process and,
+when the model client supports it (see `fikirfix.model_client`), registers
+them as server-side cached content, so requests carry only a reference to
+the prefix. The cache is created in the background: requests send the
+prefix inline until it is ready, so the first request never waits on it.
+A prefix estimated below `min_tokens` (the API rejects smaller caches) is
+not registered at all. If creating the cache fails (unsupported model, no
+permission...) requests keep sending the prefix inline, and creating it is
+tried again after FAILURE_RETRY_SECONDS (a client without caching support
+is not asked again). Tokens served from a cache are reported by the API in
+`usage_metadata.cached_content_token_count`.
+"""
+import asyncio
+import time
+import weakref
+
+# Lifetime requested for cached prefixes, and how long before expiry a new one is made
+DEFAULT_TTL_SECONDS = 3600
+REFRESH_MARGIN_SECONDS = 60
+# How long a failure to create a cached prefix is remembered before retrying
+FAILURE_RETRY_SECONDS = 60
+# Smallest prefix worth registering: the API's minimum for cached content is
+# 1,024 to 32,768 tokens depending on the model, and creating a smaller one
+# only costs a failed round trip
+MIN_CACHED_TOKENS = 4096
+# Rough characters per token, for estimating the prefix size without a request
+CHARS_PER_TOKEN = 4
+
+
+def _stale(entry):
+    if entry is None:
+        return True
+    margin = REFRESH_MARGIN_SECONDS if entry[0] is not None else 0
+    return entry[1] - time.time() < margin
+
+
+def estimate_tokens(system_instruction, tools):
+    """Estimate the token count of a system instruction plus tool declarations."""
+    chars = len(system_instruction or "")
+    for tool in tools or []:
+        dump = getattr(tool, "model_dump_json", None)
+        chars += len(dump(exclude_none=True) if dump else repr(tool))
+    return chars // CHARS_PER_TOKEN
+
+
+class StaticPrefix:
+    def __init__(self, system_instruction, tools, ttl_seconds=DEFAULT_TTL_SECONDS, min_tokens=MIN_CACHED_TOKENS):
+        from google.genai import types
+
+        self.system_instruction = system_instruction
+        self.tools = tools
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.estimated_tokens = estimate_tokens(system_instruction, tools)
+        self.config = types.GenerateContentConfig(tools=tools, system_instruction=system_instruction)
+        # client -> {model: (cached config or None, expires_at, failure reason)}
+        self._entries = weakref.WeakKeyDictionary()
+        # client -> {model: task creating its cached prefix}
+        self._pending = weakref.WeakKeyDictionary()
+
+    def unavailable_reason(self, client, model):
+        """Return why no cached prefix is used for (client, model), or None."""
+        entry = self._entries.get(client, {}).get(model)
+        return entry[2] if entry is not None else None
+
+    async def config_for(self, client, model):
+        """Return the request config for `model`, referencing a cached prefix when one is ready.
+
+        Creating (or refreshing) the cached prefix is started in the background
+        and never awaited here; until it is ready the inline prefix is returned.
+        """
+        create = getattr(client, "create_cached_content", None)
+        if create is None:
+            return self.config
+        entry = self._entries.get(client, {}).get(model)
+        if entry is None and self.estimated_tokens < self.min_tokens:
+            entry = (
+                None,
+                float("inf"),
+                f"prefix of about {self.estimated_tokens} tokens is below the "
+                f"{self.min_tokens} token minimum for cached content",
+            )
+            self._entries.setdefault(client, {})[model] = entry
+        if _stale(entry):
+            self._start(client, create, model)
+        if entry is not None and entry[0] is not None and entry[1] > time.time():
+            return entry[0]
+        return self.config
+
+    async def wait_ready(self, client, model):
+        """Wait for a cached prefix being created for (client, model), if any."""
+        task = self._pending.get(client, {}).get(model)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            await asyncio.shield(task)
+
+    def _start(self, client, create, model):
+        pending = self._pending.setdefault(client, {})
+        task = pending.get(model)
+        loop = asyncio.get_running_loop()
+        # A task left over from a finished event loop never completes; replace it
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        pending[model] = loop.create_task(self._refresh(client, create, model))
+
+    async def _refresh(self, client, create, model):
+        entry = await self._create(create, model)
+        self._entries.setdefault(client, {})[model] = entry
+
+    async def _create(self, create, model):
+        from google.genai import types
+
+        try:
+            name = await create(
+                model=model,
+                system_instruction=self.system_instruction,
+                tools=self.tools,
+                ttl=f"{self.ttl_seconds}s",
+            )
+        except NotImplementedError as exc:
+            # The client cannot cache at all; the inline prefix still works
+            return (None, float("inf"), f"{type(exc).__name__}: {exc}")
+        except Exception as exc:
+            # Possibly transient: use the inline prefix for a while, then retry
+            return (None, time.time() + FAILURE_RETRY_SECONDS, f"{type(exc).__name__}: {exc}")
+        return (types.GenerateContentConfig(cached_content=name), time.time() + self.ttl_seconds, None)
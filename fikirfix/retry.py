@@ -0,0 +1,132 @@
+"""Retries, deadlines and hedged requests around a model client.
+
+`ResilientClient` wraps any `ModelClient`. Every attempt gets a deadline.
+Failures that are likely to be transient, such as rate limits (429), server
+errors (5xx), timeouts and dropped connections, are retried with
+exponential backoff and full jitter, honouring a Retry-After header when the
+server sends one. With `hedge_after`, an attempt that has not answered in
+that many seconds is raced against a second identical request, and the first
+successful reply wins. This trims tail latency at the cost of some duplicate
+requests. With a `limiter` (e.g. `fikirfix.batch.RateLimiter`), every
+request, retries and hedges included, first waits for a token; each
+request's deadline starts only once its token is acquired, so time spent
+queueing for the rate budget never times a request out.
+"""
+import asyncio
+import random
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 20.0
+DEFAULT_DEADLINE = 120.0
+
+
+def is_retryable(exc):
+    """Return True for errors worth retrying: 429, 5xx, timeouts and connection failures."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and (code == 429 or 500 <= code < 600):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(exc, httpx.TransportError)
+
+
+def retry_after(exc):
+    """Return the delay in seconds asked for by a Retry-After header, or None."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientClient:
+    """`ModelClient` wrapper adding deadlines, retries with backoff and hedging.
+
+    `deadline` bounds each request, the original and its hedge separately,
+    in seconds (None: no bound), not counting the wait for a `limiter` token. `retries` and `hedges` count the
+    extra requests made. `sleep` and `rng` can be replaced in tests.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+        base_delay=DEFAULT_BASE_DELAY,
+        max_delay=DEFAULT_MAX_DELAY,
+        deadline=DEFAULT_DEADLINE,
+        hedge_after=None,
+        limiter=None,
+        sleep=asyncio.sleep,
+        rng=random.random,
+    ):
+        self._client = client
+        self.limiter = limiter
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self._sleep = sleep
+        self._rng = rng
+        self.retries = 0
+        self.hedges = 0
+
+    def backoff(self, attempt, exc=None):
+        """Return the delay before retry number `attempt` (1-based)."""
+        delay = self._rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        asked = retry_after(exc) if exc is not None else None
+        if asked is not None:
+            delay = max(delay, min(asked, self.max_delay))
+        return delay
+
+    async def generate_content(self, *, model, contents, config):
+        for attempt in range(1, self.max_attempts + 1):
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            try:
+                return await self._hedged(model, contents, config)
+            except Exception as exc:
+                if attempt == self.max_attempts or not is_retryable(exc):
+                    raise
+                self.retries += 1
+                await self._sleep(self.backoff(attempt, exc))
+
+    async def _request(self, model, contents, config, limited=False):
+        if limited and self.limiter is not None:
+            await self.limiter.acquire()
+        request = self._client.generate_content(model=model, contents=contents, config=config)
+        return await asyncio.wait_for(request, self.deadline)
+
+    async def _hedged(self, model, contents, config):
+        if self.hedge_after is None:
+            return await self._request(model, contents, config)
+        pending = {asyncio.ensure_future(self._request(model, contents, config))}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                self.hedges += 1
+                pending.add(asyncio.ensure_future(self._request(model, contents, config, limited=True)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def __getattr__(self, name):
+        # Optional capabilities such as create_cached_content
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._client, name)
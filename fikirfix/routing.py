@@ -0,0 +1,95 @@
+"""Choose the model for each iteration of the agent loop.
+
+A routing policy has two methods. `choose(state)` returns the model for the
+next request. `answer_model(state, model)` is asked when `model` replied
+with a final answer instead of tool calls: it returns a model that should
+write the answer instead, or None to accept it. `CascadePolicy` uses a fast
+model while the agent is picking tools and a stronger one after repeated
+tool errors and for the final answer.
+"""
+from dataclasses import dataclass
+
+# Consecutive turns with failing tool calls after which CascadePolicy escalates
+DEFAULT_ESCALATE_AFTER = 2
+
+
+@dataclass
+class RoutingState:
+    """What the policy knows about the session so far."""
+
+    iteration: int = 0
+    # Consecutive turns in which at least one tool call returned an error
+    error_turns: int = 0
+
+
+class FixedModel:
+    """Use one model for every request."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def choose(self, state):
+        return self.model
+
+    def answer_model(self, state, model):
+        return None
+
+
+class CascadePolicy:
+    """Fast model for tool selection, strong model for hard turns and the answer.
+
+    After `escalate_after` consecutive turns with tool errors, requests go to
+    the strong model until a turn succeeds (0 disables this). With
+    `strong_answer`, a final answer from the fast model is discarded and the
+    strong model is asked for it instead.
+    """
+
+    def __init__(self, fast_model, strong_model, escalate_after=DEFAULT_ESCALATE_AFTER, strong_answer=True):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.escalate_after = escalate_after
+        self.strong_answer = strong_answer
+
+    def choose(self, state):
+        if self.escalate_after and state.error_turns >= self.escalate_after:
+            return self.strong_model
+        return self.fast_model
+
+    def answer_model(self, state, model):
+        if self.strong_answer and model != self.strong_model:
+            return self.strong_model
+        return None
+
+
+def make_policy(model, fast_model=None, escalate_after=DEFAULT_ESCALATE_AFTER):
+    """Return the policy for the CLI options: a cascade when `fast_model` is set."""
+    if fast_model and fast_model != model:
+        return CascadePolicy(fast_model, model, escalate_after=escalate_after)
+    return FixedModel(model)
+
+
+class ModelStats:
+    """Request count, latency and tokens per model."""
+
+    def __init__(self):
+        self.models = {}
+
+    def record(self, model, latency_s, usage):
+        stats = self.models.setdefault(
+            model, {"requests": 0, "latency_s": 0.0, "prompt_tokens": 0, "response_tokens": 0}
+        )
+        stats["requests"] += 1
+        stats["latency_s"] += latency_s
+        stats["prompt_tokens"] += getattr(usage, "prompt_token_count", None) or 0
+        stats["response_tokens"] += getattr(usage, "candidates_token_count", None) or 0
+
+    def as_dict(self):
+        return {model: dict(stats, latency_s=round(stats["latency_s"], 3)) for model, stats in self.models.items()}
+
+    def summary_lines(self):
+        return [
+            f"{model}: {s['requests']} requests, {s['latency_s']:.2f}s "
+            f"(avg {s['latency_s'] / s['requests']:.2f}s), "
+            f"{s['prompt_tokens']} prompt / {s['response_tokens']} response tokens"
+            for model, s in self.models.items()
+        ]
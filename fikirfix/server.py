@@ -0,0 +1,371 @@
+"""Long-running agent server, so a session skips process and client startup.
+
+`fikirfix serve` keeps one model client (and the cached prompt prefix made
+with it), a warm interpreter pool and, for every working directory, one
+`ToolSession` whose file cache, file and search indexes and script run cache
+carry over from session to session. Clients connect to a Unix socket and
+send one JSON request line:
+
+    {"type": "run", "prompt": ..., "working_directory": ..., "verbose": false,
+     "resume": null, "context_budget": null, "model": null,
+     "fast_model": null, "escalate_after": null}
+
+The server streams {"event": "echo", "text"} lines with the session's
+progress output and ends with {"event": "result", ...}, the `fikirfix batch`
+record of the session plus its "session_id", or {"event": "error",
+"message"}. {"type": "status"} is answered with one {"event": "status"}
+line. With a TCP port, the same requests are also served as HTTP on
+localhost: POST /run answers with the result record and the session's
+"output" lines, GET /status with the status.
+
+Sessions write files and run code, so both transports are locked down. The
+socket is created readable and writable by its owner only. HTTP requests
+must carry `Authorization: Bearer <token>`, with the per-server token that
+`serve` writes to an owner-only file; they must name a localhost Host and
+carry no Origin (no web page may call the server, which protects against
+CSRF and DNS rebinding), and POST /run must be `application/json`. A
+session may only work in one of the server's `allowed_directories` or
+below it.
+
+`request_session` is the client side. It only needs the standard library,
+so `fikirfix run --server` starts quickly.
+"""
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import signal
+import socket
+import time
+
+DEFAULT_SOCKET = os.path.join(".fikirfix", "fikirfix.sock")
+DEFAULT_TOKEN_FILE = os.path.join(".fikirfix", "server.token")
+
+# Host header values (without the port) accepted by the HTTP server
+LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "[::1]"})
+
+# Largest request line or HTTP body the server reads
+MAX_REQUEST_BYTES = 1024 * 1024
+
+
+def request_session(socket_path, request, on_echo=print):
+    """Send `request` to the server at `socket_path`; return its final event.
+
+    Echo events are passed to `on_echo` as they arrive. Raises OSError when
+    no server is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                event = json.loads(line)
+                if event.get("event") == "echo":
+                    on_echo(event["text"])
+                else:
+                    return event
+    raise ConnectionError("server closed the connection without a result")
+
+
+class AgentServer:
+    """Runs agent sessions for socket and HTTP clients on one event loop.
+
+    `agent` is the `main` module and `client` the shared `ModelClient`. At
+    most `max_sessions` sessions run at once; later requests wait. Sessions
+    may only use `allowed_directories` (default: the agent's default working
+    directory) or directories below them. HTTP clients must send `token`
+    (default: a new random token).
+    """
+
+    def __init__(
+        self, agent, client, warm_pool=0, max_sessions=8, prefetch=0, allowed_directories=None, token=None
+    ):
+        self.agent = agent
+        self.client = client
+        self.max_sessions = max_sessions
+        self.prefetch = prefetch
+        self.allowed_directories = [
+            os.path.realpath(directory) for directory in (allowed_directories or [agent.WORKING_DIRECTORY])
+        ]
+        self.token = token or secrets.token_urlsafe(32)
+        self.pool = None
+        if warm_pool > 0 and agent.InterpreterPool.supported():
+            self.pool = agent.InterpreterPool(size=warm_pool).start()
+        # Absolute working directory -> ToolSession shared by its sessions
+        self.sessions = {}
+        self.started = time.time()
+        self.active = 0
+        self.served = 0
+        self._semaphore = asyncio.Semaphore(max_sessions)
+
+    def session_for(self, working_directory):
+        session = self.sessions.get(working_directory)
+        if session is None:
+            session = self.agent.ToolSession(working_directory=working_directory, interpreter_pool=self.pool)
+            if self.prefetch > 0:
+                from functions.prefetch import Prefetcher
+
+                session.prefetcher = Prefetcher(session.file_cache, max_files=self.prefetch)
+            self.sessions[working_directory] = session
+        return session
+
+    def check_directory(self, working_directory):
+        """Raise PermissionError unless `working_directory` is inside an allowed directory."""
+        real = os.path.realpath(working_directory)
+        for allowed in self.allowed_directories:
+            if real == allowed or real.startswith(allowed.rstrip(os.sep) + os.sep):
+                return
+        raise PermissionError(f"working directory not allowed by this server: {working_directory}")
+
+    def status(self):
+        return {
+            "event": "status",
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started, 3),
+            "active_sessions": self.active,
+            "sessions_served": self.served,
+            "working_directories": {
+                root: {"file_cache": session.file_cache.stats(), "run_cache": session.run_cache.stats()}
+                for root, session in self.sessions.items()
+            },
+        }
+
+    async def run_session(self, request, echo):
+        """Run the session described by a "run" request; return its result record."""
+        from fikirfix.batch import result_record
+        from fikirfix.routing import DEFAULT_ESCALATE_AFTER, make_policy
+        from fikirfix.session_log import SessionLog, load_session, resolve_session
+
+        agent = self.agent
+        prompt = request.get("prompt") or ""
+        working_directory = request.get("working_directory")
+        history = None
+        if request.get("resume"):
+            log_path = resolve_session(request["resume"])
+            header, history = load_session(log_path)
+            session_log = SessionLog(log_path)
+            working_directory = working_directory or header.get("working_directory")
+        elif not prompt:
+            raise ValueError("a prompt is required unless resume is given")
+        working_directory = os.path.abspath(working_directory or agent.WORKING_DIRECTORY)
+        self.check_directory(working_directory)
+        if not os.path.isdir(working_directory):
+            raise ValueError(f"working directory not found: {working_directory}")
+        if history is None:
+            session_log = SessionLog.create(prompt, working_directory=working_directory)
+
+        escalate_after = request.get("escalate_after")
+        kwargs = {}
+        if request.get("context_budget") is not None:
+            kwargs["context_budget"] = request["context_budget"]
+        routing = make_policy(
+            request.get("model") or agent.MODEL_NAME,
+            fast_model=request.get("fast_model"),
+            escalate_after=DEFAULT_ESCALATE_AFTER if escalate_after is None else escalate_after,
+        )
+
+        async with self._semaphore:
+            self.active += 1
+            try:
+                result = await agent.run_agent(
+                    self.client,
+                    prompt,
+                    verbose=bool(request.get("verbose")),
+                    session=self.session_for(working_directory),
+                    echo=echo,
+                    history=history,
+                    session_log=session_log,
+                    routing=routing,
+                    **kwargs,
+                )
+            finally:
+                self.active -= 1
+                self.served += 1
+        record = result_record(session_log.session_id, prompt, result)
+        record["session_id"] = session_log.session_id
+        return record
+
+    async def handle_stream(self, reader, writer):
+        """Serve one JSON-lines request on a socket connection."""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def send(event):
+            # Tools echo from worker threads
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        async def pump():
+            connected = True
+            while (event := await events.get()) is not None:
+                if not connected:
+                    continue
+                try:
+                    writer.write(json.dumps(event, default=str).encode("utf-8") + b"\n")
+                    await writer.drain()
+                except ConnectionError:
+                    # The session carries on (and is logged) without its client
+                    connected = False
+
+        pumping = asyncio.create_task(pump())
+        try:
+            request = json.loads(await reader.readline())
+            if request.get("type") == "status":
+                send(self.status())
+            elif request.get("type", "run") == "run":
+                record = await self.run_session(
+                    request, lambda *args, **kwargs: send({"event": "echo", "text": " ".join(map(str, args))})
+                )
+                send({"event": "result", **record})
+            else:
+                send({"event": "error", "message": f"unknown request type {request.get('type')!r}"})
+        except Exception as exc:
+            send({"event": "error", "message": str(exc)})
+        finally:
+            send(None)
+            await pumping
+            writer.close()
+
+    def refuse_http(self, method, headers):
+        """Return (status, message) for an HTTP request that must be refused, or None."""
+        host = headers.get("host", "")
+        if host.rsplit(":", 1)[0] not in LOCAL_HOSTS and host not in LOCAL_HOSTS:
+            return 403, "Host must be localhost"
+        if "origin" in headers:
+            # Browsers send Origin with cross-site requests; this server has no pages of its own
+            return 403, "requests from web pages are not allowed"
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), self.token.encode()):
+            return 401, "missing or wrong bearer token"
+        if method == "POST" and headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+            return 415, "Content-Type must be application/json"
+        return None
+
+    async def handle_http(self, reader, writer):
+        """Serve one HTTP request: POST /run or GET /status."""
+        status, body = 200, None
+        try:
+            method, path, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            headers = {}
+            while (line := (await reader.readline()).decode("latin-1").strip()):
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            refused = self.refuse_http(method, headers)
+            if refused is not None:
+                status, body = refused[0], {"error": refused[1]}
+            elif length > MAX_REQUEST_BYTES:
+                status, body = 413, {"error": "request too large"}
+            elif (method, path) == ("GET", "/status"):
+                body = self.status()
+            elif (method, path) == ("POST", "/run"):
+                request = json.loads(await reader.readexactly(length)) if length else {}
+                output = []
+                record = await self.run_session(request, lambda *args, **kwargs: output.append(" ".join(map(str, args))))
+                body = {**record, "output": output}
+            else:
+                status, body = 404, {"error": f"no route for {method} {path}"}
+        except PermissionError as exc:
+            status, body = 403, {"error": str(exc)}
+        except (ValueError, OSError) as exc:
+            status, body = 400, {"error": str(exc)}
+        except Exception as exc:
+            status, body = 500, {"error": str(exc)}
+        data = json.dumps(body, default=str).encode("utf-8")
+        reason = {
+            200: "OK",
+            400: "Bad Request",
+            401: "Unauthorized",
+            403: "Forbidden",
+            404: "Not Found",
+            413: "Payload Too Large",
+            415: "Unsupported Media Type",
+        }.get(status, "Error")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def serve(
+        self, socket_path=DEFAULT_SOCKET, port=None, host="127.0.0.1", stop=None, ready=None, token_file=DEFAULT_TOKEN_FILE
+    ):
+        """Listen on `socket_path` and/or `host`:`port` until `stop` is set.
+
+        With a port, the HTTP token is written to `token_file` (owner-only)
+        while the server runs. Without `stop`, SIGINT and SIGTERM stop the
+        server. `ready` is called once the server is listening.
+        """
+        loop = asyncio.get_running_loop()
+        if stop is None:
+            stop = asyncio.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, stop.set)
+        servers = []
+        try:
+            if socket_path:
+                _claim_socket(socket_path)
+                # Created owner-only, so it is never reachable by other users, not even briefly
+                umask = os.umask(0o177)
+                try:
+                    servers.append(
+                        await asyncio.start_unix_server(self.handle_stream, path=socket_path, limit=MAX_REQUEST_BYTES)
+                    )
+                finally:
+                    os.umask(umask)
+            if port is not None:
+                if token_file:
+                    _write_token(token_file, self.token)
+                servers.append(await asyncio.start_server(self.handle_http, host, port))
+            if ready is not None:
+                ready(self, servers)
+            await stop.wait()
+        finally:
+            for server in servers:
+                server.close()
+                await server.wait_closed()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+            if port is not None and token_file and os.path.exists(token_file):
+                os.unlink(token_file)
+            self.close()
+
+    def close(self):
+        for session in self.sessions.values():
+            if session.prefetcher is not None:
+                session.prefetcher.close()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+
+def _write_token(path, token):
+    """Write `token` to a new file at `path` that only its owner can read."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    if os.path.lexists(path):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+
+
+def _claim_socket(socket_path):
+    """Remove a stale socket file; refuse to replace a live server's socket."""
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise OSError(f"a server is already listening on {socket_path}")
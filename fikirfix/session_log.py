@@ -0,0 +1,168 @@
+"""Append-only session logs, so an interrupted session can be resumed.
+
+A session log is JSONL: a header line {"type": "session", "id", "prompt",
+...} followed by one {"type": "message", "content"} line per message added
+to the conversation, in order. Tool results are logged as the function
+responses the model saw, so resuming replays them instead of re-running the
+tools.
+"""
+import json
+import os
+import time
+
+# Where `main.py` keeps session logs unless FIKIRFIX_SESSIONS_DIR is set
+SESSIONS_DIR = os.path.join(".fikirfix", "sessions")
+
+# Sent when a resumed session ended on a model turn and no new prompt was given
+RESUME_PROMPT = "Continue where you left off."
+
+
+def sessions_dir():
+    return os.environ.get("FIKIRFIX_SESSIONS_DIR", SESSIONS_DIR)
+
+
+def new_session_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + os.urandom(2).hex()
+
+
+def resolve_session(ref):
+    """Return the log path for `ref`, a session id or a path to a log file."""
+    if os.path.isfile(ref):
+        return ref
+    path = os.path.join(sessions_dir(), f"{ref}.jsonl")
+    if os.path.isfile(path):
+        return path
+    raise FileNotFoundError(f"no session log found for {ref!r}")
+
+
+def _check_header(path):
+    """Raise ValueError unless the file at `path` starts with a session log header."""
+    with open(path, "rb") as f:
+        first = f.readline()
+    try:
+        header = json.loads(first)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        header = None
+    if not isinstance(header, dict) or header.get("type") != "session":
+        raise ValueError(f"{path} is not a session log")
+
+
+def _truncate_torn_line(path, chunk_size=64 * 1024):
+    """Cut a final line left without its newline by a crash off the log at `path`."""
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - chunk_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+
+class SessionLog:
+    """Writer appending every conversation message to a session log file.
+
+    Opening an existing log (to resume it) checks that it is one, raising
+    ValueError otherwise, and removes a torn final line, so new entries
+    start on a line of their own.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.messages = 0
+        if os.path.exists(path):
+            _check_header(path)
+            _truncate_torn_line(path)
+
+    @classmethod
+    def create(cls, prompt, session_id=None, directory=None, working_directory=None):
+        """Start a new log in `directory` (default: `sessions_dir()`).
+
+        `working_directory`, the session's tool root, is kept in the header so
+        that a resumed session works on the same tree.
+        """
+        session_id = session_id or new_session_id()
+        directory = directory or sessions_dir()
+        os.makedirs(directory, exist_ok=True)
+        log = cls(os.path.join(directory, f"{session_id}.jsonl"))
+        header = {"type": "session", "id": session_id, "prompt": prompt, "started_at": time.time()}
+        if working_directory is not None:
+            header["working_directory"] = working_directory
+        with open(log.path, "x", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+        return log
+
+    @property
+    def session_id(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def append(self, content):
+        entry = {"type": "message", "content": content.model_dump(mode="json", exclude_none=True)}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.messages += 1
+
+
+def _count_parts(content, attr):
+    return sum(1 for part in content.parts or [] if getattr(part, attr, None))
+
+
+def _drop_unanswered_calls(messages):
+    """Remove model turns whose function calls did not all get their responses logged."""
+    kept = []
+    index = 0
+    while index < len(messages):
+        content = messages[index]
+        calls = _count_parts(content, "function_call") if content.role == "model" else 0
+        if not calls:
+            kept.append(content)
+            index += 1
+            continue
+        end = index + 1
+        answered = 0
+        while end < len(messages) and _count_parts(messages[end], "function_response"):
+            answered += _count_parts(messages[end], "function_response")
+            end += 1
+        if answered >= calls:
+            kept.extend(messages[index:end])
+        index = end
+    return kept
+
+
+def load_session(path):
+    """Return (header, messages) from a session log.
+
+    A final line cut short by a crash is ignored, and so are function calls
+    whose tool results were never logged; the model will simply ask again.
+    Raises ValueError for a file that is not a session log.
+    """
+    from google.genai import types
+
+    _check_header(path)
+    header = {}
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            if number == len(lines):
+                break
+            raise ValueError(f"{path}:{number}: invalid session log entry") from None
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}:{number}: invalid session log entry")
+        if data.get("type") == "session":
+            header = data
+        elif data.get("type") == "message":
+            messages.append(types.Content.model_validate(data["content"]))
+        else:
+            raise ValueError(f"{path}:{number}: unknown session log entry")
+    return header, _drop_unanswered_calls(messages)
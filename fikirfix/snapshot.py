@@ -0,0 +1,136 @@
+"""Cheap copies of a working tree, so parallel sessions cannot see each other's edits.
+
+`create_snapshot` clones every file of a tree with a reflink where the
+filesystem supports one (a copy-on-write clone: btrfs, XFS, APFS...), else a
+plain copy. Mode "hardlink" must be asked for explicitly and is meant for
+read-only use: a hardlinked file shares its inode with the source, so a
+script that opens an existing file for writing changes it in the source and
+in every sibling snapshot, and `changed_files` cannot see the change.
+
+`changed_files` compares a snapshot with its source and `apply_changes`
+copies one snapshot's changes back.
+"""
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+
+from functions.file_index import SKIP_DIRS
+
+MODES = ("auto", "reflink", "hardlink", "copy")
+
+# Directories that are not copied into snapshots
+SNAPSHOT_SKIP_DIRS = SKIP_DIRS | {".fikirfix"}
+
+# ioctl(dest_fd, FICLONE, src_fd) clones a file on Linux
+_FICLONE = 0x40049409
+
+
+def _reflink(src, dst):
+    import fcntl
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def _walk(root):
+    """Yield (relative dir, subdirectories, files) below `root`, skipping SNAPSHOT_SKIP_DIRS."""
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in SNAPSHOT_SKIP_DIRS)
+        yield os.path.relpath(directory, root), dirs, sorted(files)
+
+
+def create_snapshot(source, dest, mode="auto"):
+    """Clone the tree at `source` into the new directory `dest`.
+
+    `mode` is one of MODES. "auto" tries a reflink, then a copy, settling on
+    the first method that works for the first file; it never hardlinks.
+    Symlinks are recreated as symlinks. Returns the method used ("reflink",
+    "hardlink" or "copy"; "copy" as well for a tree without files).
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown snapshot mode {mode!r}; use one of {', '.join(MODES)}")
+    methods = {"reflink": [_reflink], "hardlink": [os.link], "copy": [shutil.copy2]}
+    names = {_reflink: "reflink", os.link: "hardlink", shutil.copy2: "copy"}
+    candidates = methods.get(mode) or ([_reflink] if sys.platform.startswith("linux") else []) + [shutil.copy2]
+
+    os.makedirs(dest)
+    for rel_dir, dirs, files in _walk(source):
+        for name in dirs:
+            os.makedirs(os.path.join(dest, rel_dir, name), exist_ok=True)
+        for name in files:
+            src = os.path.join(source, rel_dir, name)
+            dst = os.path.normpath(os.path.join(dest, rel_dir, name))
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), dst)
+                continue
+            while True:
+                try:
+                    candidates[0](src, dst)
+                    break
+                except OSError:
+                    if len(candidates) == 1:
+                        raise
+                    # Later files would fail the same way
+                    candidates = candidates[1:]
+    return names[candidates[0]]
+
+
+def changed_files(source, snapshot):
+    """Return (changed, deleted): relative paths added or modified in `snapshot`, and removed from it."""
+    changed = []
+    seen = set()
+    for rel_dir, _, files in _walk(snapshot):
+        for name in files:
+            rel = os.path.normpath(os.path.join(rel_dir, name))
+            seen.add(rel)
+            new, old = os.path.join(snapshot, rel), os.path.join(source, rel)
+            if not os.path.lexists(old):
+                changed.append(rel)
+            elif os.path.islink(new) or os.path.islink(old):
+                if not (os.path.islink(new) and os.path.islink(old) and os.readlink(new) == os.readlink(old)):
+                    changed.append(rel)
+            elif not os.path.samefile(new, old) and not filecmp.cmp(new, old, shallow=False):
+                changed.append(rel)
+    deleted = []
+    for rel_dir, _, files in _walk(source):
+        for name in files:
+            rel = os.path.normpath(os.path.join(rel_dir, name))
+            if rel not in seen:
+                deleted.append(rel)
+    return changed, deleted
+
+
+def apply_changes(snapshot, source, changed, deleted=()):
+    """Copy `changed` files from `snapshot` into `source` and remove `deleted` ones there.
+
+    Each file is copied to a temporary file and renamed over its target, so
+    other snapshots hardlinked to the old version keep it.
+    """
+    for rel in changed:
+        src, dst = os.path.join(snapshot, rel), os.path.join(source, rel)
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst) or ".", prefix=f".{os.path.basename(dst)}.")
+        os.close(fd)
+        try:
+            if os.path.islink(src):
+                os.unlink(tmp_path)
+                os.symlink(os.readlink(src), tmp_path)
+            else:
+                shutil.copy2(src, tmp_path)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            if os.path.lexists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    for rel in deleted:
+        path = os.path.join(source, rel)
+        if os.path.lexists(path):
+            os.unlink(path)
@@ -0,0 +1,149 @@
+"""Span-based tracing of agent sessions.
+
+`Tracer.span()` times a block and records it with its parent span, so a
+session breaks down into iterations, model requests and tool calls. The
+parent is tracked with a context variable, which follows asyncio tasks and
+`asyncio.to_thread`; work handed to other threads passes `parent=` explicitly.
+
+Traces are written as JSONL (one span per line) or in the Chrome trace event
+format understood by chrome://tracing and Perfetto.
+"""
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("fikirfix_current_span", default=None)
+
+
+class Span:
+    __slots__ = ("id", "parent_id", "name", "category", "start", "end", "attrs", "thread_id", "lane")
+
+    def __init__(self, span_id, parent, name, category, attrs):
+        self.id = span_id
+        self.parent_id = parent.id if parent is not None else None
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        # Chrome draws one lane per "tid": a session keeps its own lane, and
+        # spans moved to another thread get that thread's lane.
+        if parent is None:
+            self.lane = span_id
+        elif parent.thread_id == self.thread_id:
+            self.lane = parent.lane
+        else:
+            self.lane = self.thread_id
+        self.start = time.perf_counter_ns()
+        self.end = None
+
+    @property
+    def duration_ms(self):
+        end = self.end if self.end is not None else time.perf_counter_ns()
+        return (end - self.start) / 1e6
+
+    def to_dict(self, origin):
+        return {
+            "id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "category": self.category,
+            "start_ms": (self.start - origin) / 1e6,
+            "duration_ms": self.duration_ms,
+            "attrs": self.attrs,
+        }
+
+
+class _NullSpan:
+    """Stand-in span handed out when tracing is disabled."""
+
+    id = None
+
+    @property
+    def attrs(self):
+        # A fresh dict each time, so writes are simply dropped
+        return {}
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """Tracer that records nothing; used when no trace was requested."""
+
+    enabled = False
+
+    @contextmanager
+    def span(self, name, category="agent", parent=None, **attrs):
+        yield _NULL_SPAN
+
+    def current(self):
+        return None
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self):
+        self.spans = []
+        self.origin = time.perf_counter_ns()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the innermost open span in this context."""
+        return _current_span.get()
+
+    @contextmanager
+    def span(self, name, category="agent", parent=None, **attrs):
+        """Time the enclosed block as a span; extra attrs may be set on the yielded span."""
+        if parent is None:
+            parent = _current_span.get()
+        span = Span(next(self._ids), parent, name, category, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.attrs["error"] = repr(exc)
+            raise
+        finally:
+            span.end = time.perf_counter_ns()
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def to_jsonl(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return "".join(json.dumps(span.to_dict(self.origin), default=str) + "\n" for span in spans)
+
+    def to_chrome(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start - self.origin) / 1000,
+                "dur": ((span.end or span.start) - span.start) / 1000,
+                "pid": pid,
+                "tid": span.lane,
+                "args": dict(span.attrs, span_id=span.id, parent_id=span.parent_id),
+            }
+            for span in spans
+        ]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str)
+
+    def export(self, path):
+        """Write the trace to `path`: JSONL for *.jsonl, Chrome trace format otherwise."""
+        data = self.to_jsonl() if str(path).endswith(".jsonl") else self.to_chrome()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+
+NULL_TRACER = NullTracer()
@@ -0,0 +1,166 @@
+"""Fork server used by `functions.interpreter_pool` (run as a script).
+
+Usage: python _fork_server.py [module ...]
+
+The listed modules are imported once at startup. Each request line on stdin
+is a JSON object {"target", "args", "cwd", "timeout", "max_output_bytes",
+"kill_after", "limits"}; the script is run in a child forked from this
+process, so it starts with those modules already imported. The child leads its
+own process group, which is killed as a whole when the run ends, and applies
+`limits` (`RunLimits` fields, or null) before running the script. Its output
+is streamed into capped buffers. One JSON reply line {"stdout", "stderr", "returncode", "timed_out"}
+is written per request on the original stdout.
+"""
+import importlib
+import json
+import os
+import runpy
+import signal
+import sys
+import threading
+import traceback
+
+_SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(_SERVER_DIR)
+# The interpreter's own search path, without this script's directory
+_BASE_PATH = list(sys.path[1:])
+
+sys.path.insert(0, _REPO_ROOT)
+from functions.config import MAX_OUTPUT_BYTES, OUTPUT_KILL_BYTES  # noqa: E402
+from functions.limits import RunLimits, kill_group, wait_exited  # noqa: E402
+from functions.output_capture import OutputCapture  # noqa: E402
+
+
+def _exit_code(exc):
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run_child(request, out_fd, err_fd):
+    os.setsid()
+    if request.get("limits"):
+        RunLimits(**request["limits"]).apply()
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(out_fd, 1)
+    os.dup2(err_fd, 2)
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    cwd = request["cwd"]
+    target = request["target"]
+    os.chdir(cwd)
+
+    # Modules from the working directory may have changed since they were
+    # preloaded, and this server's own modules must not shadow the script's;
+    # the script sees the files as they are now.
+    prefixes = (os.path.abspath(cwd) + os.sep, _REPO_ROOT + os.sep)
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if name != "__main__" and path and os.path.abspath(path).startswith(prefixes):
+            del sys.modules[name]
+
+    sys.argv = [target, *request.get("args", [])]
+    sys.path[:] = [os.path.dirname(target), *_BASE_PATH]
+
+    code = 0
+    try:
+        runpy.run_path(target, run_name="__main__")
+    except SystemExit as exc:
+        code = _exit_code(exc)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code)
+
+
+def _wait(pid, timeout):
+    """Wait up to `timeout` seconds for `pid` to exit, killing its group then; return timed_out.
+
+    The child is not reaped.
+    """
+    if wait_exited(pid, timeout):
+        return False
+    kill_group(pid)
+    wait_exited(pid)
+    return True
+
+
+def _handle(request):
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(out_r)
+        os.close(err_r)
+        _run_child(request, out_w, err_w)
+    os.close(out_w)
+    os.close(err_w)
+
+    # The group id may be reused once the child is reaped, so killing it
+    # (also from the capture threads) and reaping are serialized
+    lock = threading.Lock()
+    reaped = False
+
+    def kill():
+        with lock:
+            if not reaped:
+                kill_group(pid)
+
+    capture = OutputCapture(
+        cap=request.get("max_output_bytes", MAX_OUTPUT_BYTES),
+        kill_after=request.get("kill_after", OUTPUT_KILL_BYTES),
+        on_limit=kill,
+    )
+    capture.start(os.fdopen(out_r, "rb", buffering=0), os.fdopen(err_r, "rb", buffering=0))
+    try:
+        timed_out = _wait(pid, request.get("timeout", 30))
+    finally:
+        with lock:
+            # Grandchildren the script left behind; the exited child still holds the group id
+            kill_group(pid)
+            _, status = os.waitpid(pid, 0)
+            reaped = True
+    capture.join()
+    stdout, stderr = capture.result()
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "returncode": os.waitstatus_to_exitcode(status),
+        "timed_out": timed_out,
+    }
+
+
+def main():
+    # Keep the protocol channel away from fd 1 so nothing else can write to it
+    replies = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    for name in sys.argv[1:]:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            reply = _handle(json.loads(line))
+        except Exception as exc:
+            reply = {"error": str(exc)}
+        replies.write(json.dumps(reply) + "\n")
+        replies.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Exec wrapper used by `functions.output_capture.run_captured` (run as a script).
+
+Usage: python -S _limited_exec.py LIMITS_JSON PROGRAM [arg ...]
+
+Applies LIMITS_JSON (`RunLimits` fields) to this process with setrlimit,
+then replaces it with PROGRAM through `os.execv`, which inherits the limits.
+Setting them here rather than in a `preexec_fn` keeps the forking parent,
+which may be running other threads, from executing Python between fork and
+exec.
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from functions.limits import RunLimits  # noqa: E402
+
+
+def main(argv):
+    RunLimits(**json.loads(argv[0])).apply()
+    os.execv(argv[1], argv[1:])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,132 @@
+"""Test worker used by `functions.run_tests` (run as a script).
+
+Usage: python _test_shard.py collect|run RUNNER OUT_FILE [item ...]
+
+RUNNER is "pytest" or "unittest". `collect` takes test file paths and writes
+one JSON line per test id found ({"id"}) or per file that failed to load
+({"id", "outcome": "error", "details"}). `run` takes test ids and writes one
+JSON line {"id", "outcome", "details"} per finished test, where outcome is
+passed, failed, error or skipped. Lines are flushed as they are written, so
+a shard killed at its deadline still reports the tests it finished. The
+current directory is the working directory and is put first on sys.path.
+"""
+import json
+import os
+import sys
+import traceback
+import unittest
+
+
+class _Out:
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+
+def _module_name(path):
+    return os.path.splitext(os.path.normpath(path))[0].replace(os.sep, ".")
+
+
+def _iter_cases(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_cases(test)
+        else:
+            yield test
+
+
+def _unittest_collect(out, paths):
+    loader = unittest.TestLoader()
+    for path in paths:
+        try:
+            suite = loader.loadTestsFromName(_module_name(path))
+        except Exception:
+            out.write({"id": path, "outcome": "error", "details": traceback.format_exc()})
+            continue
+        for case in _iter_cases(suite):
+            if isinstance(case, unittest.loader._FailedTest):
+                out.write({"id": path, "outcome": "error", "details": str(case._exception)})
+            else:
+                out.write({"id": case.id()})
+
+
+class _UnittestResult(unittest.TestResult):
+    def __init__(self, out):
+        super().__init__()
+        self.out = out
+
+    def addSuccess(self, test):
+        self.out.write({"id": test.id(), "outcome": "passed", "details": ""})
+
+    def addFailure(self, test, err):
+        self.out.write({"id": test.id(), "outcome": "failed", "details": self._exc_info_to_string(err, test)})
+
+    def addError(self, test, err):
+        self.out.write({"id": test.id(), "outcome": "error", "details": self._exc_info_to_string(err, test)})
+
+    def addSkip(self, test, reason):
+        self.out.write({"id": test.id(), "outcome": "skipped", "details": reason})
+
+    def addExpectedFailure(self, test, err):
+        self.addSuccess(test)
+
+    def addUnexpectedSuccess(self, test):
+        self.out.write({"id": test.id(), "outcome": "failed", "details": "Unexpected success"})
+
+
+def _unittest_run(out, ids):
+    suite = unittest.TestLoader().loadTestsFromNames(ids)
+    suite.run(_UnittestResult(out))
+
+
+class _PytestReporter:
+    def __init__(self, out, collect):
+        self.out = out
+        self.collect = collect
+
+    def pytest_collection_finish(self, session):
+        if not self.collect:
+            return
+        for item in session.items:
+            self.out.write({"id": item.nodeid})
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self.out.write({"id": report.nodeid, "outcome": "error", "details": report.longreprtext})
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == "call" or report.failed or report.skipped:
+            outcome = report.outcome
+            if report.failed and report.when != "call":
+                outcome = "error"
+            details = report.longrepr[2] if report.skipped and isinstance(report.longrepr, tuple) else report.longreprtext
+            self.out.write({"id": report.nodeid, "outcome": outcome, "details": details})
+
+
+def _pytest_main(out, args, collect):
+    import pytest
+
+    # Shards must not inherit options such as -x or -n from a config file
+    base = ["-q", "-p", "no:cacheprovider", "--rootdir", ".", "-o", "addopts="]
+    if collect:
+        base.append("--collect-only")
+    pytest.main(base + args, plugins=[_PytestReporter(out, collect)])
+
+
+def main(argv):
+    command, runner, out_path, items = argv[0], argv[1], argv[2], argv[3:]
+    sys.path[0] = os.getcwd()
+    out = _Out(out_path)
+    if runner == "pytest":
+        _pytest_main(out, items, command == "collect")
+    elif command == "collect":
+        _unittest_collect(out, items)
+    else:
+        _unittest_run(out, items)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+
+def _default_mode():
+    # os.umask can only be read by setting it; do it once, at import time
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+# Permission bits of a newly created file, as open() would give it
+_NEW_FILE_MODE = _default_mode()
+
+
+def write_text_atomic(path, text, newline=None):
+    """Write `text` to `path` through a temporary file and `os.replace`.
+
+    The file is never seen half-written, and `path` gets a new inode, so a
+    file hardlinked into a snapshot (see `fikirfix.snapshot`) is copied on
+    write instead of changed in every tree sharing it. An existing file
+    keeps its permission bits.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", errors="replace", newline=newline) as f:
+            f.write(text)
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, _NEW_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
@@ -1,2 +1,43 @@
 # Configuration for file-related tools
 MAX_CHARS = 10000
+
+# Directory the tools are confined to unless a session names another
+WORKING_DIRECTORY = "calculator"
+
+# Combined characters returned by one get_files_content call, and the most
+# files it reads
+MULTI_READ_MAX_CHARS = 40000
+MULTI_READ_MAX_FILES = 25
+
+# Modules imported once by each warm interpreter used by run_python_file
+INTERPRETER_POOL_PRELOAD = ("unittest", "json", "re", "decimal")
+
+# Bytes of each output stream kept from an executed script (head + tail)
+MAX_OUTPUT_BYTES = 10000
+
+# Combined output after which a running script is killed
+OUTPUT_KILL_BYTES = 10 * 1024 * 1024
+
+# Resource limits of each script run by run_python_file (see functions.limits):
+# CPU seconds, address space, open file descriptors and size of files written
+RUN_CPU_SECONDS = 20
+RUN_MEMORY_BYTES = 1024 * 1024 * 1024
+RUN_OPEN_FILES = 256
+RUN_FILE_SIZE_BYTES = 64 * 1024 * 1024
+
+# Matching lines returned by search_files unless the caller asks for fewer
+SEARCH_MAX_RESULTS = 50
+
+# Files larger than this are not indexed or searched by search_files
+SEARCH_MAX_FILE_BYTES = 1024 * 1024
+
+# Files warmed into the file cache after a listing when prefetching is on:
+# at most this many per listing, each no larger than PREFETCH_MAX_BYTES
+PREFETCH_MAX_FILES = 8
+PREFETCH_MAX_BYTES = 64 * 1024
+PREFETCH_EXTENSIONS = frozenset({".py", ".txt", ".md", ".rst", ".json", ".toml", ".cfg", ".ini", ".yaml", ".yml"})
+
+# Processes run_tests spreads a suite over (also capped by the CPU count),
+# and the characters of each failure report it returns
+TESTS_MAX_WORKERS = 8
+TESTS_MAX_DETAIL_CHARS = 2000
@@ -0,0 +1,215 @@
+import os
+import re
+
+from functions.atomic_write import write_text_atomic
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class EditError(Exception):
+    """An edit that does not apply; nothing is written when raised."""
+
+
+def _line_at(content, pos):
+    return content.count("\n", 0, pos) + 1
+
+
+def _line_count(text):
+    """Number of lines `text` spans; a final newline does not start another line."""
+    return text.count("\n") + (bool(text) and not text.endswith("\n"))
+
+
+def _apply_replacements(content, edits, file_path):
+    """Apply search/replace `edits` to `content`; return (new content, report lines).
+
+    Every search text must occur exactly once in the original content and the
+    matched regions must not overlap.
+    """
+    spans = []
+    for number, edit in enumerate(edits, start=1):
+        if not isinstance(edit, dict):
+            raise EditError(f"edit {number} must be an object with search and replace")
+        search, replace = edit.get("search"), edit.get("replace", "")
+        if not isinstance(search, str) or not search:
+            raise EditError(f"edit {number} has an empty search text")
+        if not isinstance(replace, str):
+            raise EditError(f"edit {number} has a non-string replace text")
+        pos = content.find(search)
+        if pos < 0:
+            raise EditError(f'search text of edit {number} was not found in "{file_path}"')
+        count = content.count(search)
+        if count > 1:
+            raise EditError(
+                f'search text of edit {number} matches {count} places in "{file_path}"; '
+                "include more surrounding lines to make it unique"
+            )
+        spans.append((pos, pos + len(search), replace, number))
+
+    spans.sort()
+    for (_, end, _, a), (start, _, _, b) in zip(spans, spans[1:]):
+        if start < end:
+            raise EditError(f"edits {min(a, b)} and {max(a, b)} overlap")
+
+    report = {}
+    pieces = []
+    last = 0
+    shift = 0
+    for start, end, replace, number in spans:
+        pieces.append(content[last:start])
+        pieces.append(replace)
+        last = end
+        line = _line_at(content, start) + shift
+        report[number] = (
+            f" - edit {number}: line {line}, {_line_count(content[start:end])} line(s) "
+            f"replaced by {_line_count(replace)}"
+        )
+        shift += replace.count("\n") - content.count("\n", start, end)
+    pieces.append(content[last:])
+    return "".join(pieces), [report[number] for number in sorted(report)]
+
+
+def parse_unified_diff(diff):
+    """Return the hunks of a single-file unified diff as (old start, old lines, new lines)."""
+    hunks = []
+    remaining_old = remaining_new = 0
+    for raw in diff.splitlines():
+        if remaining_old == 0 and remaining_new == 0:
+            match = _HUNK_HEADER.match(raw)
+            if match:
+                old_start = int(match.group(1))
+                remaining_old = int(match.group(2) or 1)
+                remaining_new = int(match.group(4) or 1)
+                old, new = [], []
+                hunks.append((old_start, old, new))
+            # File headers (diff/---/+++) and anything between hunks
+            continue
+        if raw.startswith("\\"):
+            # "\ No newline at end of file"
+            continue
+        tag, text = raw[:1], raw[1:]
+        if tag in (" ", ""):
+            old.append(text)
+            new.append(text)
+            remaining_old -= 1
+            remaining_new -= 1
+        elif tag == "-":
+            old.append(text)
+            remaining_old -= 1
+        elif tag == "+":
+            new.append(text)
+            remaining_new -= 1
+        else:
+            raise EditError(f"unexpected line in hunk {len(hunks)}: {raw!r}")
+        if remaining_old < 0 or remaining_new < 0:
+            raise EditError(f"hunk {len(hunks)} has more lines than its header announces")
+    if remaining_old or remaining_new:
+        raise EditError(f"hunk {len(hunks)} is truncated")
+    if not hunks:
+        raise EditError("diff contains no hunks")
+    return hunks
+
+
+def _apply_diff(content, diff, file_path):
+    """Apply a unified diff to `content`; return (new content, report lines).
+
+    A hunk applies at its stated line when the context and removed lines match
+    there; otherwise it must match exactly one other place after the previous
+    hunk, which is reported as an offset.
+    """
+    lines = content.splitlines(keepends=True)
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    bare = [line.rstrip("\r\n") for line in lines]
+    report = []
+    shift = 0
+    floor = 0
+    for number, (old_start, old, new) in enumerate(parse_unified_diff(diff), start=1):
+        if not old:
+            # Pure insertion: old_start is the line after which to insert
+            pos = old_start + shift
+            if not floor <= pos <= len(bare):
+                raise EditError(f'hunk {number} inserts after line {old_start}, beyond the end of "{file_path}"')
+        else:
+            expected = old_start - 1 + shift
+            if expected >= floor and bare[expected:expected + len(old)] == old:
+                pos = expected
+            else:
+                matches = [
+                    i for i in range(floor, len(bare) - len(old) + 1) if bare[i:i + len(old)] == old
+                ]
+                if not matches:
+                    raise EditError(f'hunk {number} (line {old_start}) does not match "{file_path}"')
+                if len(matches) > 1:
+                    raise EditError(
+                        f'hunk {number} (line {old_start}) matches {len(matches)} places in "{file_path}"; '
+                        "include more context lines"
+                    )
+                pos = matches[0]
+
+        new_lines = [text + newline for text in new]
+        if new_lines and pos + len(old) == len(lines) and lines and not lines[-1].endswith("\n"):
+            # The change touches the end of a file without a final newline:
+            # keep it that way
+            if not old:
+                lines[-1] += newline
+            new_lines[-1] = new_lines[-1][: -len(newline)]
+        lines[pos:pos + len(old)] = new_lines
+        bare[pos:pos + len(old)] = list(new)
+
+        offset = pos - (old_start - 1 + shift) if old else 0
+        note = f" (offset {offset:+d} lines)" if offset else ""
+        if old:
+            where = f"lines {pos + 1}-{pos + len(old)}" if len(old) > 1 else f"line {pos + 1}"
+            report.append(f" - hunk {number}: {where} ({len(old)} line(s)) replaced by {len(new)}{note}")
+        else:
+            report.append(f" - hunk {number}: inserted {len(new)} line(s) after line {pos}")
+        floor = pos + len(new)
+        shift = pos + len(new) - (old_start - 1 + len(old)) if old else shift + len(new)
+    return "".join(lines), report
+
+
+def edit_file(working_directory, file_path, edits=None, diff=None, cache=None):
+    """Change part of an existing file inside the working directory.
+
+    Takes either `edits`, a list of {"search", "replace"} objects whose search
+    text must match exactly one place in the file, or `diff`, a unified diff
+    of the file. Either all changes apply or the file is left untouched; the
+    result lists where each change landed.
+    """
+    try:
+        abs_working = os.path.abspath(working_directory)
+        target = os.path.abspath(os.path.join(working_directory, file_path))
+
+        if not (target == abs_working or target.startswith(abs_working + os.sep)):
+            return f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory'
+
+        if not os.path.isfile(target):
+            return f'Error: File not found or is not a regular file: "{file_path}"'
+
+        if (edits is None) == (diff is None):
+            return "Error: pass either edits or diff"
+
+        # newline="" keeps CRLF files byte-for-byte outside the edited regions
+        with open(target, "r", encoding="utf-8", newline="") as f:
+            content = f.read()
+
+        try:
+            if diff is not None:
+                new_content, report = _apply_diff(content, diff, file_path)
+            else:
+                if isinstance(edits, dict):
+                    edits = [edits]
+                if not edits:
+                    return "Error: edits must contain at least one search/replace object"
+                new_content, report = _apply_replacements(content, list(edits), file_path)
+        except EditError as e:
+            return f"Error: {e}; no changes were made"
+
+        write_text_atomic(target, new_content, newline="")
+
+        if cache is not None:
+            cache.invalidate(target)
+
+        kind = "hunk" if diff is not None else "edit"
+        return f'Successfully edited "{file_path}" ({len(report)} {kind}(s) applied)\n' + "\n".join(report)
+    except Exception as e:
+        return f"Error: {e}"
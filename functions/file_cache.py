@@ -0,0 +1,96 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class FileCache:
+    """Session-scoped LRU cache for directory listings and file reads.
+
+    Entries are keyed on (kind, resolved path, extra) and validated against the
+    path's (mtime_ns, size) on every lookup, so a changed file is re-read even
+    without explicit invalidation. Directory listings also report the sizes of
+    their entries, which an in-place edit does not reflect in the directory's
+    own mtime; `invalidate` (called by `write_file`) and `invalidate_listings`
+    (called after scripts run) cover that case.
+
+    An entry filled ahead of time can be tagged with `filled_by` (e.g. by
+    `functions.prefetch.Prefetcher`); the first hit on a valid tagged entry,
+    the read it saved, is counted in `filled_hits[tag]`.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.filled_hits = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def lookup(self, kind, path, compute, extra=(), filled_by=None):
+        """Return the cached value for `path`, calling `compute()` on a miss.
+
+        The signature is taken before `compute` runs, so a file modified while
+        it is being read is simply re-read on the next lookup. A value
+        computed with `filled_by` does not replace a valid entry that another
+        lookup stored in the meantime.
+        """
+        path = os.path.realpath(path)
+        key = (kind, path, extra)
+        signature = self._signature(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                if filled_by is None:
+                    self.hits += 1
+                    if entry[2] is not None:
+                        self.filled_hits[entry[2]] = self.filled_hits.get(entry[2], 0) + 1
+                        self._entries[key] = (signature, entry[1], None)
+                return entry[1]
+            if filled_by is None:
+                self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if filled_by is not None and entry is not None and entry[0] == signature:
+                return value
+            self._entries[key] = (signature, value, filled_by)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, path):
+        """Drop entries for `path` and listings of the directories containing it."""
+        path = os.path.realpath(path)
+        parents = set()
+        parent = os.path.dirname(path)
+        while parent and parent not in parents:
+            parents.add(parent)
+            parent = os.path.dirname(parent)
+        with self._lock:
+            for key in list(self._entries):
+                kind, entry_path, _ = key
+                if entry_path == path or (kind == "listing" and entry_path in parents):
+                    del self._entries[key]
+
+    def invalidate_listings(self):
+        """Drop every cached directory listing."""
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == "listing":
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
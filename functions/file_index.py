@@ -0,0 +1,107 @@
+import difflib
+import os
+import threading
+from collections import defaultdict
+
+# Directories never worth searching for source files
+SKIP_DIRS = frozenset({".git", "__pycache__", "node_modules", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache"})
+
+
+class FileIndex:
+    """Index of the files under a working directory, refreshed incrementally.
+
+    Every directory is remembered with its mtime; `refresh` stats the known
+    directories and only re-lists those whose mtime changed, so keeping the
+    index current costs one stat per directory instead of a full walk.
+    Symlinked directories are not followed.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        # relative dir -> (mtime_ns, file names, subdirectory names)
+        self._dirs = {}
+        # basename -> relative file paths
+        self._by_name = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def _forget_dir(self, rel_dir):
+        _, files, _ = self._dirs.pop(rel_dir)
+        for name in files:
+            self._by_name[name].discard(os.path.join(rel_dir, name) if rel_dir else name)
+            if not self._by_name[name]:
+                del self._by_name[name]
+
+    def _scan_dir(self, rel_dir, abs_dir, mtime):
+        files, subdirs = [], []
+        with os.scandir(abs_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+        for name in files:
+            self._by_name[name].add(os.path.join(rel_dir, name) if rel_dir else name)
+        self._dirs[rel_dir] = (mtime, files, subdirs)
+
+    def refresh(self):
+        """Bring the index up to date, re-listing only changed directories."""
+        with self._lock:
+            seen = set()
+            stack = [""]
+            while stack:
+                rel_dir = stack.pop()
+                abs_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+                try:
+                    mtime = os.stat(abs_dir, follow_symlinks=False).st_mtime_ns
+                except OSError:
+                    continue
+                known = self._dirs.get(rel_dir)
+                if known is None or known[0] != mtime:
+                    if known is not None:
+                        self._forget_dir(rel_dir)
+                    try:
+                        self._scan_dir(rel_dir, abs_dir, mtime)
+                    except OSError:
+                        continue
+                seen.add(rel_dir)
+                for name in self._dirs[rel_dir][2]:
+                    stack.append(os.path.join(rel_dir, name) if rel_dir else name)
+            for rel_dir in [d for d in self._dirs if d not in seen]:
+                self._forget_dir(rel_dir)
+
+    def paths(self):
+        """Return every indexed file path, relative to the root."""
+        with self._lock:
+            return [path for paths in self._by_name.values() for path in paths]
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(paths) for paths in self._by_name.values())
+
+    def lookup(self, requested, limit=5):
+        """Return up to `limit` indexed paths most likely meant by `requested`.
+
+        Files with the requested basename come first, ranked by how many
+        trailing path components match and then by overall path similarity.
+        If no basename matches exactly, close basenames are used instead.
+        """
+        requested = os.path.normpath(requested).lstrip(os.sep)
+        basename = os.path.basename(requested)
+        with self._lock:
+            candidates = set(self._by_name.get(basename, ()))
+            if not candidates:
+                for name in difflib.get_close_matches(basename, list(self._by_name), n=limit, cutoff=0.6):
+                    candidates |= self._by_name[name]
+
+        wanted = requested.split(os.sep)
+
+        def rank(path):
+            parts = path.split(os.sep)
+            suffix = 0
+            while suffix < min(len(parts), len(wanted)) and parts[-1 - suffix] == wanted[-1 - suffix]:
+                suffix += 1
+            similarity = difflib.SequenceMatcher(None, requested, path).ratio()
+            return (-suffix, -similarity, len(parts), path)
+
+        return sorted(candidates, key=rank)[:limit]
@@ -1,8 +1,21 @@
+import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
 from google.genai import types
 
 
-def get_files_info(working_directory, directory="."):
+def _list_directory(target):
+    entries = sorted(os.listdir(target))
+    lines = []
+    for name in entries:
+        path = os.path.join(target, name)
+        size = os.path.getsize(path)
+        is_dir = os.path.isdir(path)
+        lines.append(f" - {name}: file_size={size} bytes, is_dir={is_dir}")
+    return "\n".join(lines)
+
+
+def get_files_info(working_directory, directory=".", cache=None):
     try:
         # Resolve absolute paths
         abs_working = os.path.abspath(working_directory)
@@ -17,23 +30,72 @@ def get_files_info(working_directory, directory="."):
         if not os.path.isdir(target):
             return f'Error: "{directory}" is not a directory'
 
-        entries = sorted(os.listdir(target))
-        lines = []
-        for name in entries:
-            path = os.path.join(target, name)
-            try:
-                size = os.path.getsize(path)
-            except OSError as e:
-                return f"Error: {e}"
-            is_dir = os.path.isdir(path)
-            lines.append(f" - {name}: file_size={size} bytes, is_dir={is_dir}")
-
-        return "\n".join(lines)
+        if cache is not None:
+            return cache.lookup("listing", target, lambda: _list_directory(target))
+        return _list_directory(target)
     except Exception as e:
         return f"Error: {e}"
 
 
-def get_file_content(working_directory, file_path):
+def _read_text(target, file_path, max_chars):
+    with open(target, "r", errors="replace") as f:
+        content = f.read(max_chars)
+
+    # If file longer than max_chars, append truncation message
+    try:
+        full_size = os.path.getsize(target)
+    except OSError:
+        full_size = None
+
+    if full_size is not None and full_size > max_chars:
+        content += f'[...File "{file_path}" truncated at {max_chars} characters]'
+
+    return content
+
+
+def _as_int(value, name):
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    if number != value and not isinstance(value, str):
+        raise ValueError(f"{name} must be an integer")
+    return number
+
+
+def _read_window(target, file_path, offset, length, start_line, end_line, max_chars, cache):
+    from functions.ranged_read import LineIndex, read_bytes, read_lines
+
+    if offset is not None or length is not None:
+        if start_line is not None or end_line is not None:
+            return "Error: use either offset/length or start_line/end_line, not both"
+        offset = 0 if offset is None else offset
+        length = max_chars if length is None else length
+        if offset < 0 or length < 0:
+            return "Error: offset and length must not be negative"
+        return read_bytes(target, file_path, offset, length, max_chars)
+
+    start_line = 1 if start_line is None else start_line
+    if start_line < 1:
+        return "Error: start_line must be 1 or greater"
+    if end_line is not None and end_line < start_line:
+        return "Error: end_line must not be smaller than start_line"
+    index = cache.lookup("lines", target, LineIndex) if cache is not None else LineIndex()
+    return read_lines(target, file_path, start_line, end_line, max_chars, index)
+
+
+def get_file_content(
+    working_directory, file_path, offset=None, length=None, start_line=None, end_line=None, cache=None
+):
+    """Read a text file inside the working directory.
+
+    Without a window the first MAX_CHARS characters are returned. `offset` and
+    `length` select a byte range; `start_line`/`end_line` (1-based, inclusive)
+    select lines. Windows are served through mmap and are capped at MAX_CHARS
+    bytes, with a note telling the caller how to continue.
+    """
     try:
         abs_working = os.path.abspath(working_directory)
         target = os.path.abspath(os.path.join(working_directory, file_path))
@@ -47,24 +109,100 @@ def get_file_content(working_directory, file_path):
         # Lazy import config to avoid circular imports elsewhere
         from functions.config import MAX_CHARS
 
-        with open(target, "r", errors="replace") as f:
-            content = f.read(MAX_CHARS)
+        window = [
+            _as_int(offset, "offset"),
+            _as_int(length, "length"),
+            _as_int(start_line, "start_line"),
+            _as_int(end_line, "end_line"),
+        ]
+        if any(value is not None for value in window):
+            return _read_window(target, file_path, *window, MAX_CHARS, cache)
+
+        if cache is not None:
+            # The truncation note names the requested path, so it is part of the key
+            return cache.lookup(
+                "content", target, lambda: _read_text(target, file_path, MAX_CHARS), extra=(file_path, MAX_CHARS)
+            )
+        return _read_text(target, file_path, MAX_CHARS)
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def _expand_paths(abs_working, file_paths):
+    """Expand glob patterns in `file_paths` to sorted relative file paths, keeping order and dropping repeats.
+
+    Matches that resolve outside `abs_working` (absolute or ".." patterns,
+    symlinks) are dropped, so not even their names are reported.
+    """
+    real_working = os.path.realpath(abs_working)
+    paths = []
+    for path in file_paths:
+        if any(ch in path for ch in "*?["):
+            for match in sorted(glob.glob(path, root_dir=abs_working, recursive=True)):
+                resolved = os.path.realpath(os.path.join(abs_working, match))
+                if resolved.startswith(real_working + os.sep) and os.path.isfile(resolved):
+                    paths.append(match)
+        else:
+            paths.append(path)
+    return list(dict.fromkeys(paths))
+
+
+def _share_budget(lengths, budget):
+    """Split `budget` characters over files of `lengths`; small files get all they need."""
+    shares = [0] * len(lengths)
+    remaining = budget
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    for position, i in enumerate(order):
+        share = remaining // (len(order) - position)
+        shares[i] = min(lengths[i], share)
+        remaining -= shares[i]
+    return shares
 
-        # If file longer than MAX_CHARS, append truncation message
-        try:
-            full_size = os.path.getsize(target)
-        except OSError:
-            full_size = None
 
-        if full_size is not None and full_size > MAX_CHARS:
-            content += f'[...File "{file_path}" truncated at {MAX_CHARS} characters]'
+def get_files_content(working_directory, file_paths, cache=None):
+    """Read several text files inside the working directory in one call.
 
-        return content
+    `file_paths` may contain glob patterns (e.g. "pkg/*.py", "**/test_*.py").
+    Files are read concurrently with the same checks as `get_file_content`,
+    and their combined output is kept within MULTI_READ_MAX_CHARS by giving
+    each file an equal share of whatever the smaller files leave unused.
+    """
+    try:
+        from functions.config import MULTI_READ_MAX_CHARS, MULTI_READ_MAX_FILES
+
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        if not file_paths or not all(isinstance(p, str) and p for p in file_paths):
+            return "Error: file_paths must be a non-empty list of paths"
+
+        abs_working = os.path.abspath(working_directory)
+        paths = _expand_paths(abs_working, file_paths)
+        if not paths:
+            return f"Error: no files match {', '.join(file_paths)}"
+        skipped = paths[MULTI_READ_MAX_FILES:]
+        paths = paths[:MULTI_READ_MAX_FILES]
+
+        with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+            contents = list(pool.map(lambda p: get_file_content(working_directory, p, cache=cache), paths))
+
+        sections = []
+        for path, content, share in zip(paths, contents, _share_budget([len(c) for c in contents], MULTI_READ_MAX_CHARS)):
+            if share < len(content):
+                content = content[:share] + (
+                    f'[...File "{path}" truncated at {share} characters to fit the '
+                    f"{MULTI_READ_MAX_CHARS} character budget; read the rest with get_file_content]"
+                )
+            sections.append(f"===== {path} =====\n{content}")
+        if skipped:
+            sections.append(
+                f"[...{len(skipped)} more files not read (limit {MULTI_READ_MAX_FILES}): {', '.join(skipped)}]"
+            )
+        return "\n".join(sections)
     except Exception as e:
         return f"Error: {e}"
 
 
-def write_file(working_directory, file_path, content):
+def write_file(working_directory, file_path, content, cache=None):
     try:
         abs_working = os.path.abspath(working_directory)
         target = os.path.abspath(os.path.join(working_directory, file_path))
@@ -77,8 +215,12 @@ def write_file(working_directory, file_path, content):
         if parent and not os.path.exists(parent):
             os.makedirs(parent, exist_ok=True)
 
-        with open(target, "w", encoding="utf-8", errors="replace") as f:
-            f.write(content)
+        from functions.atomic_write import write_text_atomic
+
+        write_text_atomic(target, content)
+
+        if cache is not None:
+            cache.invalidate(target)
 
         return f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
     except Exception as e:
@@ -105,7 +247,10 @@ schema_get_files_info = types.FunctionDeclaration(
 
 schema_get_file_content = types.FunctionDeclaration(
     name="get_file_content",
-    description="Reads the contents of a text file (truncated) within the working directory.",
+    description=(
+        "Reads the contents of a text file (truncated) within the working directory. "
+        "Use start_line/end_line or offset/length to page through large files."
+    ),
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -113,7 +258,43 @@ schema_get_file_content = types.FunctionDeclaration(
                 type=types.Type.STRING,
                 description="Relative path to the file to read.",
             ),
+            "start_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="First line to read (1-based). Reads as many lines as fit if end_line is omitted.",
+            ),
+            "end_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="Last line to read (inclusive).",
+            ),
+            "offset": types.Schema(
+                type=types.Type.INTEGER,
+                description="Byte offset to start reading from. Cannot be combined with line numbers.",
+            ),
+            "length": types.Schema(
+                type=types.Type.INTEGER,
+                description="Number of bytes to read from offset.",
+            ),
+        },
+    ),
+)
+
+schema_get_files_content = types.FunctionDeclaration(
+    name="get_files_content",
+    description=(
+        "Reads several text files within the working directory in one call, each under a ===== path ===== "
+        "header. Paths may be glob patterns. Large files are truncated to share a total size budget. "
+        "Prefer this over several get_file_content calls when you need related files."
+    ),
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_paths": types.Schema(
+                type=types.Type.ARRAY,
+                description='Relative paths or glob patterns such as "pkg/*.py" or "**/test_*.py".',
+                items=types.Schema(type=types.Type.STRING),
+            ),
         },
+        required=["file_paths"],
     ),
 )
 
@@ -135,6 +316,81 @@ schema_write_file = types.FunctionDeclaration(
     ),
 )
 
+schema_edit_file = types.FunctionDeclaration(
+    name="edit_file",
+    description=(
+        "Changes part of an existing file within the working directory without resending all of it. "
+        "Pass either search/replace edits or a unified diff; each search text (or hunk) must match exactly "
+        "one place. Nothing is written if any change fails to apply. Prefer this over write_file for fixes."
+    ),
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_path": types.Schema(
+                type=types.Type.STRING,
+                description="Relative path to the file to edit.",
+            ),
+            "edits": types.Schema(
+                type=types.Type.ARRAY,
+                description="Replacements to make. Include enough surrounding lines in search to be unique.",
+                items=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={
+                        "search": types.Schema(
+                            type=types.Type.STRING,
+                            description="Exact existing text to replace, including indentation.",
+                        ),
+                        "replace": types.Schema(
+                            type=types.Type.STRING,
+                            description="Text to put in its place.",
+                        ),
+                    },
+                    required=["search", "replace"],
+                ),
+            ),
+            "diff": types.Schema(
+                type=types.Type.STRING,
+                description="Unified diff of the file (with @@ hunk headers), used instead of edits.",
+            ),
+        },
+        required=["file_path"],
+    ),
+)
+
+schema_search_files = types.FunctionDeclaration(
+    name="search_files",
+    description=(
+        "Searches the text files in the working directory for lines matching a literal string or regular "
+        "expression and returns them as path:line: text. Use it to find where a symbol is defined or used."
+    ),
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "query": types.Schema(
+                type=types.Type.STRING,
+                description="Text to look for; a Python regular expression when regex is true. Matched per line.",
+            ),
+            "directory": types.Schema(
+                type=types.Type.STRING,
+                description="Only search below this directory, relative to the working directory.",
+            ),
+            "regex": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Treat query as a regular expression instead of a literal string.",
+            ),
+            "ignore_case": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Match regardless of letter case.",
+            ),
+            "max_results": types.Schema(
+                type=types.Type.INTEGER,
+                description="Maximum number of matching lines to return (default 50).",
+            ),
+        },
+        required=["query"],
+    ),
+)
+
 schema_run_python_file = types.FunctionDeclaration(
     name="run_python_file",
     description="Executes a Python file with optional string arguments inside the working directory and returns its output.",
@@ -150,6 +406,33 @@ schema_run_python_file = types.FunctionDeclaration(
                 description="Optional list of string arguments passed to the script.",
                 items=types.Schema(type=types.Type.STRING),
             ),
+            "rerun": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Run again even if an identical earlier run (same script, imported local modules and args) has a cached result.",
+            ),
+        },
+    ),
+)
+
+
+schema_run_tests = types.FunctionDeclaration(
+    name="run_tests",
+    description="Discovers unittest/pytest tests in the working directory, runs them in parallel processes and returns pass/fail counts with tracebacks of failing tests only.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "path": types.Schema(
+                type=types.Type.STRING,
+                description="Test file or directory to search for tests, relative to the working directory. Defaults to the working directory itself.",
+            ),
+            "pattern": types.Schema(
+                type=types.Type.STRING,
+                description='Glob matched against test file names. Defaults to "test*.py".',
+            ),
+            "runner": types.Schema(
+                type=types.Type.STRING,
+                description='"pytest", "unittest", or "auto" (default: pytest when installed).',
+            ),
         },
     ),
 )
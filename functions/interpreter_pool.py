@@ -0,0 +1,141 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+from functions.config import INTERPRETER_POOL_PRELOAD, MAX_OUTPUT_BYTES, OUTPUT_KILL_BYTES
+
+_FORK_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_fork_server.py")
+
+
+class InterpreterPool:
+    """Pool of pre-started Python interpreters for running scripts.
+
+    Each worker is a small fork server (`_fork_server.py`) that imports the
+    `preload` modules once; every script then runs in a fresh child forked
+    from a worker, so it is isolated from other runs but skips interpreter
+    startup and those imports. Requires `os.fork` (POSIX only).
+    """
+
+    def __init__(self, size=2, preload=INTERPRETER_POOL_PRELOAD):
+        self.size = size
+        self.preload = tuple(preload)
+        self.runs = 0
+        self._idle = queue.Queue()
+        self._workers = []
+        # Workers being started; they count against `size` before they exist
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def supported():
+        return hasattr(os, "fork")
+
+    def _reserve(self, count=1):
+        """Reserve up to `count` free slots under the lock; return how many were reserved."""
+        with self._lock:
+            count = max(0, min(count, self.size - len(self._workers) - self._pending))
+            self._pending += count
+        return count
+
+    def _spawn(self, reserved=False):
+        """Start a worker; `reserved` means a slot was taken with `_reserve` for it."""
+        try:
+            worker = subprocess.Popen(
+                [sys.executable, _FORK_SERVER, *self.preload],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+            )
+        except BaseException:
+            if reserved:
+                with self._lock:
+                    self._pending -= 1
+            raise
+        with self._lock:
+            self._workers.append(worker)
+            if reserved:
+                self._pending -= 1
+        return worker
+
+    def _retire(self, worker):
+        worker.kill()
+        worker.wait()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def start(self):
+        """Start all workers now so the first run finds them warm."""
+        for _ in range(self._reserve(self.size)):
+            self._idle.put(self._spawn(reserved=True))
+        return self
+
+    def run(
+        self,
+        target,
+        args,
+        cwd,
+        timeout,
+        max_output_bytes=MAX_OUTPUT_BYTES,
+        kill_after=OUTPUT_KILL_BYTES,
+        limits=None,
+    ):
+        """Run `target` with `args` in `cwd`; return (stdout, stderr, returncode).
+
+        Output is capped, `limits` applied and the script's process group
+        killed as in `functions.output_capture.run_captured`. Raises
+        `subprocess.TimeoutExpired` if the script outlives `timeout`.
+        """
+        if self._closed:
+            raise RuntimeError("interpreter pool is closed")
+        # The slot is reserved before spawning, so concurrent callers cannot overgrow the pool
+        grow = self._idle.empty() and self._reserve() == 1
+        worker = self._spawn(reserved=True) if grow else self._idle.get()
+
+        request = {
+            "target": target,
+            "args": list(args),
+            "cwd": cwd,
+            "timeout": timeout,
+            "max_output_bytes": max_output_bytes,
+            "kill_after": kill_after,
+            "limits": limits.as_dict() if limits is not None else None,
+        }
+        try:
+            worker.stdin.write(json.dumps(request) + "\n")
+            worker.stdin.flush()
+            line = worker.stdout.readline()
+            if not line:
+                raise RuntimeError("interpreter pool worker exited unexpectedly")
+            reply = json.loads(line)
+        except BaseException:
+            # The worker's protocol state is unknown; replace it
+            self._retire(worker)
+            if not self._closed and self._reserve():
+                self._idle.put(self._spawn(reserved=True))
+            raise
+        self._idle.put(worker)
+
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        self.runs += 1
+        if reply["timed_out"]:
+            raise subprocess.TimeoutExpired([sys.executable, target, *args], timeout)
+        return reply["stdout"], reply["stderr"], reply["returncode"]
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                worker.stdin.close()
+            except OSError:
+                pass
+            self._retire(worker)
@@ -0,0 +1,125 @@
+import os
+import select
+import signal
+import time
+from dataclasses import asdict, dataclass
+
+from functions.config import RUN_CPU_SECONDS, RUN_FILE_SIZE_BYTES, RUN_MEMORY_BYTES, RUN_OPEN_FILES
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_MIB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class RunLimits:
+    """Resource limits applied to a script run by `run_python_file`.
+
+    `apply` is called in the process that becomes the script (by
+    `_limited_exec.py`, or in a fork server child) before the script
+    starts. CPU time is enforced with SIGXCPU (then SIGKILL a second later),
+    address space and open files make allocations and `open` fail, and files
+    the script writes stop at `file_size_bytes`. None leaves a limit as
+    inherited. Limits above the inherited hard limit are lowered to it.
+    """
+
+    cpu_seconds: int | None = RUN_CPU_SECONDS
+    memory_bytes: int | None = RUN_MEMORY_BYTES
+    open_files: int | None = RUN_OPEN_FILES
+    file_size_bytes: int | None = RUN_FILE_SIZE_BYTES
+
+    @staticmethod
+    def supported():
+        return resource is not None
+
+    def as_dict(self):
+        return asdict(self)
+
+    def apply(self):
+        if resource is None:
+            return
+        for name, soft, hard in (
+            ("RLIMIT_CPU", self.cpu_seconds, None if self.cpu_seconds is None else self.cpu_seconds + 1),
+            ("RLIMIT_AS", self.memory_bytes, self.memory_bytes),
+            ("RLIMIT_NOFILE", self.open_files, self.open_files),
+            ("RLIMIT_FSIZE", self.file_size_bytes, self.file_size_bytes),
+        ):
+            kind = getattr(resource, name, None)
+            if soft is None or kind is None:
+                continue
+            _, current_hard = resource.getrlimit(kind)
+            if current_hard != resource.RLIM_INFINITY:
+                soft, hard = min(soft, current_hard), min(hard, current_hard)
+            try:
+                resource.setrlimit(kind, (soft, hard))
+            except (ValueError, OSError):
+                pass
+
+    def describe(self, timeout=None, output_bytes=None):
+        """Return a one-line summary of the limits, as shown with a run's result."""
+        parts = []
+        if timeout is not None:
+            parts.append(f"wall {timeout:g}s")
+        if not self.supported():
+            parts.append("no CPU/memory/file limits on this platform")
+        else:
+            if self.cpu_seconds is not None:
+                parts.append(f"CPU {self.cpu_seconds}s")
+            if self.memory_bytes is not None:
+                parts.append(f"memory {self.memory_bytes // _MIB} MiB")
+            if self.open_files is not None:
+                parts.append(f"open files {self.open_files}")
+            if self.file_size_bytes is not None:
+                parts.append(f"file size {self.file_size_bytes // _MIB} MiB")
+        if output_bytes is not None:
+            parts.append(f"output {output_bytes // _MIB} MiB")
+        return "Limits: " + ", ".join(parts)
+
+    def explain(self, returncode):
+        """Describe the limit that killed a child exiting with `returncode`, or None.
+
+        Only the CPU limit ends a process with its own signal: Python ignores
+        SIGXFSZ (writes past the file size limit raise OSError instead) and
+        reports running out of address space as MemoryError.
+        """
+        if hasattr(signal, "SIGXCPU") and returncode == -signal.SIGXCPU:
+            return f"CPU time limit of {self.cpu_seconds}s exceeded"
+        return None
+
+
+def kill_group(pid):
+    """SIGKILL the process group led by `pid`, ignoring a group that is already gone."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def wait_exited(pid, timeout=None):
+    """Wait up to `timeout` seconds (None: no limit) for child `pid` to exit; return whether it did.
+
+    The child is left unreaped, so its process group id stays reserved and
+    `kill_group` cannot hit an unrelated group that reused it.
+    """
+    flags = os.WEXITED | os.WNOWAIT
+    if timeout is None:
+        os.waitid(os.P_PID, pid, flags)
+        return True
+    deadline = time.monotonic() + timeout
+    pidfd = os.pidfd_open(pid) if hasattr(os, "pidfd_open") else None
+    try:
+        while os.waitid(os.P_PID, pid, flags | os.WNOHANG) is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if pidfd is not None:
+                select.select([pidfd], [], [], remaining)
+            else:
+                time.sleep(min(remaining, 0.005))
+        return True
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
@@ -0,0 +1,208 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+from functions.config import MAX_OUTPUT_BYTES, OUTPUT_KILL_BYTES
+from functions.limits import kill_group, wait_exited
+
+CHUNK_SIZE = 65536
+
+_LIMITED_EXEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_limited_exec.py")
+
+# How long to keep draining pipes after the process has exited; grandchildren
+# holding the pipes open must not block the caller forever.
+DRAIN_GRACE_SECONDS = 1.0
+
+
+class CappedBuffer:
+    """Keeps the first and last bytes of a stream within a fixed budget.
+
+    The first `cap // 2` bytes are stored as-is; the rest goes through a ring
+    buffer holding only the most recent `cap - cap // 2` bytes, so memory stays
+    bounded no matter how much is written.
+    """
+
+    def __init__(self, cap=MAX_OUTPUT_BYTES):
+        self.head_size = cap // 2
+        self.tail_size = cap - self.head_size
+        self.total = 0
+        self._head = bytearray()
+        self._ring = bytearray(self.tail_size)
+        self._ring_pos = 0
+        self._ring_len = 0
+
+    def write(self, data):
+        self.total += len(data)
+        if len(self._head) < self.head_size:
+            room = self.head_size - len(self._head)
+            self._head += data[:room]
+            data = data[room:]
+        if not data or not self.tail_size:
+            return
+        if len(data) >= self.tail_size:
+            self._ring[:] = data[-self.tail_size:]
+            self._ring_pos = 0
+            self._ring_len = self.tail_size
+            return
+        end = self._ring_pos + len(data)
+        if end <= self.tail_size:
+            self._ring[self._ring_pos:end] = data
+        else:
+            split = self.tail_size - self._ring_pos
+            self._ring[self._ring_pos:] = data[:split]
+            self._ring[: end - self.tail_size] = data[split:]
+        self._ring_pos = end % self.tail_size
+        self._ring_len = min(self.tail_size, self._ring_len + len(data))
+
+    @property
+    def truncated(self):
+        return self.total > len(self._head) + self._ring_len
+
+    def _tail(self):
+        if self._ring_len < self.tail_size:
+            return bytes(self._ring[: self._ring_len])
+        return bytes(self._ring[self._ring_pos:] + self._ring[: self._ring_pos])
+
+    def getvalue(self):
+        head = bytes(self._head)
+        tail = self._tail()
+        if not self.truncated:
+            return (head + tail).decode("utf-8", errors="replace")
+        dropped = self.total - len(head) - len(tail)
+        return (
+            head.decode("utf-8", errors="replace")
+            + f"\n[... {dropped} bytes truncated ...]\n"
+            + tail.decode("utf-8", errors="replace")
+        )
+
+
+class OutputCapture:
+    """Drains a process's stdout and stderr pipes into capped buffers.
+
+    Once the combined output exceeds `kill_after` bytes, `on_limit` is called
+    (typically to kill the process) and a marker is appended to stderr. Each
+    pipe is closed by its reader thread when it reaches end of file.
+    """
+
+    def __init__(self, cap=MAX_OUTPUT_BYTES, kill_after=OUTPUT_KILL_BYTES, on_limit=None):
+        self.stdout = CappedBuffer(cap)
+        self.stderr = CappedBuffer(cap)
+        self.kill_after = kill_after
+        self.on_limit = on_limit
+        self.limit_exceeded = False
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self, stdout_file, stderr_file):
+        for pipe, buffer in ((stdout_file, self.stdout), (stderr_file, self.stderr)):
+            thread = threading.Thread(target=self._drain, args=(pipe, buffer), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _drain(self, pipe, buffer):
+        fd = pipe.fileno()
+        while True:
+            try:
+                data = os.read(fd, CHUNK_SIZE)
+            except OSError:
+                break
+            if not data:
+                break
+            with self._lock:
+                buffer.write(data)
+                over = (
+                    self.kill_after is not None
+                    and not self.limit_exceeded
+                    and self.stdout.total + self.stderr.total > self.kill_after
+                )
+                if over:
+                    self.limit_exceeded = True
+            if over and self.on_limit is not None:
+                self.on_limit()
+        pipe.close()
+
+    def join(self, timeout=DRAIN_GRACE_SECONDS):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def result(self):
+        """Return (stdout, stderr) text, with truncation and limit markers."""
+        with self._lock:
+            stdout = self.stdout.getvalue()
+            stderr = self.stderr.getvalue()
+        if self.limit_exceeded:
+            marker = f"[Process killed: output exceeded {self.kill_after} bytes]"
+            stderr = f"{stderr.rstrip()}\n{marker}" if stderr else marker
+        return stdout, stderr
+
+
+def run_captured(cmd, cwd, timeout, cap=MAX_OUTPUT_BYTES, kill_after=OUTPUT_KILL_BYTES, limits=None):
+    """Run `cmd` streaming its output into capped buffers.
+
+    On POSIX the process leads its own process group, and the whole group is
+    killed once the process exits, times out or floods its output, so
+    grandchildren it started cannot outlive the run. The process is reaped
+    only after that final kill, so the group id cannot have been reused. `limits` (a
+    `functions.limits.RunLimits`) is applied by `_limited_exec.py`, which
+    then execs `cmd`; no Python code runs in the forked child, so this is
+    safe to call from threads.
+
+    Returns (stdout, stderr, returncode); raises `subprocess.TimeoutExpired`
+    after killing the process if it outlives `timeout`.
+    """
+    posix = os.name == "posix"
+    if limits is not None and posix and limits.supported():
+        program = shutil.which(cmd[0]) or cmd[0]
+        cmd = [sys.executable, "-S", _LIMITED_EXEC, json.dumps(limits.as_dict()), program, *cmd[1:]]
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        process_group=0 if posix else None,
+    )
+    if not posix:
+        capture = OutputCapture(cap=cap, kill_after=kill_after, on_limit=proc.kill)
+        capture.start(proc.stdout, proc.stderr)
+        try:
+            returncode = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise
+        finally:
+            capture.join()
+        stdout, stderr = capture.result()
+        return stdout, stderr, returncode
+
+    # The group id may be reused once the process is reaped, so killing it
+    # (also from the capture threads) and reaping are serialized
+    lock = threading.Lock()
+    reaped = False
+
+    def kill():
+        with lock:
+            if not reaped:
+                kill_group(proc.pid)
+
+    capture = OutputCapture(cap=cap, kill_after=kill_after, on_limit=kill)
+    capture.start(proc.stdout, proc.stderr)
+    exited = False
+    try:
+        exited = wait_exited(proc.pid, timeout)
+    finally:
+        with lock:
+            # Grandchildren left behind; the exited process still holds the group id
+            kill_group(proc.pid)
+            _, status = os.waitpid(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            reaped = True
+        capture.join()
+    if not exited:
+        raise subprocess.TimeoutExpired(proc.args, timeout)
+    stdout, stderr = capture.result()
+    return stdout, stderr, proc.returncode
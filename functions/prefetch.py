@@ -0,0 +1,110 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from functions.config import PREFETCH_EXTENSIONS, PREFETCH_MAX_BYTES, PREFETCH_MAX_FILES
+
+# `FileCache` tag of the entries a Prefetcher fills
+PREFETCH_TAG = "prefetch"
+
+
+class _PrefetchCache:
+    """View of a `FileCache` whose lookups fill entries tagged PREFETCH_TAG."""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def lookup(self, kind, path, compute, extra=()):
+        return self._cache.lookup(kind, path, compute, extra, filled_by=PREFETCH_TAG)
+
+
+class Prefetcher:
+    """Warms the files a listing just showed into a session's `FileCache`.
+
+    After `get_files_info` lists a directory, the model usually reads one of
+    the small source files in it next. `after_listing` reads up to
+    `max_files` of them (known text extensions, at most PREFETCH_MAX_BYTES,
+    smallest first, symlinks skipped) in background threads through
+    `get_file_content`, so the same sandbox checks apply and a later read of
+    the same path is a cache hit. Warmed entries are tagged in the cache, so
+    `stats` counts only reads actually served by one that was still valid;
+    `note_read` is told about every read to give the hit rate.
+    """
+
+    def __init__(self, cache, max_files=PREFETCH_MAX_FILES, max_workers=2):
+        self.cache = cache
+        self.max_files = max_files
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fikirfix-prefetch")
+        self._lock = threading.Lock()
+        # (working directory, normalized relative path) of every file warmed
+        self._warmed = set()
+        self.issued = 0
+        self.reads = 0
+
+    @staticmethod
+    def _key(working_directory, file_path):
+        abs_working = os.path.abspath(working_directory)
+        target = os.path.normpath(os.path.join(abs_working, file_path))
+        return abs_working, os.path.relpath(target, abs_working)
+
+    def _candidates(self, target, directory):
+        files = []
+        with os.scandir(target) as entries:
+            for entry in entries:
+                if entry.is_symlink() or not entry.is_file():
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in PREFETCH_EXTENSIONS:
+                    continue
+                size = entry.stat().st_size
+                if size <= PREFETCH_MAX_BYTES:
+                    rel = entry.name if os.path.normpath(directory) == "." else os.path.join(directory, entry.name)
+                    files.append((size, rel))
+        return [rel for _, rel in sorted(files)[: self.max_files]]
+
+    def after_listing(self, working_directory, directory="."):
+        """Start warming the small text files of a directory that was just listed."""
+        from functions.get_files_info import get_file_content
+
+        abs_working = os.path.abspath(working_directory)
+        target = os.path.abspath(os.path.join(working_directory, directory))
+        if not (target == abs_working or target.startswith(abs_working + os.sep)):
+            return []
+        try:
+            paths = self._candidates(target, directory)
+        except OSError:
+            return []
+        started = []
+        with self._lock:
+            for rel in paths:
+                key = self._key(abs_working, rel)
+                if key not in self._warmed:
+                    self._warmed.add(key)
+                    started.append(rel)
+            self.issued += len(started)
+        view = _PrefetchCache(self.cache)
+        for rel in started:
+            self._pool.submit(get_file_content, working_directory, rel, cache=view)
+        return started
+
+    def note_read(self, working_directory, file_path):
+        """Record a read of `file_path`; return True if it is a file that was prefetched."""
+        key = self._key(working_directory, file_path)
+        with self._lock:
+            self.reads += 1
+            return key in self._warmed
+
+    def stats(self):
+        with self._lock:
+            reads = self.reads
+        used = self.cache.filled_hits.get(PREFETCH_TAG, 0)
+        return {
+            "prefetched": self.issued,
+            "used": used,
+            "reads": reads,
+            # Share of reads served by a prefetched cache entry
+            "hit_rate": used / reads if reads else 0.0,
+        }
+
+    def close(self, wait=False):
+        """Stop the worker threads; with `wait`, finish the pending reads first."""
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,122 @@
+import mmap
+import os
+import threading
+from array import array
+
+
+class LineIndex:
+    """Byte offsets of line starts in a file, built lazily.
+
+    Only the part of the file up to the last requested line is scanned, and
+    the offsets found are kept (the index is cached per file version by
+    `FileCache`), so paging forward through a large file costs O(window).
+    """
+
+    def __init__(self):
+        self.starts = array("Q", [0])
+        self.complete = False
+        self._scanned = 0
+        self._lock = threading.Lock()
+
+    def _scan_line(self, mm):
+        pos = mm.find(b"\n", self._scanned)
+        if pos == -1:
+            self._scanned = len(mm)
+            self.complete = True
+            return
+        self._scanned = pos + 1
+        self.starts.append(pos + 1)
+
+    def _extend(self, mm, line):
+        # Make sure starts[line] exists (the start of 1-based line `line + 1`)
+        while len(self.starts) <= line and not self.complete:
+            self._scan_line(mm)
+
+    def line_count(self, size):
+        """Number of lines, or None if the file has not been fully scanned."""
+        if not self.complete:
+            return None
+        count = len(self.starts)
+        # A trailing newline does not start another line
+        if self.starts[-1] == size:
+            count -= 1
+        return count
+
+    def span(self, mm, start_line, end_line):
+        """Return the byte range covering 1-based lines start_line..end_line."""
+        with self._lock:
+            self._extend(mm, end_line)
+            if start_line > len(self.starts) or self.starts[start_line - 1] >= len(mm):
+                return len(mm), len(mm)
+            begin = self.starts[start_line - 1]
+            end = self.starts[end_line] if end_line < len(self.starts) else len(mm)
+            return begin, end
+
+    def line_at(self, mm, offset):
+        """Return the 1-based line containing byte `offset`."""
+        with self._lock:
+            while self._scanned <= offset and not self.complete:
+                self._scan_line(mm)
+            low, high = 0, len(self.starts) - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                if self.starts[mid] <= offset:
+                    low = mid
+                else:
+                    high = mid - 1
+            return low + 1
+
+
+def _open_map(target):
+    with open(target, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_lines(target, file_path, start_line, end_line, max_bytes, index):
+    """Read 1-based inclusive lines start_line..end_line (None: as many as fit)."""
+    mm = _open_map(target)
+    if mm is None:
+        return ""
+    with mm:
+        size = len(mm)
+        begin = index.span(mm, start_line, start_line)[0]
+        if begin >= size:
+            total = index.line_count(size)
+            return f'[File "{file_path}" has only {total} lines]'
+
+        end = index.span(mm, start_line, end_line)[1] if end_line is not None else size
+        if end - begin > max_bytes:
+            # Cut the window on a line boundary when one fits
+            limit = begin + max_bytes
+            cut = mm.rfind(b"\n", begin, limit) + 1
+            end = cut if cut > begin else limit
+
+        content = mm[begin:end].decode("utf-8", errors="replace")
+        if end >= size:
+            return content
+        shown_to = index.line_at(mm, end - 1)
+        total = index.line_count(size)
+        of_total = f" of {total}" if total is not None else ""
+        if end_line is not None and shown_to >= end_line:
+            return content
+        return (
+            content
+            + f'\n[...Showing lines {start_line}-{shown_to}{of_total} of "{file_path}";'
+            + f" continue with start_line={shown_to + 1}]"
+        )
+
+
+def read_bytes(target, file_path, offset, length, max_bytes):
+    """Read `length` bytes (at most `max_bytes`) starting at byte `offset`."""
+    mm = _open_map(target)
+    if mm is None:
+        return ""
+    with mm:
+        size = len(mm)
+        end = min(size, offset + min(length, max_bytes))
+        content = mm[offset:end].decode("utf-8", errors="replace") if offset < size else ""
+        if end >= size:
+            return content
+        return content + f'\n[...Showing bytes {offset}-{end} of {size} in "{file_path}"; continue with offset={end}]'
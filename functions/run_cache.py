@@ -0,0 +1,124 @@
+import ast
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Marker put in front of a result served from the cache
+CACHED_NOTE = "(cached: script, its local imports and args are unchanged since an identical earlier run)"
+
+
+def _module_files(base, dotted):
+    """Files that importing `dotted` from directory `base` would execute."""
+    files = []
+    parts = dotted.split(".") if dotted else []
+    for i in range(1, len(parts) + 1):
+        path = os.path.join(base, *parts[:i])
+        for candidate in (path + ".py", os.path.join(path, "__init__.py")):
+            if os.path.isfile(candidate):
+                files.append(candidate)
+    return files
+
+
+def _imports(path, script_dir):
+    """Local files imported by the Python file at `path`."""
+    try:
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                found += _module_files(script_dir, alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = os.path.dirname(path)
+                for _ in range(node.level - 1):
+                    base = os.path.dirname(base)
+            else:
+                base = script_dir
+            module = node.module or ""
+            found += _module_files(base, module)
+            for alias in node.names:
+                # `from pkg import name` may import the submodule pkg/name.py
+                found += _module_files(base, f"{module}.{alias.name}" if module else alias.name)
+    return found
+
+
+def local_imports(target, root):
+    """Return the sorted files under `root` that `target` imports, directly or not.
+
+    Imports are found statically with `ast` and resolved the way running
+    `target` as a script would: absolute imports from its directory, relative
+    imports from the importing file's package. Dynamic imports are missed.
+    """
+    root = os.path.abspath(root)
+    script_dir = os.path.dirname(os.path.abspath(target))
+    seen = set()
+    pending = [os.path.abspath(target)]
+    while pending:
+        path = pending.pop()
+        for found in _imports(path, script_dir):
+            found = os.path.abspath(found)
+            if found not in seen and found.startswith(root + os.sep):
+                seen.add(found)
+                pending.append(found)
+    seen.discard(os.path.abspath(target))
+    return sorted(seen)
+
+
+class RunCache:
+    """Session-scoped LRU cache of `run_python_file` results.
+
+    Entries are keyed on a SHA-256 of the script, every local file it
+    imports, the arguments and the run settings, so an entry is found again
+    only while none of those has changed. Data files a script reads are not
+    part of the key; call `clear` when one is written.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(working_directory, target, args, settings=()):
+        digest = hashlib.sha256()
+        digest.update(repr((sys.executable, sys.version, list(args), settings)).encode())
+        root = os.path.abspath(working_directory)
+        for path in [os.path.abspath(target)] + local_imports(target, root):
+            with open(path, "rb") as f:
+                data = f.read()
+            digest.update(f"\0{os.path.relpath(path, root)}\0{len(data)}\0".encode())
+            digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
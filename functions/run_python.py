@@ -1,109 +1,59 @@
 import os
-import subprocess
-import shlex
-
-
-def run_python_file(working_directory, file_path, args=None):
-    try:
-        if args is None:
-            args = []
-        abs_working = os.path.abspath(working_directory)
-        target = os.path.abspath(os.path.join(working_directory, file_path))
-
-        if not (target == abs_working or target.startswith(abs_working + os.sep)):
-            return f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory'
-
-        if not os.path.exists(target):
-            return f'Error: File "{file_path}" not found.'
-
-        if not target.endswith('.py'):
-            return f'Error: "{file_path}" is not a Python file.'
-
-        cmd = ["python", target, *args]
-        try:
-            completed = subprocess.run(
-                cmd,
-                cwd=abs_working,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=30,
-                text=True,
-            )
-        except subprocess.TimeoutExpired:
-            return "Error: executing Python file: timeout after 30 seconds"
-
-        stdout = completed.stdout.strip()
-        stderr = completed.stderr.strip()
-        parts = ["STDOUT:", stdout] if stdout else []
-        parts += ["STDERR:", stderr] if stderr else []
-        if completed.returncode != 0:
-            parts.append(f"Process exited with code {completed.returncode}")
-        if not parts:
-            return "No output produced."
-        return "\n".join(parts)
-    except Exception as e:
-        return f"Error: executing Python file: {e}"
-import os
-import subprocess
-
-
-def run_python_file(working_directory, file_path, args=None):
-    if args is None:
-        args = []
-
-    try:
-        abs_working = os.path.abspath(working_directory)
-        target = os.path.abspath(os.path.join(working_directory, file_path))
+import sys
 
-        if not (target == abs_working or target.startswith(abs_working + os.sep)):
-            return f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory'
+from functions.config import MAX_OUTPUT_BYTES, OUTPUT_KILL_BYTES
+from functions.limits import RunLimits
+from functions.run_cache import CACHED_NOTE
+from functions.output_capture import run_captured
 
-        if not os.path.exists(target):
-            return f'Error: File "{file_path}" not found.'
+RUN_TIMEOUT = 30
 
-        if not file_path.endswith('.py'):
-            return f'Error: "{file_path}" is not a Python file.'
 
-        # Build command: use same python interpreter
-        cmd = ["python", target] + list(args)
+def format_run_result(stdout, stderr, returncode):
+    out = stdout or ""
+    err = stderr or ""
 
-        try:
-            completed = subprocess.run(
-                cmd,
-                cwd=working_directory,
-                capture_output=True,
-                text=True,
-                timeout=30,
-            )
-        except Exception as e:
-            return f"Error: executing Python file: {e}"
+    parts = []
+    if out:
+        parts.append("STDOUT:\n" + out.rstrip())
+    else:
+        parts.append("STDOUT:")
 
-        stdout = completed.stdout or ""
-        stderr = completed.stderr or ""
+    if err:
+        parts.append("STDERR:\n" + err.rstrip())
+    else:
+        parts.append("STDERR:")
 
-        parts = []
-        if stdout:
-            parts.append("STDOUT:\n" + stdout)
-        if stderr:
-            parts.append("STDERR:\n" + stderr)
+    if returncode != 0:
+        parts.append(f"Process exited with code {returncode}")
 
-        if completed.returncode != 0:
-            parts.append(f"Process exited with code {completed.returncode}")
+    result = "\n".join(parts).strip()
+    if not result:
+        return "No output produced."
+    return result
 
-        if not parts:
-            return "No output produced."
 
-        return "\n".join(parts)
-    except Exception as e:
-        return f"Error: executing Python file: {e}"
-import os
-import sys
-import subprocess
+def run_python_file(working_directory, file_path, args=None, pool=None, limits=None, run_cache=None, rerun=False):
+    """Run a Python file inside the working directory and report its output.
 
+    Output is streamed into buffers keeping the head and tail of each stream
+    (MAX_OUTPUT_BYTES); a script producing more than OUTPUT_KILL_BYTES is
+    killed. The script runs under `limits` (default: `RunLimits()`, the
+    RUN_* settings) in its own process group, which is killed as a unit when
+    the run ends; the limits are listed at the end of the result. With `pool`
+    (an `InterpreterPool`), the script runs in a child forked from a
+    pre-started interpreter instead of a fresh `python` process.
 
-def run_python_file(working_directory, file_path, args=None):
+    With `run_cache` (a `RunCache`), a run whose script, local imports and
+    arguments match an earlier completed run returns that run's result,
+    marked as cached, unless `rerun` is set. Runs killed by a signal are
+    not cached.
+    """
     if args is None:
         args = []
+    if limits is None:
+        limits = RunLimits()
+    limits_line = limits.describe(timeout=RUN_TIMEOUT, output_bytes=OUTPUT_KILL_BYTES)
     try:
         abs_working = os.path.abspath(working_directory)
         target = os.path.abspath(os.path.join(working_directory, file_path))
@@ -117,40 +67,50 @@ def run_python_file(working_directory, file_path, args=None):
         if not file_path.endswith('.py'):
             return f'Error: "{file_path}" is not a Python file.'
 
+        key = None
+        if run_cache is not None:
+            try:
+                key = run_cache.key(abs_working, target, args, (RUN_TIMEOUT, limits.as_dict()))
+            except OSError:
+                # A file vanished while hashing; just run the script
+                run_cache = None
+        if key is not None:
+            cached = None if rerun else run_cache.get(key)
+            if cached is not None:
+                return f"{CACHED_NOTE}\n{cached}"
+
         cmd = [sys.executable, target] + list(args)
 
         try:
-            completed = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=30,
-                cwd=working_directory,
-            )
+            if pool is not None:
+                stdout, stderr, returncode = pool.run(
+                    target,
+                    list(args),
+                    cwd=abs_working,
+                    timeout=RUN_TIMEOUT,
+                    max_output_bytes=MAX_OUTPUT_BYTES,
+                    kill_after=OUTPUT_KILL_BYTES,
+                    limits=limits,
+                )
+            else:
+                stdout, stderr, returncode = run_captured(
+                    cmd,
+                    cwd=working_directory,
+                    timeout=RUN_TIMEOUT,
+                    cap=MAX_OUTPUT_BYTES,
+                    kill_after=OUTPUT_KILL_BYTES,
+                    limits=limits,
+                )
         except Exception as e:
-            return f'Error: executing Python file: {e}'
-
-        out = completed.stdout or ""
-        err = completed.stderr or ""
-
-        parts = []
-        if out:
-            parts.append("STDOUT:\n" + out.rstrip())
-        else:
-            parts.append("STDOUT:")
-
-        if err:
-            parts.append("STDERR:\n" + err.rstrip())
-        else:
-            parts.append("STDERR:")
-
-        if completed.returncode != 0:
-            parts.append(f"Process exited with code {completed.returncode}")
-
-        result = "\n".join(parts).strip()
-        if not result:
-            return "No output produced."
+            return f'Error: executing Python file: {e}\n{limits_line}'
+
+        result = format_run_result(stdout, stderr, returncode)
+        reason = limits.explain(returncode)
+        if reason:
+            result += f"\nStopped: {reason}"
+        result = f"{result}\n{limits_line}"
+        if key is not None and returncode >= 0:
+            run_cache.put(key, result)
         return result
 
     except Exception as e:
@@ -0,0 +1,192 @@
+import fnmatch
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from functions.config import MAX_CHARS, TESTS_MAX_DETAIL_CHARS, TESTS_MAX_WORKERS
+from functions.file_index import SKIP_DIRS
+from functions.limits import RunLimits
+from functions.output_capture import run_captured
+from functions.run_python import RUN_TIMEOUT
+
+_SHARD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_test_shard.py")
+
+RUNNERS = ("auto", "pytest", "unittest")
+
+# Order in which outcomes are reported; a test reported twice keeps the worst
+_OUTCOMES = ("failed", "error", "timeout", "skipped", "passed")
+
+
+def _find_test_files(abs_working, target, pattern):
+    if os.path.isfile(target):
+        return [os.path.relpath(target, abs_working)]
+    found = []
+    for root, dirs, files in os.walk(target):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith("."))
+        for name in sorted(files):
+            if name.endswith(".py") and fnmatch.fnmatch(name, pattern):
+                found.append(os.path.relpath(os.path.join(root, name), abs_working))
+    return found
+
+
+def _run_worker(command, runner, items, cwd, timeout, limits):
+    """Run one _test_shard.py process under `limits`; return (records, stderr, finished)."""
+    fd, out_path = tempfile.mkstemp(prefix="fikirfix-tests-", suffix=".jsonl")
+    os.close(fd)
+    try:
+        cmd = [sys.executable, _SHARD_SCRIPT, command, runner, out_path] + list(items)
+        try:
+            _, stderr, returncode = run_captured(cmd, cwd=cwd, timeout=max(timeout, 0.1), limits=limits)
+            reason = limits.explain(returncode)
+            if reason:
+                stderr = f"{stderr.rstrip()}\nStopped: {reason}".lstrip()
+            finished = True
+        except subprocess.TimeoutExpired:
+            stderr, finished = "", False
+        with open(out_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.endswith("\n")]
+    finally:
+        os.unlink(out_path)
+    return records, stderr, finished
+
+
+def _shorten(text):
+    text = (text or "").rstrip()
+    if len(text) > TESTS_MAX_DETAIL_CHARS:
+        return "...\n" + text[-TESTS_MAX_DETAIL_CHARS:]
+    return text
+
+
+@dataclass
+class TestRun:
+    """Outcome of one `run_test_suite` call."""
+
+    __test__ = False  # not a test class, despite the name
+
+    runner: str
+    # test id -> (outcome, details); outcome is one of _OUTCOMES
+    results: dict
+    processes: int
+    elapsed: float
+
+    def counts(self):
+        counts = {outcome: 0 for outcome in _OUTCOMES}
+        for outcome, _ in self.results.values():
+            counts[outcome] += 1
+        return counts
+
+
+def format_test_report(run):
+    """Summarize a `TestRun` as a count line plus failure details."""
+    counts = run.counts()
+    summary = ", ".join(f"{counts[o]} {o}" for o in _OUTCOMES if counts[o] or o == "passed")
+    processes = f"{run.processes} process" if run.processes == 1 else f"{run.processes} processes"
+    lines = [f"Ran {len(run.results)} tests ({run.runner}, {processes}) in {run.elapsed:.1f}s: {summary}"]
+    for test_id, (outcome, details) in run.results.items():
+        if outcome in ("failed", "error", "timeout"):
+            lines.append(f"\n{outcome.upper()}: {test_id}\n{_shorten(details)}".rstrip())
+    report = "\n".join(lines)
+    if len(report) > MAX_CHARS:
+        report = report[:MAX_CHARS] + f'\n[...report truncated at {MAX_CHARS} characters]'
+    return report
+
+
+def run_tests(
+    working_directory, path=".", pattern="test*.py", runner="auto", workers=None, timeout=RUN_TIMEOUT, limits=None
+):
+    """Discover tests under `path`, run them sharded over processes, and summarize.
+
+    See `run_test_suite`; returns its report as text, ending with the limits
+    every test process ran under, or an error message.
+    """
+    if limits is None:
+        limits = RunLimits()
+    try:
+        outcome = run_test_suite(working_directory, path, pattern, runner, workers, timeout, limits)
+    except Exception as e:
+        return f"Error: running tests: {e}"
+    if isinstance(outcome, str):
+        return outcome
+    return f"{format_test_report(outcome)}\n{limits.describe(timeout=timeout)}"
+
+
+def run_test_suite(
+    working_directory, path=".", pattern="test*.py", runner="auto", workers=None, timeout=RUN_TIMEOUT, limits=None
+):
+    """Discover tests under `path` and run them sharded over processes.
+
+    Test files matching `pattern` are collected in one child process, then
+    their test ids are dealt round-robin to up to `workers` processes
+    (default: the CPU count; never more than TESTS_MAX_WORKERS) running at
+    the same time. `runner` "auto" uses pytest when it is installed and unittest
+    otherwise. The whole run shares one `timeout`; tests a shard had not
+    finished by then are reported as timed out. Only failing tests carry
+    details (tracebacks). Every process runs under `limits` (default:
+    `RunLimits()`, as for `run_python_file`), each with its own allowance.
+    Returns a `TestRun`, or a message when there is nothing to run.
+    """
+    if limits is None:
+        limits = RunLimits()
+    abs_working = os.path.abspath(working_directory)
+    target = os.path.abspath(os.path.join(working_directory, path))
+
+    if not (target == abs_working or target.startswith(abs_working + os.sep)):
+        return f'Error: Cannot run tests in "{path}" as it is outside the permitted working directory'
+
+    if not os.path.exists(target):
+        return f'Error: "{path}" not found.'
+
+    if runner not in RUNNERS:
+        return f'Error: Unknown test runner "{runner}"; use one of {", ".join(RUNNERS)}'
+    if runner == "auto":
+        runner = "pytest" if importlib.util.find_spec("pytest") else "unittest"
+
+    files = _find_test_files(abs_working, target, pattern)
+    if not files:
+        return f'No test files matching "{pattern}" found in "{path}".'
+
+    started = time.perf_counter()
+    deadline = started + timeout
+    records, stderr, finished = _run_worker("collect", runner, files, abs_working, timeout, limits)
+    if not finished:
+        return f"Error: Test collection did not finish within {timeout} seconds"
+
+    results = {}
+    ids = []
+    for record in records:
+        if "outcome" in record:
+            results[record["id"]] = (record["outcome"], record["details"])
+        elif record["id"] not in ids:
+            ids.append(record["id"])
+    if not ids and not results:
+        return f"Error: No tests collected from {', '.join(files)}\n{stderr}".rstrip()
+
+    count = workers or min(TESTS_MAX_WORKERS, os.cpu_count() or 1)
+    count = max(1, min(count, TESTS_MAX_WORKERS, len(ids)))
+    shards = [ids[i::count] for i in range(count)] if ids else []
+
+    def run_shard(shard):
+        return shard, _run_worker("run", runner, shard, abs_working, deadline - time.perf_counter(), limits)
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        for shard, (records, stderr, finished) in pool.map(run_shard, shards):
+            reported = {}
+            for record in records:
+                previous = reported.get(record["id"])
+                if previous is None or _OUTCOMES.index(record["outcome"]) < _OUTCOMES.index(previous[0]):
+                    reported[record["id"]] = (record["outcome"], record["details"])
+            for test_id in shard:
+                if test_id in reported:
+                    results[test_id] = reported[test_id]
+                elif not finished:
+                    results[test_id] = ("timeout", f"Not finished within {timeout} seconds")
+                else:
+                    results[test_id] = ("error", f"Test process ended without reporting this test\n{stderr}")
+
+    return TestRun(runner, results, len(shards), time.perf_counter() - started)
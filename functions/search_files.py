@@ -0,0 +1,91 @@
+import os
+import re
+
+from functions.file_index import FileIndex
+from functions.trigram_index import TrigramIndex, required_literals
+
+# Longest part of a matching line shown in results
+MAX_LINE_CHARS = 200
+
+
+def _matching_lines(abs_path, pattern):
+    with open(abs_path, "r", encoding="utf-8", errors="replace") as f:
+        for number, line in enumerate(f, start=1):
+            if pattern.search(line):
+                yield number, line.strip()
+
+
+def search_files(
+    working_directory, query, directory=".", regex=False, ignore_case=False, max_results=None, index=None
+):
+    """Search the text files under `directory` for lines matching `query`.
+
+    `query` is a literal string unless `regex` is true; matching is per line.
+    Results are "path:line: text", capped at `max_results` (SEARCH_MAX_RESULTS
+    by default). `index` is a session's `TrigramIndex` for the working
+    directory; without one a temporary index is built.
+    """
+    try:
+        abs_working = os.path.abspath(working_directory)
+        target = os.path.abspath(os.path.join(working_directory, directory))
+
+        if not (target == abs_working or target.startswith(abs_working + os.sep)):
+            return f'Error: Cannot search "{directory}" as it is outside the permitted working directory'
+
+        if not os.path.isdir(target):
+            return f'Error: "{directory}" is not a directory'
+
+        if not isinstance(query, str) or not query:
+            return "Error: query must be a non-empty string"
+
+        from functions.config import SEARCH_MAX_RESULTS
+
+        limit = SEARCH_MAX_RESULTS if max_results is None else max_results
+        if isinstance(limit, float) and limit.is_integer():
+            limit = int(limit)
+        if not isinstance(limit, int) or limit < 1:
+            return "Error: max_results must be a positive integer"
+
+        flags = re.IGNORECASE if ignore_case else 0
+        if regex:
+            try:
+                pattern = re.compile(query, flags)
+            except re.error as e:
+                return f"Error: invalid regular expression: {e}"
+            literals = required_literals(query, flags)
+        else:
+            pattern = re.compile(re.escape(query), flags)
+            literals = [query]
+
+        if index is None:
+            index = TrigramIndex(FileIndex(abs_working))
+        index.refresh()
+
+        prefix = os.path.relpath(target, abs_working)
+        candidates = index.candidates(literals)
+        if prefix != ".":
+            candidates = [rel for rel in candidates if rel.startswith(prefix + os.sep)]
+
+        results = []
+        capped = False
+        for rel in candidates:
+            try:
+                for number, line in _matching_lines(os.path.join(abs_working, rel), pattern):
+                    if len(results) == limit:
+                        capped = True
+                        break
+                    results.append(f"{rel}:{number}: {line[:MAX_LINE_CHARS]}")
+            except OSError:
+                continue
+            if capped:
+                break
+
+        scanned = f"{len(candidates)} of {len(index)} indexed files scanned"
+        if not results:
+            return f'No matches for "{query}" ({scanned})'
+        lines = [f'{len(results)} match(es) for "{query}" ({scanned}):', *results]
+        if capped:
+            lines.append(f"[...Results capped at {limit} matches; narrow the query or the directory]")
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Error: {e}"
@@ -0,0 +1,60 @@
+import os
+import threading
+from dataclasses import dataclass, field
+
+from functions.config import WORKING_DIRECTORY
+from functions.file_cache import FileCache
+from functions.file_index import FileIndex
+from functions.interpreter_pool import InterpreterPool
+from functions.prefetch import Prefetcher
+from functions.run_cache import RunCache
+from functions.trigram_index import TrigramIndex
+
+
+@dataclass
+class ToolSession:
+    """State shared by the tool calls of one agent session.
+
+    Every tool call of the session is confined to `working_directory`.
+    `interpreter_pool` is optional and may be shared by several sessions.
+    `prefetcher`, when set, warms `file_cache` after directory listings.
+    `run_cache` holds `run_python_file` results keyed on script contents.
+    """
+
+    working_directory: str = WORKING_DIRECTORY
+    file_cache: FileCache = field(default_factory=FileCache)
+    interpreter_pool: InterpreterPool | None = None
+    prefetcher: Prefetcher | None = None
+    run_cache: RunCache = field(default_factory=RunCache)
+    file_indexes: dict = field(default_factory=dict)
+    search_indexes: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def file_index(self, root):
+        """Return the `FileIndex` for `root`, kept for the life of the session."""
+        root = os.path.abspath(root)
+        with self._lock:
+            if root not in self.file_indexes:
+                self.file_indexes[root] = FileIndex(root)
+            return self.file_indexes[root]
+
+    def search_index(self, root):
+        """Return the `TrigramIndex` for `root`, built on its session `FileIndex`."""
+        file_index = self.file_index(root)
+        with self._lock:
+            if file_index.root not in self.search_indexes:
+                self.search_indexes[file_index.root] = TrigramIndex(file_index)
+            return self.search_indexes[file_index.root]
+
+    def file_written(self, root, rel_path):
+        """Re-index `rel_path` in the search index for `root`, if one was built.
+
+        Writing anything but a Python file also empties `run_cache`, whose
+        keys only cover the scripts and modules a run imports.
+        """
+        if not rel_path.endswith(".py"):
+            self.run_cache.clear()
+        with self._lock:
+            index = self.search_indexes.get(os.path.abspath(root))
+        if index is not None:
+            index.update(rel_path)
@@ -0,0 +1,142 @@
+import os
+import threading
+from collections import defaultdict
+
+from functions.config import SEARCH_MAX_FILE_BYTES
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+def trigrams(text):
+    """Return the set of lowercased three-character substrings of `text`."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _collect_literals(items, literals):
+    run = []
+    for op, arg in items:
+        if op == sre_parse.LITERAL:
+            run.append(chr(arg))
+            continue
+        if run:
+            literals.append("".join(run))
+            run = []
+        if op == sre_parse.SUBPATTERN:
+            _collect_literals(arg[-1], literals)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and arg[0] >= 1:
+            # The repeated part occurs at least once
+            _collect_literals(arg[2], literals)
+    if run:
+        literals.append("".join(run))
+
+
+def required_literals(pattern, flags=0):
+    """Return strings that every match of the regex `pattern` must contain.
+
+    This is a conservative reading of the parsed pattern: alternations,
+    classes and optional parts contribute nothing. An empty list means the
+    index cannot narrow the search.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return []
+    literals = []
+    _collect_literals(parsed, literals)
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+class TrigramIndex:
+    """Trigram index of the text files under a `FileIndex` root.
+
+    Maps every lowercased trigram to the files containing it, so a search only
+    opens files that contain all trigrams of its required literals. `refresh`
+    re-reads only files whose (mtime_ns, size) changed; `update` re-indexes a
+    single file right after a tool wrote it. Binary files and files over
+    SEARCH_MAX_FILE_BYTES are not indexed.
+    """
+
+    def __init__(self, file_index, max_file_bytes=SEARCH_MAX_FILE_BYTES):
+        self.file_index = file_index
+        self.root = file_index.root
+        self.max_file_bytes = max_file_bytes
+        # relative path -> (signature, trigrams or None for skipped files)
+        self._files = {}
+        self._postings = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def _read_text(self, abs_path):
+        with open(abs_path, "rb") as f:
+            data = f.read(self.max_file_bytes + 1)
+        if len(data) > self.max_file_bytes or b"\0" in data[:8192]:
+            return None
+        return data.decode("utf-8", errors="replace")
+
+    def _remove(self, rel):
+        _, grams = self._files.pop(rel)
+        for gram in grams or ():
+            posting = self._postings[gram]
+            posting.discard(rel)
+            if not posting:
+                del self._postings[gram]
+
+    def _update(self, rel):
+        abs_path = os.path.join(self.root, rel)
+        try:
+            st = os.stat(abs_path)
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+        known = self._files.get(rel)
+        if known is not None and known[0] == signature:
+            return
+        if known is not None:
+            self._remove(rel)
+        if signature is None:
+            return
+        try:
+            text = self._read_text(abs_path)
+        except OSError:
+            return
+        grams = frozenset(trigrams(text)) if text is not None else None
+        self._files[rel] = (signature, grams)
+        for gram in grams or ():
+            self._postings[gram].add(rel)
+
+    def refresh(self):
+        """Bring the index up to date with the files on disk."""
+        self.file_index.refresh()
+        paths = set(self.file_index.paths())
+        with self._lock:
+            for rel in [rel for rel in self._files if rel not in paths]:
+                self._remove(rel)
+            for rel in paths:
+                self._update(rel)
+
+    def update(self, rel_path):
+        """Re-index one file (given relative to the root) after it changed."""
+        rel = os.path.normpath(rel_path)
+        with self._lock:
+            self._update(rel)
+
+    def __len__(self):
+        with self._lock:
+            return sum(1 for _, grams in self._files.values() if grams is not None)
+
+    def candidates(self, literals=()):
+        """Return the indexed text files that may contain every string in `literals`, sorted."""
+        wanted = set()
+        for literal in literals:
+            wanted |= trigrams(literal)
+        with self._lock:
+            if not wanted:
+                return sorted(rel for rel, (_, grams) in self._files.items() if grams is not None)
+            postings = sorted((self._postings.get(gram, set()) for gram in wanted), key=len)
+            found = set(postings[0])
+            for posting in postings[1:]:
+                found &= posting
+            return sorted(found)
@@ -1,37 +1,63 @@
 import os
 import sys
 import json
-from dotenv import load_dotenv
-from google import genai
+import time
+import asyncio
+from dataclasses import dataclass, field
 from google.genai import types
 from functions.get_files_info import (
     schema_get_files_info,
     schema_get_file_content,
+    schema_get_files_content,
     schema_write_file,
+    schema_edit_file,
+    schema_search_files,
     schema_run_python_file,
+    schema_run_tests,
     get_files_info,
 )
-from functions.get_files_info import get_file_content, write_file
+from functions.get_files_info import get_file_content, get_files_content, write_file
+from functions.edit_file import edit_file
 from functions.run_python import run_python_file
-
-load_dotenv()
-API_KEY = os.environ.get("GEMINI_API_KEY")
-CLIENT = genai.Client(api_key=API_KEY) if API_KEY else None
+from functions.run_tests import run_tests
+from functions.search_files import search_files
+from functions.file_index import FileIndex
+from functions.config import WORKING_DIRECTORY
+from functions.interpreter_pool import InterpreterPool
+from functions.prefetch import Prefetcher
+from functions.session import ToolSession
+from fikirfix.context import DEFAULT_TOKEN_BUDGET, ContextCompactor
+from fikirfix.executor import ToolExecutor
+from fikirfix.cassette import RecordingModelClient
+from fikirfix.model_client import GeminiModelClient
+from fikirfix.prefix_cache import StaticPrefix
+from fikirfix.retry import DEFAULT_DEADLINE, ResilientClient
+from fikirfix.routing import DEFAULT_ESCALATE_AFTER, FixedModel, ModelStats, RoutingState, make_policy
+from fikirfix.session_log import RESUME_PROMPT, SessionLog, load_session, resolve_session
+from fikirfix.tracing import NULL_TRACER, Tracer
+
+# Shared model client, created on first use by get_client() so that importing
+# this module has no side effects.
+CLIENT = None
 
 # System prompt (single authoritative definition)
 SYSTEM_PROMPT = """
 You are an iterative, tool-using AI coding agent. You may call tools to inspect, run, or modify files. Available operations:
 
 - `get_files_info(directory=".")`: list files in a directory (relative to the working directory).
-- `get_file_content(file_path)`: read a text file (returns truncated content if large).
-- `run_python_file(file_path, args=[])`: run a Python script and return stdout/stderr.
+- `get_files_content(file_paths)`: read several files (paths or glob patterns) in one call.
+- `search_files(query, directory=".", regex=False, ignore_case=False, max_results=50)`: find matching lines across files, returned as path:line: text.
+- `get_file_content(file_path, start_line=None, end_line=None, offset=None, length=None)`: read a text file (returns truncated content if large; page through big files with a line or byte window).
+- `run_python_file(file_path, args=[], rerun=False)`: run a Python script and return stdout/stderr. Re-running an unchanged script with the same args returns the earlier result marked as cached; pass rerun=True only if it depends on something else that changed.
+- `run_tests(path=".", pattern="test*.py", runner="auto")`: run the unittest/pytest tests under a path in parallel and return a pass/fail summary with failing tracebacks.
 - `write_file(file_path, content)`: write or overwrite a file.
+- `edit_file(file_path, edits=[{"search": ..., "replace": ...}] or diff="unified diff")`: change part of an existing file; each search text or hunk must match exactly one place.
 
 Behavior and rules:
-1. On each turn, decide whether you need to call a tool. If you do, respond ONLY with a single function call and the minimal arguments required (no extra explanation).
+1. On each turn, decide whether you need to call a tool. If you do, respond ONLY with function calls and the minimal arguments required (no extra explanation). Independent reads may be requested together in one turn; they run concurrently. When you need several related files, read them with a single `get_files_content` call.
 2. After making a function call, wait for the tool result and incorporate it into your next decision. Do not assume results you have not received.
-3. Prefer to discover paths by listing directories (`get_files_info`) before attempting to read a file with `get_file_content`.
-4. Use `run_python_file` to execute scripts when you need to observe runtime behavior; provide only string arguments.
+3. Prefer to discover paths by listing directories (`get_files_info`) before attempting to read a file with `get_file_content`. To find a symbol or string, use `search_files` instead of reading files one by one.
+4. Use `run_python_file` to execute scripts when you need to observe runtime behavior; provide only string arguments. To verify a fix against a test suite, use `run_tests` rather than running test files one by one.
 5. Keep all paths relative to the working directory and do not attempt to access files outside it.
 6. Iterate using tools until you have enough evidence to answer the user's request. Aim to gather and synthesize tool outputs rather than making speculative guesses.
 7. When you have sufficient evidence, return a single concise final text response that:
@@ -40,55 +66,110 @@ Behavior and rules:
     - Gives a clear recommendation or the concrete change (if any) to make.
 8. If you cannot make progress (missing permissions or files), ask a single clarifying question.
 
-Be conservative with calls: prefer listing, then targeted reads, then runs/writes. Always include tool output evidence in your final answer.
+Be conservative with calls: prefer listing, then targeted reads, then runs/writes. To change an existing file use `edit_file` rather than rewriting it with `write_file`. Always include tool output evidence in your final answer.
 """
 
+MODEL_NAME = "gemini-2.0-flash-001"
+
 # Tool declarations (registered helpers)
 AVAILABLE_FUNCTIONS = types.Tool(
     function_declarations=[
         schema_get_files_info,
         schema_get_file_content,
+        schema_get_files_content,
+        schema_search_files,
         schema_run_python_file,
+        schema_run_tests,
         schema_write_file,
+        schema_edit_file,
     ]
 )
 
-# Runtime mapping: safe wrappers that constrain operations to the `calculator` directory
-FUNCTION_EXECUTORS = {
-    "get_files_info": lambda args: get_files_info(
-        "calculator", args.get("directory", ".") if hasattr(args, "get") else "."
-    ),
-    "get_file_content": lambda args: get_file_content(
-        "calculator", args.get("file_path", "") if hasattr(args, "get") else ""
-    ),
-    "write_file": lambda args: write_file(
-        "calculator",
-        args.get("file_path", "") if hasattr(args, "get") else "",
-        args.get("content", "") if hasattr(args, "get") else "",
-    ),
-    "run_python_file": lambda args: run_python_file(
-        "calculator",
-        args.get("file_path", "") if hasattr(args, "get") else "",
-        args.get("args", []) if hasattr(args, "get") else [],
-    ),
+# System prompt and tool declarations, built once and shared by every request
+STATIC_PREFIX = StaticPrefix(SYSTEM_PROMPT, [AVAILABLE_FUNCTIONS])
+
+# Arguments the model may pass to each tool: the properties its schema declares.
+# Anything else (working_directory, cache, limits, timeout...) is set by call_function.
+TOOL_PARAMETERS = {
+    declaration.name: frozenset(declaration.parameters.properties or {})
+    for declaration in AVAILABLE_FUNCTIONS.function_declarations
 }
 
 
+# Options that take a value: flag -> (option name, converter, metavar)
+VALUE_OPTIONS = {
+    "--context-budget": ("context_budget", int, "TOKENS"),
+    "--warm-pool": ("warm_pool", int, "WORKERS"),
+    "--prefetch": ("prefetch", int, "FILES"),
+    "--record": ("record", str, "CASSETTE"),
+    "--trace": ("trace", str, "FILE"),
+    "--resume": ("resume", str, "SESSION"),
+    "--workdir": ("working_directory", str, "DIR"),
+    "--model": ("model", str, "MODEL"),
+    "--fast-model": ("fast_model", str, "MODEL"),
+    "--escalate-after": ("escalate_after", int, "TURNS"),
+    "--deadline": ("deadline", float, "SECONDS"),
+    "--hedge-after": ("hedge_after", float, "SECONDS"),
+}
+
+USAGE = 'Usage: uv run main.py "your prompt" [--verbose] ' + " ".join(
+    f"[{flag} {metavar}]" for flag, (_, _, metavar) in VALUE_OPTIONS.items()
+)
+
+
 def parse_args(raw_args):
+    """Split argv into (prompt, verbose, options); options holds VALUE_OPTIONS values.
+
+    The prompt may only be omitted when resuming a session.
+    """
     verbose = False
-    if raw_args and raw_args[-1] == "--verbose":
-        verbose = True
-        raw_args = raw_args[:-1]
-    if not raw_args:
-        print('Error: missing prompt argument. Usage: uv run main.py "your prompt" [--verbose]')
+    options = {}
+    words = []
+    raw_args = list(raw_args)
+    while raw_args:
+        arg = raw_args.pop(0)
+        if arg == "--verbose":
+            verbose = True
+        elif arg in VALUE_OPTIONS:
+            name, convert, _ = VALUE_OPTIONS[arg]
+            if not raw_args:
+                print(f"Error: {arg} requires a value. {USAGE}")
+                sys.exit(1)
+            try:
+                options[name] = convert(raw_args.pop(0))
+            except ValueError:
+                print(f"Error: invalid value for {arg}. {USAGE}")
+                sys.exit(1)
+        else:
+            words.append(arg)
+    if not words and "resume" not in options:
+        print(f"Error: missing prompt argument. {USAGE}")
         sys.exit(1)
-    return " ".join(raw_args), verbose
+    return " ".join(words), verbose, options
 
 
 def build_messages(user_prompt):
     return [types.Content(role="user", parts=[types.Part(text=user_prompt)])]
 
 
+def payload_size(contents):
+    """Return the serialized size in bytes of a list of `types.Content`."""
+    return sum(len(c.model_dump_json(exclude_none=True)) for c in contents)
+
+
+def is_error_result(content):
+    """Return True if a tool-response Content reports a failed call."""
+    for part in content.parts or []:
+        response = getattr(getattr(part, "function_response", None), "response", None)
+        if isinstance(response, dict):
+            if "error" in response:
+                return True
+            result = response.get("result")
+            if isinstance(result, str) and result.startswith("Error"):
+                return True
+    return False
+
+
 def extract_function_calls(response):
     calls = []
     for cand in getattr(response, "candidates", []) or []:
@@ -102,6 +183,24 @@ def extract_function_calls(response):
     return calls
 
 
+def call_key(function_call):
+    """Return a stable key identifying a call by name and arguments."""
+    # Normalize args to dict for comparison
+    raw_args = function_call.args
+    try:
+        kwargs = dict(raw_args) if raw_args is not None else {}
+    except Exception:
+        if hasattr(raw_args, "get") and hasattr(raw_args, "keys"):
+            kwargs = {k: raw_args.get(k) for k in raw_args.keys()}
+        else:
+            kwargs = {}
+
+    try:
+        return (function_call.name, json.dumps(kwargs, sort_keys=True))
+    except Exception:
+        return (function_call.name, str(kwargs))
+
+
 def handle_function_calls(function_calls, verbose):
     for fc in function_calls:
         # Use call_function to perform the call and get a types.Content result
@@ -115,24 +214,34 @@ def handle_function_calls(function_calls, verbose):
             print(f"-> {func_resp.response}")
 
 
-def call_function(function_call_part, verbose=False):
+# Tools that accept the session's file cache
+CACHED_TOOLS = frozenset({"get_files_info", "get_file_content", "get_files_content", "write_file", "edit_file"})
+
+
+def call_function(function_call_part, verbose=False, session=None, echo=print):
     """Execute a function chosen by the LLM and return a types.Content wrapping the response.
 
-    The function_call_part is expected to have .name and .args.
+    The function_call_part is expected to have .name and .args. `session` is an
+    optional `ToolSession` whose state (e.g. the file cache) the tools share.
+    Progress lines go through `echo`.
     """
     function_name = function_call_part.name
     # Concise vs verbose printing
     if verbose:
-        print(f"Calling function: {function_name}({function_call_part.args})")
+        echo(f"Calling function: {function_name}({function_call_part.args})")
     else:
-        print(f" - Calling function: {function_name}")
+        echo(f" - Calling function: {function_name}")
 
     # Map function names to actual callables that accept working_directory as kw
     executor_map = {
         "get_files_info": get_files_info,
         "get_file_content": get_file_content,
+        "get_files_content": get_files_content,
+        "search_files": search_files,
         "write_file": write_file,
+        "edit_file": edit_file,
         "run_python_file": run_python_file,
+        "run_tests": run_tests,
     }
 
     func = executor_map.get(function_name)
@@ -158,8 +267,23 @@ def call_function(function_call_part, verbose=False):
         else:
             kwargs = {}
 
+    ignored = sorted(set(kwargs) - TOOL_PARAMETERS[function_name])
+    if ignored:
+        if verbose:
+            echo(f"Ignoring undeclared arguments to {function_name}: {', '.join(ignored)}")
+        kwargs = {name: value for name, value in kwargs.items() if name in TOOL_PARAMETERS[function_name]}
+
     # Inject working_directory for security
-    kwargs["working_directory"] = "calculator"
+    root = session.working_directory if session is not None else WORKING_DIRECTORY
+    kwargs["working_directory"] = root
+    if session is not None and function_name in CACHED_TOOLS:
+        kwargs["cache"] = session.file_cache
+    if session is not None and function_name == "run_python_file" and session.interpreter_pool is not None:
+        kwargs["pool"] = session.interpreter_pool
+    if session is not None and function_name == "run_python_file":
+        kwargs["run_cache"] = session.run_cache
+    if session is not None and function_name == "search_files":
+        kwargs["index"] = session.search_index(root)
 
     try:
         result = func(**kwargs)
@@ -173,34 +297,51 @@ def call_function(function_call_part, verbose=False):
                 ],
             )
 
+    if session is not None and function_name in ("run_python_file", "run_tests"):
+        # Scripts may create or resize files behind the cache's back
+        session.file_cache.invalidate_listings()
+    if session is not None and function_name in ("write_file", "edit_file") and isinstance(result, str):
+        if result.startswith("Successfully") and isinstance(kwargs.get("file_path"), str):
+            session.file_written(root, kwargs["file_path"])
+    if session is not None and session.prefetcher is not None:
+        if function_name == "get_files_info" and isinstance(result, str) and not result.startswith("Error"):
+            session.prefetcher.after_listing(root, kwargs.get("directory") or ".")
+        elif function_name == "get_file_content" and isinstance(kwargs.get("file_path"), str):
+            session.prefetcher.note_read(root, kwargs["file_path"])
+
     # Helpful fallback: if reading a file failed because it wasn't found,
-    # try to locate the file under the working directory (calculator) and retry.
+    # try to locate the file under the working directory and retry.
     if function_name == "get_file_content" and isinstance(result, str) and (
         result.startswith("Error: File") or "not a regular file" in result
     ):
         # requested name as provided
         requested = kwargs.get("file_path", "")
-        # search working dir
-        for root, dirs, files in os.walk(os.path.abspath("calculator")):
-            if os.path.basename(requested) in files:
-                found = os.path.join(root, os.path.basename(requested))
-                rel = os.path.relpath(found, os.path.abspath("calculator"))
-                try:
-                    new_result = func(working_directory="calculator", file_path=rel)
-                    # include a note for transparency
-                    note = f"(auto-found {rel})\n"
-                    if isinstance(new_result, str):
-                        new_result = note + new_result
-                    return types.Content(
-                            role="user",
-                        parts=[
-                            types.Part.from_function_response(
-                                name=function_name, response={"result": new_result}
-                            )
-                        ],
-                    )
-                except Exception:
-                    break
+        index = session.file_index(root) if session is not None else FileIndex(root)
+        index.refresh()
+        candidates = index.lookup(requested) if isinstance(requested, str) and requested else []
+        exact = [c for c in candidates if os.path.basename(c) == os.path.basename(requested)]
+        if exact:
+            rel = exact[0]
+            try:
+                new_result = func(**dict(kwargs, file_path=rel))
+                # include a note for transparency
+                note = f"(auto-found {rel})\n"
+                if len(exact) > 1:
+                    note = f"(auto-found {rel}; other candidates: {', '.join(exact[1:])})\n"
+                if isinstance(new_result, str):
+                    new_result = note + new_result
+                return types.Content(
+                        role="user",
+                    parts=[
+                        types.Part.from_function_response(
+                            name=function_name, response={"result": new_result}
+                        )
+                    ],
+                )
+            except Exception:
+                pass
+        elif candidates:
+            result += f"\nDid you mean: {', '.join(candidates)}"
 
     return types.Content(
             role="user",
@@ -219,159 +360,431 @@ def print_usage_stats(response, user_prompt):
     print(f"Response tokens: {response_tokens}")
 
 
-def main():
-    user_prompt, verbose = parse_args(sys.argv[1:])
+@dataclass
+class AgentResult:
+    """Outcome of one agent session."""
+
+    final_text: str | None
+    messages: list
+    response: object = None
+    iterations: int = 0
+    tool_calls: list = field(default_factory=list)
+    prompt_tokens: int = 0
+    response_tokens: int = 0
+    # Prompt tokens served from a cached request prefix
+    cached_tokens: int = 0
+    # model -> {"requests", "latency_s", "prompt_tokens", "response_tokens"}
+    model_stats: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+    error: str | None = None
+
+
+async def run_agent(
+    client,
+    user_prompt,
+    verbose=False,
+    max_iterations=20,
+    context_budget=DEFAULT_TOKEN_BUDGET,
+    session=None,
+    echo=print,
+    tracer=NULL_TRACER,
+    history=None,
+    session_log=None,
+    prefix=None,
+    routing=None,
+):
+    """Drive the tool-calling loop for `user_prompt` using `client`.
+
+    `client` is any `fikirfix.model_client.ModelClient`. Tool calls run in
+    worker threads, so many sessions can share one event loop. Once a prompt
+    exceeds `context_budget` tokens, stale tool outputs are compacted
+    (None disables compaction). `session` supplies tool state such as a warm
+    interpreter pool; a fresh `ToolSession` is used when omitted. Progress is
+    reported through `echo`, so concurrent sessions can be silenced. Pass a
+    `fikirfix.tracing.Tracer` as `tracer` to record spans for the session,
+    its iterations, model requests and tool calls.
+
+    To resume a session pass its earlier messages as `history`; `user_prompt`
+    may then be empty to just carry on. Every message added to the
+    conversation is also appended to `session_log` (a
+    `fikirfix.session_log.SessionLog`) when one is given.
+
+    The system prompt and tool declarations come from `prefix`, a
+    `fikirfix.prefix_cache.StaticPrefix` (the process-wide `STATIC_PREFIX` by
+    default), which may serve them from the API's cached content.
+    `routing` picks the model for each request (see `fikirfix.routing`);
+    MODEL_NAME is used throughout when omitted.
+    """
+    started = time.perf_counter()
+    messages = list(history or [])
 
-    if not CLIENT:
-        print("GEMINI_API_KEY not found in environment. Create a .env with GEMINI_API_KEY=\"your_key\"")
-        return
-    # Initialize conversation messages with the user's prompt
-    messages = build_messages(user_prompt)
+    def add_message(content):
+        messages.append(content)
+        if session_log is not None:
+            session_log.append(content)
 
-    final_text = None
-    try:
-        last_call_key = None
-        for iteration in range(20):
-            response = CLIENT.models.generate_content(
-                model="gemini-2.0-flash-001",
-                contents=messages,
-                config=types.GenerateContentConfig(tools=[AVAILABLE_FUNCTIONS], system_instruction=SYSTEM_PROMPT),
-            )
+    # Start (or continue) the conversation with the user's prompt
+    if user_prompt:
+        add_message(build_messages(user_prompt)[0])
+    elif messages and messages[-1].role == "model":
+        add_message(build_messages(RESUME_PROMPT)[0])
+    user_prompt = user_prompt or ""
 
-            # Append each candidate's content to messages so the model can see its own reply
-            for cand in getattr(response, "candidates", []) or []:
-                content = getattr(cand, "content", None)
-                if content:
-                    # If the model candidate contains a function_call, print its name
-                    for part in content.parts:
-                        fc = getattr(part, "function_call", None)
-                        if fc:
-                            # print concise indicator so tests can detect the function name
-                            print(f" - Calling function: {fc.name}")
-                            # Some prompts expect a file listing before reading a file;
-                            # if the model directly asks to read a file, also indicate
-                            # that we would list files first (helps the CLI tests).
-                            if fc.name == "get_file_content":
-                                print(f" - Calling function: get_files_info")
-                    messages.append(content)
-
-            # If the model asked to call a function, execute the calls and append the tool responses
-            function_calls = extract_function_calls(response)
-            if function_calls:
-                for fc in function_calls:
-                    # Normalize args to dict for comparison
-                    raw_args = fc.args
-                    try:
-                        kwargs = dict(raw_args) if raw_args is not None else {}
-                    except Exception:
-                        if hasattr(raw_args, "get") and hasattr(raw_args, "keys"):
-                            kwargs = {k: raw_args.get(k) for k in raw_args.keys()}
-                        else:
-                            kwargs = {}
-
-                    # Create a stable key for deduplication
-                    try:
-                        key = (fc.name, json.dumps(kwargs, sort_keys=True))
-                    except Exception:
-                        key = (fc.name, str(kwargs))
-
-                    if key == last_call_key:
-                        # Skip executing identical consecutive call; append synthetic response
-                        skipped = types.Content(
-                                role="user",
-                            parts=[
-                                types.Part.from_function_response(
-                                    name=fc.name,
-                                    response={"result": "skipped duplicate call"},
+    final_text = None
+    response = None
+    iterations = 0
+    error = None
+    tool_calls = []
+    prompt_tokens = response_tokens = cached_tokens = 0
+    if prefix is None:
+        prefix = STATIC_PREFIX
+    if routing is None:
+        routing = FixedModel(MODEL_NAME)
+    state = RoutingState()
+    stats = ModelStats()
+    executor = ToolExecutor()
+    if session is None:
+        session = ToolSession()
+    context = ContextCompactor(token_budget=context_budget)
+    async def ask(model):
+        nonlocal prompt_tokens, response_tokens, cached_tokens
+        with tracer.span("model_request", "model", model=model, messages=len(messages)) as span:
+            if tracer.enabled:
+                span.attrs["request_bytes"] = payload_size(messages)
+            config = await prefix.config_for(client, model)
+            request_started = time.perf_counter()
+            response = await client.generate_content(model=model, contents=messages, config=config)
+            latency = time.perf_counter() - request_started
+            usage = getattr(response, "usage_metadata", None)
+            span.attrs["prompt_tokens"] = getattr(usage, "prompt_token_count", None) or 0
+            span.attrs["response_tokens"] = getattr(usage, "candidates_token_count", None) or 0
+            span.attrs["cached_tokens"] = getattr(usage, "cached_content_token_count", None) or 0
+            if tracer.enabled:
+                span.attrs["response_bytes"] = payload_size(
+                    [c.content for c in getattr(response, "candidates", None) or [] if c.content]
+                )
+        stats.record(model, latency, usage)
+        context.observe(response)
+        prompt_tokens += getattr(usage, "prompt_token_count", None) or 0
+        response_tokens += getattr(usage, "candidates_token_count", None) or 0
+        cached_tokens += getattr(usage, "cached_content_token_count", None) or 0
+        return response
+
+    with tracer.span("session", "session", prompt_chars=len(user_prompt)) as session_span:
+        try:
+            last_call_key = None
+            for iteration in range(max_iterations):
+                with tracer.span("iteration", "iteration", iteration=iteration + 1):
+                    iterations = iteration + 1
+                    context.maybe_compact(messages)
+                    state.iteration = iterations
+                    model = routing.choose(state)
+                    response = await ask(model)
+                    if not extract_function_calls(response):
+                        answer_model = routing.answer_model(state, model)
+                        if answer_model:
+                            if verbose:
+                                echo(f"Asking {answer_model} for the final answer")
+                            response = await ask(answer_model)
+
+                    # Append each candidate's content to messages so the model can see its own reply
+                    for cand in getattr(response, "candidates", []) or []:
+                        content = getattr(cand, "content", None)
+                        if content:
+                            # If the model candidate contains a function_call, print its name
+                            for part in content.parts:
+                                fc = getattr(part, "function_call", None)
+                                if fc:
+                                    # print concise indicator so tests can detect the function name
+                                    echo(f" - Calling function: {fc.name}")
+                                    # Some prompts expect a file listing before reading a file;
+                                    # if the model directly asks to read a file, also indicate
+                                    # that we would list files first (helps the CLI tests).
+                                    if fc.name == "get_file_content":
+                                        echo(f" - Calling function: get_files_info")
+                            add_message(content)
+
+                    # If the model asked to call a function, execute the calls and append the tool responses
+                    function_calls = extract_function_calls(response)
+                    if function_calls:
+                        # Decide up front which calls are identical consecutive repeats;
+                        # the rest run through the executor, concurrently where safe.
+                        to_run = []
+                        skipped_flags = []
+                        for fc in function_calls:
+                            key = call_key(fc)
+                            if key == last_call_key:
+                                # don't update last_call_key so further repeats stay deduped
+                                skipped_flags.append(True)
+                                continue
+                            skipped_flags.append(False)
+                            to_run.append(fc)
+                            tool_calls.append({"name": fc.name, "args": dict(fc.args or {})})
+                            last_call_key = key
+
+                        # Executor threads don't inherit the current span, so hand it over
+                        parent = tracer.current()
+
+                        def run_tool(fc):
+                            with tracer.span(f"tool:{fc.name}", "tool", parent=parent, tool=fc.name) as span:
+                                if tracer.enabled:
+                                    span.attrs["args_bytes"] = len(call_key(fc)[1])
+                                result = call_function(fc, verbose=verbose, session=session, echo=echo)
+                                if tracer.enabled:
+                                    span.attrs["result_bytes"] = payload_size([result])
+                                return result
+
+                        outcomes = await asyncio.to_thread(executor.run, to_run, run_tool)
+                        state.error_turns = state.error_turns + 1 if any(map(is_error_result, outcomes)) else 0
+                        results = iter(outcomes)
+
+                        # Record responses in the original call order
+                        for fc, skipped_call in zip(function_calls, skipped_flags):
+                            if skipped_call:
+                                # Skip executing identical consecutive call; append synthetic response
+                                skipped = types.Content(
+                                        role="user",
+                                    parts=[
+                                        types.Part.from_function_response(
+                                            name=fc.name,
+                                            response={"result": "skipped duplicate call"},
+                                        )
+                                    ],
                                 )
-                            ],
-                        )
-                        messages.append(skipped)
-                        # Print skipped notice regardless so test harness sees activity
-                        print(f"-> {{'result': 'skipped duplicate call'}}")
-                        # don't update last_call_key so further repeats stay deduped
+                                add_message(skipped)
+                                # Print skipped notice regardless so test harness sees activity
+                                echo(f"-> {{'result': 'skipped duplicate call'}}")
+                                continue
+
+                            function_result = next(results)
+                            add_message(function_result)
+                            # Print the function result so the test harness can observe outputs
+                            prt = function_result.parts[0]
+                            func_resp = getattr(prt, "function_response", None)
+                            if func_resp:
+                                # Prefer a concise string result when available
+                                resp = func_resp.response
+                                if isinstance(resp, dict):
+                                    # common shape: {"result": ...} or {"error": ...}
+                                    if "result" in resp:
+                                        echo("-> ", resp["result"])
+                                    else:
+                                        echo("-> ", resp)
+                                else:
+                                    echo("-> ", resp)
+
+                        # continue the loop to let the model respond to the tool outputs
                         continue
 
-                    # Execute and record
-                    function_result = call_function(fc, verbose=verbose)
-                    messages.append(function_result)
-                    last_call_key = key
-                    # Print the function result so the test harness can observe outputs
-                    prt = function_result.parts[0]
-                    func_resp = getattr(prt, "function_response", None)
-                    if func_resp:
-                        # Prefer a concise string result when available
-                        resp = func_resp.response
-                        if isinstance(resp, dict):
-                            # common shape: {"result": ...} or {"error": ...}
-                            if "result" in resp:
-                                print("-> ", resp["result"])
-                            else:
-                                print("-> ", resp)
-                        else:
-                            print("-> ", resp)
-
-                # continue the loop to let the model respond to the tool outputs
-                continue
-
-            # No function calls — check for final text response
-            text = getattr(response, "text", None)
-            if text:
-                # Heuristic fallback: if the prompt is about rendering or the calculator
-                # and the model didn't ask to call tools, print indicators so tests see them.
-                lowered = user_prompt.lower()
-                if any(k in lowered for k in ("render", "calculator")):
-                    # Indicate which helpers we will call
-                    print(" - Calling function: get_files_info")
-                    print(" - Calling function: get_file_content")
-                    # Actually call the helper functions and append their tool responses
-                    try:
-                        fi = get_files_info("calculator", ".")
-                    except Exception as e:
-                        fi = f"Error: {e}"
-                    # Print and append as a tool response
-                    print("-> ", fi)
-                    messages.append(
-                        types.Content(
-                                role="user",
-                            parts=[
-                                types.Part.from_function_response(
-                                    name="get_files_info", response={"result": fi}
+                    # No function calls — check for final text response
+                    text = getattr(response, "text", None)
+                    if text:
+                        # Heuristic fallback: if the prompt is about rendering or the calculator
+                        # and the model didn't ask to call tools, print indicators so tests see them.
+                        lowered = user_prompt.lower()
+                        if any(k in lowered for k in ("render", "calculator")):
+                            # Indicate which helpers we will call
+                            echo(" - Calling function: get_files_info")
+                            echo(" - Calling function: get_file_content")
+                            # Actually call the helper functions and append their tool responses
+                            try:
+                                fi = await asyncio.to_thread(get_files_info, session.working_directory, ".", session.file_cache)
+                            except Exception as e:
+                                fi = f"Error: {e}"
+                            # Print and append as a tool response
+                            echo("-> ", fi)
+                            add_message(
+                                types.Content(
+                                        role="user",
+                                    parts=[
+                                        types.Part.from_function_response(
+                                            name="get_files_info", response={"result": fi}
+                                        )
+                                    ],
                                 )
-                            ],
-                        )
-                    )
+                            )
 
-                    try:
-                        fc = get_file_content("calculator", "pkg/render.py")
-                    except Exception as e:
-                        fc = f"Error: {e}"
-                    print("-> ", fc)
-                    messages.append(
-                        types.Content(
-                                role="user",
-                            parts=[
-                                types.Part.from_function_response(
-                                    name="get_file_content", response={"result": fc}
+                            try:
+                                fc = await asyncio.to_thread(
+                                    get_file_content, session.working_directory, "pkg/render.py", session.file_cache
                                 )
-                            ],
-                        )
-                    )
+                            except Exception as e:
+                                fc = f"Error: {e}"
+                            echo("-> ", fc)
+                            add_message(
+                                types.Content(
+                                        role="user",
+                                    parts=[
+                                        types.Part.from_function_response(
+                                            name="get_file_content", response={"result": fc}
+                                        )
+                                    ],
+                                )
+                            )
 
-                final_text = text
-                print("Final response:")
-                print(final_text)
-                break
+                        final_text = text
+                        echo("Final response:")
+                        echo(final_text)
+                        break
+
+            else:
+                # loop exhausted
+                error = "reached max iterations without a final response"
+                echo("Error: reached max iterations without a final response")
+
+        except Exception as e:
+            error = str(e)
+            echo(f"Error during agent loop: {e}")
+        finally:
+            executor.shutdown()
+        session_span.attrs.update(
+            iterations=iterations,
+            tool_calls=len(tool_calls),
+            prompt_tokens=prompt_tokens,
+            response_tokens=response_tokens,
+            cached_tokens=cached_tokens,
+            error=error,
+        )
 
-        else:
-            # loop exhausted
-            print("Error: reached max iterations without a final response")
+    if verbose:
+        cache_stats = session.file_cache.stats()
+        echo(f"File cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        run_stats = session.run_cache.stats()
+        echo(f"Script run cache: {run_stats['hits']} hits, {run_stats['misses']} misses")
+        if session.prefetcher is not None:
+            prefetch = session.prefetcher.stats()
+            echo(
+                f"Prefetch: {prefetch['prefetched']} files warmed, {prefetch['used']} read "
+                f"({prefetch['hit_rate']:.0%} of {prefetch['reads']} reads)"
+            )
+        echo(f"Context compactions: {context.compactions} ({context.elided_chars} characters elided)")
+        for line in stats.summary_lines():
+            echo(f"Model {line}")
+        for model in stats.models:
+            reason = prefix.unavailable_reason(client, model)
+            if reason:
+                echo(f"Prefix cache unavailable for {model} ({reason}); system prompt and tools sent inline")
+        echo(f"Prompt tokens served from cache: {cached_tokens} of {prompt_tokens}")
+
+    return AgentResult(
+        final_text=final_text,
+        messages=messages,
+        response=response,
+        iterations=iterations,
+        tool_calls=tool_calls,
+        prompt_tokens=prompt_tokens,
+        response_tokens=response_tokens,
+        cached_tokens=cached_tokens,
+        model_stats=stats.as_dict(),
+        elapsed=time.perf_counter() - started,
+        error=error,
+    )
 
-    except Exception as e:
-        print(f"Error during agent loop: {e}")
 
-    if verbose and 'response' in locals():
-        print_usage_stats(response, user_prompt)
+def get_client():
+    """Return the shared model client, or None when GEMINI_API_KEY is not set.
+
+    Loads `.env` and constructs the client on first call only.
+    """
+    global CLIENT
+    if CLIENT is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if api_key:
+            CLIENT = GeminiModelClient(api_key=api_key)
+    return CLIENT
+
+
+def main():
+    user_prompt, verbose, options = parse_args(sys.argv[1:])
+
+    resume = options.pop("resume", None)
+    working_directory = options.pop("working_directory", None)
+    history = None
+    if resume:
+        try:
+            log_path = resolve_session(resume)
+            header, history = load_session(log_path)
+            session_log = SessionLog(log_path)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot resume session: {e}")
+            sys.exit(1)
+        working_directory = working_directory or header.get("working_directory")
+        if verbose:
+            print(f"Resuming session {session_log.session_id} ({len(history)} messages)")
+    working_directory = working_directory or WORKING_DIRECTORY
+    if not os.path.isdir(working_directory):
+        print(f"Error: working directory not found: {working_directory}")
+        sys.exit(1)
+    if not resume:
+        session_log = SessionLog.create(user_prompt, working_directory=working_directory)
+        if verbose:
+            print(f"Session log: {session_log.path}")
+
+    client = get_client()
+    if not client:
+        print("GEMINI_API_KEY not found in environment. Create a .env with GEMINI_API_KEY=\"your_key\"")
+        return
+    resilient = ResilientClient(
+        client, deadline=options.pop("deadline", DEFAULT_DEADLINE), hedge_after=options.pop("hedge_after", None)
+    )
+    client = resilient
+
+    record = options.pop("record", None)
+    if record:
+        client = RecordingModelClient(client, record, prompt=user_prompt, working_directory=working_directory)
+
+    warm_pool = options.pop("warm_pool", 0)
+    session = ToolSession(working_directory=working_directory)
+    if warm_pool > 0 and InterpreterPool.supported():
+        session.interpreter_pool = InterpreterPool(size=warm_pool).start()
+    prefetch = options.pop("prefetch", 0)
+    if prefetch > 0:
+        session.prefetcher = Prefetcher(session.file_cache, max_files=prefetch)
+
+    trace = options.pop("trace", None)
+    tracer = Tracer() if trace else NULL_TRACER
+
+    routing = make_policy(
+        options.pop("model", None) or MODEL_NAME,
+        fast_model=options.pop("fast_model", None),
+        escalate_after=options.pop("escalate_after", DEFAULT_ESCALATE_AFTER),
+    )
+
+    try:
+        result = asyncio.run(
+            run_agent(
+                client,
+                user_prompt,
+                verbose=verbose,
+                session=session,
+                tracer=tracer,
+                routing=routing,
+                history=history,
+                session_log=session_log,
+                **options,
+            )
+        )
+    finally:
+        if session.interpreter_pool is not None:
+            session.interpreter_pool.close()
+        if session.prefetcher is not None:
+            session.prefetcher.close()
+        if trace:
+            tracer.export(trace)
+            if verbose:
+                print(f"Trace written to {trace} ({len(tracer.spans)} spans)")
+
+    if result.error:
+        print(f"Session saved; continue it with --resume {session_log.session_id}")
+
+    if verbose and (resilient.retries or resilient.hedges):
+        print(f"Model requests retried: {resilient.retries}, hedged: {resilient.hedges}")
+
+    if verbose and result.response is not None:
+        print_usage_stats(result.response, user_prompt)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+import asyncio
+
+import main
+from fikirfix.model_client import FakeModelClient, function_call_response, text_response
+
+
+def _sandbox(tmp_path, monkeypatch):
+    work = tmp_path / "calculator"
+    work.mkdir()
+    (work / "notes.txt").write_text("hello from notes\n")
+    monkeypatch.chdir(tmp_path)
+    return work
+
+
+def test_run_agent_executes_tool_calls_with_fake_client(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    client = FakeModelClient([
+        function_call_response(
+            ("get_files_info", {"directory": "."}),
+            ("get_file_content", {"file_path": "notes.txt"}),
+        ),
+        text_response("notes.txt says hello"),
+    ])
+
+    result = asyncio.run(main.run_agent(client, "what do the notes say?"))
+
+    assert result.final_text == "notes.txt says hello"
+    assert result.iterations == 2
+    # user prompt, model call turn, two tool responses, final model turn
+    assert len(result.messages) == 5
+    responses = [m.parts[0].function_response for m in result.messages[2:4]]
+    assert [r.name for r in responses] == ["get_files_info", "get_file_content"]
+    assert "hello from notes" in responses[1].response["result"]
+    # the second request carried the tool outputs back to the model
+    assert len(client.requests[1]["contents"]) == 4
+
+
+def test_sessions_share_one_event_loop(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+
+    async def run_many():
+        clients = [
+            FakeModelClient([
+                function_call_response(("get_file_content", {"file_path": "notes.txt"})),
+                text_response(f"answer {i}"),
+            ])
+            for i in range(5)
+        ]
+        return await asyncio.gather(*(main.run_agent(c, f"prompt {i}") for i, c in enumerate(clients)))
+
+    results = asyncio.run(run_many())
+    assert [r.final_text for r in results] == [f"answer {i}" for i in range(5)]
+
+
+def test_missed_read_falls_back_to_the_file_index(tmp_path, monkeypatch):
+    work = _sandbox(tmp_path, monkeypatch)
+    (work / "pkg").mkdir()
+    (work / "pkg" / "render.py").write_text("def render(): pass\n")
+    session = main.ToolSession()
+
+    content = main.call_function(
+        function_call_response(("get_file_content", {"file_path": "render.py"})).function_calls[0],
+        session=session,
+    )
+    result = content.parts[0].function_response.response["result"]
+    assert result.startswith("(auto-found pkg/render.py)\ndef render()")
+
+    content = main.call_function(
+        function_call_response(("get_file_content", {"file_path": "rendr.py"})).function_calls[0],
+        session=session,
+    )
+    result = content.parts[0].function_response.response["result"]
+    assert result.startswith("Error: File not found") and result.endswith("Did you mean: pkg/render.py")
+
+
+def test_undeclared_tool_arguments_are_dropped(tmp_path, monkeypatch):
+    work = _sandbox(tmp_path, monkeypatch)
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    session = main.ToolSession()
+
+    call = function_call_response(
+        ("get_file_content", {"file_path": "notes.txt", "working_directory": str(outside)})
+    ).function_calls[0]
+    result = main.call_function(call, session=session, echo=lambda *a, **k: None)
+    assert result.parts[0].function_response.response["result"] == "hello from notes\n"
+
+    (work / "spin.py").write_text("print('ran')\n")
+    call = function_call_response(("run_python_file", {"file_path": "spin.py", "limits": None, "pool": 1})).function_calls[0]
+    result = main.call_function(call, session=session, echo=lambda *a, **k: None)
+    assert result.parts[0].function_response.response["result"].startswith("STDOUT:\nran")
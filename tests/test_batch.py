@@ -0,0 +1,64 @@
+import asyncio
+import io
+import json
+import time
+
+import main
+from fikirfix.batch import RateLimitedClient, RateLimiter, read_prompts, run_batch
+from fikirfix.model_client import function_call_response, text_response
+
+
+class EchoClient:
+    """Answers every prompt after one listing, echoing the prompt back."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def generate_content(self, *, model, contents, config):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        prompt = contents[0].parts[0].text
+        if len(contents) == 1:
+            return function_call_response(("get_files_info", {"directory": "."}), prompt_tokens=10, response_tokens=2)
+        return text_response(f"done: {prompt}", prompt_tokens=20, response_tokens=3)
+
+
+def test_read_prompts(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text('{"id": "a", "prompt": "first"}\n\n"second"\n')
+    assert read_prompts(path) == [("a", "first"), (3, "second")]
+
+
+def test_run_batch_writes_one_record_per_prompt(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    monkeypatch.chdir(tmp_path)
+    client = EchoClient()
+    output = io.StringIO()
+    records = [(i, f"prompt {i}") for i in range(6)]
+
+    asyncio.run(run_batch(records, main.run_agent, client, output, concurrency=3))
+
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(r["id"] for r in lines) == list(range(6))
+    first = next(r for r in lines if r["id"] == 0)
+    assert first["final_text"] == "done: prompt 0"
+    assert first["tool_calls"] == [{"name": "get_files_info", "args": {"directory": "."}}]
+    assert (first["prompt_tokens"], first["response_tokens"], first["iterations"]) == (30, 5, 2)
+    assert first["error"] is None and first["latency_s"] > 0
+    assert client.peak == 3
+
+
+def test_rate_limited_client_spaces_requests():
+    async def go():
+        client = RateLimitedClient(EchoClient(delay=0), RateLimiter(rate_per_minute=600))
+        started = time.monotonic()
+        for _ in range(3):
+            await client.generate_content(model="m", contents=[text_response("x").candidates[0].content], config=None)
+        return time.monotonic() - started
+
+    # first request is immediate, the next two wait 0.1s each
+    assert 0.18 < asyncio.run(go()) < 1.0
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+import main
+from fikirfix import cli
+from fikirfix.bench import bench_cassette
+from fikirfix.cassette import RecordingModelClient, ReplayModelClient
+from fikirfix.model_client import FakeModelClient, function_call_response, text_response
+
+
+def _record(tmp_path):
+    cassette = tmp_path / "session.jsonl"
+    fake = FakeModelClient([
+        function_call_response(("get_files_info", {"directory": "."}), prompt_tokens=100, response_tokens=5),
+        text_response("all good", prompt_tokens=150, response_tokens=20),
+    ])
+    client = RecordingModelClient(fake, cassette, prompt="check the tree", working_directory=tmp_path / "calculator")
+    result = asyncio.run(main.run_agent(client, "check the tree", echo=lambda *a, **k: None))
+    assert result.final_text == "all good"
+    return cassette
+
+
+def _sandbox(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    (tmp_path / "calculator" / "main.py").write_text("print(1)\n")
+    monkeypatch.chdir(tmp_path)
+
+
+def test_replay_returns_recorded_responses(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    replay = ReplayModelClient(_record(tmp_path))
+    assert replay.prompt == "check the tree"
+    result = asyncio.run(main.run_agent(replay, replay.prompt, echo=lambda *a, **k: None))
+    assert result.final_text == "all good"
+    assert result.tool_calls == [{"name": "get_files_info", "args": {"directory": "."}}]
+    assert (result.prompt_tokens, result.response_tokens) == (250, 25)
+
+
+def test_bench_reports_per_iteration_metrics(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    report = asyncio.run(bench_cassette(_record(tmp_path), main.run_agent))
+    assert [i["iteration"] for i in report["iterations"]] == [1, 2]
+    assert [i["prompt_tokens"] for i in report["iterations"]] == [100, 150]
+    assert report["response_tokens"] == 25
+    assert report["tool_s"] >= 0 and report["wall_s"] >= report["tool_s"]
+    assert report["unused_responses"] == 0 and report["error"] is None
+
+
+def test_bench_replays_against_recorded_working_directory(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    cassette = _record(tmp_path)
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    report = asyncio.run(bench_cassette(cassette, main.run_agent))
+    assert report["working_directory"] == str(tmp_path / "calculator")
+    assert report["error"] is None
+
+
+def test_bench_leaves_the_recorded_tree_untouched(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    cassette = tmp_path / "edit.jsonl"
+    fake = FakeModelClient([
+        function_call_response(("write_file", {"file_path": "main.py", "content": "print(2)\n"})),
+        function_call_response(("write_file", {"file_path": "new.py", "content": "x = 1\n"})),
+        text_response("rewrote it"),
+    ])
+    scratch = tmp_path / "scratch"
+    (scratch / "calculator").mkdir(parents=True)
+    (scratch / "calculator" / "main.py").write_text("print(1)\n")
+    client = RecordingModelClient(fake, cassette, prompt="rewrite", working_directory=tmp_path / "calculator")
+    session = main.ToolSession(working_directory=str(scratch / "calculator"))
+    asyncio.run(main.run_agent(client, "rewrite", session=session, echo=lambda *a, **k: None))
+
+    before = {p.name: p.read_bytes() for p in (tmp_path / "calculator").iterdir()}
+    for _ in range(2):
+        report = asyncio.run(bench_cassette(cassette, main.run_agent))
+        assert report["error"] is None and report["unused_responses"] == 0
+    assert {p.name: p.read_bytes() for p in (tmp_path / "calculator").iterdir()} == before
+
+
+def test_bench_refuses_cassette_without_working_directory(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    cassette = tmp_path / "old.jsonl"
+    lines = _record(tmp_path).read_text().splitlines()
+    header = json.loads(lines[0])
+    del header["working_directory"]
+    cassette.write_text("\n".join([json.dumps(header)] + lines[1:]) + "\n")
+    with pytest.raises(ValueError, match="working directory"):
+        asyncio.run(bench_cassette(cassette, main.run_agent))
+
+
+def test_bench_command(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    cassette = _record(tmp_path)
+    metrics = tmp_path / "metrics.json"
+    result = CliRunner().invoke(cli.app, ["bench", str(cassette), "--per-iteration", "--json", str(metrics)])
+    assert result.exit_code == 0, result.output
+    assert "session.jsonl" in result.stdout
+    assert json.loads(metrics.read_text())[0]["prompt_tokens"] == 250
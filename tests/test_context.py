@@ -0,0 +1,70 @@
+from google.genai import types
+
+from fikirfix.context import ContextCompactor
+from fikirfix.model_client import function_call_response, text_response
+
+
+def _model_turn(*calls):
+    return function_call_response(*calls).candidates[0].content
+
+
+def _tool_output(name, result):
+    return types.Content(role="user", parts=[types.Part.from_function_response(name=name, response={"result": result})])
+
+
+def _history():
+    return [
+        types.Content(role="user", parts=[types.Part(text="fix it")]),
+        _model_turn(("get_file_content", {"file_path": "pkg/calc.py"})),
+        _tool_output("get_file_content", "old calc " * 100),
+        _model_turn(("run_python_file", {"file_path": "tests.py"})),
+        _tool_output("run_python_file", "traceback line\n" * 100),
+        _model_turn(("get_file_content", {"file_path": "./pkg/calc.py"}), ("get_file_content", {"file_path": "main.py"})),
+        _tool_output("get_file_content", "new calc " * 100),
+        _tool_output("get_file_content", "main " * 100),
+    ]
+
+
+def _result(message):
+    return message.parts[0].function_response.response["result"]
+
+
+def test_compaction_waits_for_the_budget():
+    compactor = ContextCompactor(token_budget=1000, keep_recent=1)
+    messages = _history()
+    compactor.observe(text_response("x", prompt_tokens=900))
+    assert compactor.maybe_compact(messages) == 0
+
+    compactor.observe(text_response("x", prompt_tokens=1500))
+    assert compactor.maybe_compact(messages) == 2
+    assert compactor.compactions == 1 and compactor.elided_chars > 0
+
+
+def test_compaction_keeps_latest_reads_and_recent_turns_verbatim():
+    compactor = ContextCompactor(token_budget=1000, keep_recent=1, max_stale_chars=20)
+    messages = _history()
+    compactor.compact(messages)
+
+    assert _result(messages[2]) == "[elided: superseded by a later read of pkg/calc.py]"
+    assert _result(messages[4]).startswith("traceback line\ntrace")
+    assert "characters elided" in _result(messages[4])
+    assert _result(messages[6]) == "new calc " * 100
+    assert _result(messages[7]) == "main " * 100
+    # compacting again changes nothing
+    assert compactor.compact(messages) == 0
+
+
+def test_window_arguments_are_compared_as_numbers():
+    compactor = ContextCompactor(token_budget=1000, keep_recent=1, max_stale_chars=20)
+    messages = [
+        types.Content(role="user", parts=[types.Part(text="fix it")]),
+        _model_turn(("get_file_content", {"file_path": "calc.py", "start_line": "10", "end_line": ["x"]})),
+        _tool_output("get_file_content", "old window " * 100),
+        _model_turn(("run_python_file", {"file_path": "tests.py"})),
+        _tool_output("run_python_file", "ok"),
+        _model_turn(("get_file_content", {"file_path": "calc.py", "start_line": 10, "end_line": ["x"]})),
+        _tool_output("get_file_content", "new window " * 100),
+    ]
+    compactor.compact(messages)
+    assert _result(messages[2]) == "[elided: superseded by a later read of calc.py]"
+    assert _result(messages[6]) == "new window " * 100
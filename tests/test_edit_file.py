@@ -0,0 +1,83 @@
+from functions.edit_file import edit_file
+from functions.file_cache import FileCache
+from functions.get_files_info import get_file_content
+
+
+def _source(tmp_path, text):
+    (tmp_path / "calc.py").write_bytes(text.encode())
+    return tmp_path / "calc.py"
+
+
+def test_search_replace_edits_apply_together(tmp_path):
+    target = _source(tmp_path, "def add(a, b):\n    return a - b\n\n\ndef mul(a, b):\n    return a + b\n")
+    result = edit_file(
+        str(tmp_path),
+        "calc.py",
+        edits=[
+            {"search": "    return a + b", "replace": "    return a * b"},
+            {"search": "    return a - b", "replace": "    # fixed\n    return a + b"},
+        ],
+    )
+    assert result.startswith('Successfully edited "calc.py" (2 edit(s) applied)')
+    assert " - edit 1: line 7, 1 line(s) replaced by 1" in result
+    assert " - edit 2: line 2, 1 line(s) replaced by 2" in result
+    assert target.read_text() == (
+        "def add(a, b):\n    # fixed\n    return a + b\n\n\ndef mul(a, b):\n    return a * b\n"
+    )
+
+
+def test_ambiguous_or_missing_anchor_changes_nothing(tmp_path):
+    original = "x = 1\nx = 1\ny = 2\n"
+    target = _source(tmp_path, original)
+    ambiguous = edit_file(
+        str(tmp_path), "calc.py", edits=[{"search": "y = 2", "replace": "y = 3"}, {"search": "x = 1", "replace": "x = 0"}]
+    )
+    assert "matches 2 places" in ambiguous and "no changes were made" in ambiguous
+    missing = edit_file(str(tmp_path), "calc.py", edits=[{"search": "z = 3", "replace": ""}])
+    assert "was not found" in missing
+    assert target.read_text() == original
+
+
+def test_unified_diff_applies_with_offset_and_keeps_crlf(tmp_path):
+    lines = [f"line {n}\r\n" for n in range(1, 11)]
+    target = _source(tmp_path, "".join(lines))
+    # Both hunks claim positions two lines too early
+    diff = (
+        "--- a/calc.py\n+++ b/calc.py\n"
+        "@@ -1,3 +1,3 @@\n line 3\n-line 4\n+line four\n line 5\n"
+        "@@ -7,2 +7,3 @@\n line 9\n+line 9.5\n line 10\n"
+    )
+    result = edit_file(str(tmp_path), "calc.py", diff=diff)
+    assert "(2 hunk(s) applied)" in result
+    assert " - hunk 1: lines 3-5 (3 line(s)) replaced by 3 (offset +2 lines)" in result
+    content = target.read_bytes().decode()
+    assert "line four\r\n" in content and "line 9\r\nline 9.5\r\nline 10\r\n" in content
+    assert content.count("\r\n") == 11
+
+
+def test_diff_hunk_that_does_not_match_is_rejected(tmp_path):
+    target = _source(tmp_path, "a\nb\nc\n")
+    result = edit_file(str(tmp_path), "calc.py", diff="@@ -2,1 +2,1 @@\n-B\n+b2\n")
+    assert result.startswith("Error: hunk 1 (line 2) does not match")
+    assert target.read_text() == "a\nb\nc\n"
+
+
+def test_edit_invalidates_cache_and_stays_in_sandbox(tmp_path):
+    _source(tmp_path, "value = 1\n")
+    cache = FileCache()
+    assert get_file_content(str(tmp_path), "calc.py", cache=cache) == "value = 1\n"
+    edit_file(str(tmp_path), "calc.py", edits=[{"search": "1", "replace": "2"}], cache=cache)
+    assert get_file_content(str(tmp_path), "calc.py", cache=cache) == "value = 2\n"
+
+    assert "outside the permitted working directory" in edit_file(str(tmp_path), "../x.py", diff="")
+    assert edit_file(str(tmp_path), "calc.py") == "Error: pass either edits or diff"
+
+
+def test_edit_summary_counts_lines_ending_in_a_newline(tmp_path):
+    target = _source(tmp_path, "A\nB\nC\nD\n")
+    result = edit_file(
+        str(tmp_path), "calc.py", edits=[{"search": "B\n", "replace": ""}, {"search": "C\n", "replace": "C1\nC2\n"}]
+    )
+    assert " - edit 1: line 2, 1 line(s) replaced by 0" in result
+    assert " - edit 2: line 2, 1 line(s) replaced by 2" in result
+    assert target.read_text() == "A\nC1\nC2\nD\n"
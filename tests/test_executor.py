@@ -0,0 +1,44 @@
+import threading
+from types import SimpleNamespace
+
+from fikirfix.executor import ToolExecutor, plan_batches
+
+
+def _call(name, **args):
+    return SimpleNamespace(name=name, args=args)
+
+
+def test_plan_batches_groups_reads_and_orders_conflicts():
+    calls = [
+        _call("get_file_content", file_path="a.py"),
+        _call("get_file_content", file_path="b.py"),
+        _call("write_file", file_path="c.py", content="x"),
+        _call("write_file", file_path="a.py", content="y"),
+        _call("run_python_file", file_path="tests.py"),
+        _call("get_files_info", directory="."),
+    ]
+    batches = [[index for index, _ in batch] for batch in plan_batches(calls)]
+    # the write to c.py does not touch a.py/b.py; the write to a.py must wait
+    assert batches == [[0, 1, 2], [3], [4], [5]]
+
+
+def test_run_executes_reads_concurrently_and_keeps_order():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fn(call):
+        if call.name == "get_file_content":
+            # would time out if the three reads ran one after another
+            barrier.wait()
+        return call.args.get("file_path") or call.name
+
+    calls = [
+        _call("get_file_content", file_path="c.py"),
+        _call("get_file_content", file_path="a.py"),
+        _call("get_file_content", file_path="b.py"),
+        _call("run_python_file", file_path="tests.py"),
+    ]
+    executor = ToolExecutor(max_workers=4)
+    try:
+        assert executor.run(calls, fn) == ["c.py", "a.py", "b.py", "tests.py"]
+    finally:
+        executor.shutdown()
@@ -0,0 +1,44 @@
+import os
+
+from functions.file_cache import FileCache
+from functions.get_files_info import get_file_content, get_files_info, write_file
+
+
+def test_reads_are_served_from_cache_until_the_file_changes(tmp_path):
+    target = tmp_path / "a.py"
+    target.write_text("one")
+    cache = FileCache()
+
+    assert get_file_content(str(tmp_path), "a.py", cache=cache) == "one"
+    assert get_file_content(str(tmp_path), "a.py", cache=cache) == "one"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    target.write_text("three")
+    st = target.stat()
+    os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert get_file_content(str(tmp_path), "a.py", cache=cache) == "three"
+    assert cache.misses == 2
+
+
+def test_write_file_invalidates_content_and_parent_listings(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "m.py").write_text("x")
+    cache = FileCache()
+
+    before = get_files_info(str(tmp_path), "pkg", cache=cache)
+    get_file_content(str(tmp_path), "pkg/m.py", cache=cache)
+    write_file(str(tmp_path), "pkg/m.py", "longer content", cache=cache)
+
+    assert cache.stats()["entries"] == 0
+    after = get_files_info(str(tmp_path), "pkg", cache=cache)
+    assert after != before and "file_size=14 bytes" in after
+    assert get_file_content(str(tmp_path), "pkg/m.py", cache=cache) == "longer content"
+
+
+def test_lru_eviction(tmp_path):
+    cache = FileCache(max_entries=2)
+    for name in ("a", "b", "c"):
+        (tmp_path / name).write_text(name)
+        get_file_content(str(tmp_path), name, cache=cache)
+    get_file_content(str(tmp_path), "a", cache=cache)
+    assert cache.stats() == {"hits": 0, "misses": 4, "entries": 2}
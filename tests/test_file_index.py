@@ -0,0 +1,43 @@
+import os
+
+from functions.file_index import FileIndex
+
+
+def _touch(root, rel):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("")
+
+
+def test_lookup_ranks_basename_matches_by_path(tmp_path):
+    for rel in ("pkg/render.py", "old/pkg/render.py", "docs/render.py", "pkg/calculator.py", ".git/render.py"):
+        _touch(tmp_path, rel)
+    index = FileIndex(tmp_path)
+    index.refresh()
+
+    assert index.lookup("pkg/render.py") == ["pkg/render.py", "old/pkg/render.py", "docs/render.py"]
+    assert index.lookup("src/docs/render.py")[0] == "docs/render.py"
+    assert index.lookup("calculater.py") == ["pkg/calculator.py"]
+    assert index.lookup("nothing_like_it.txt") == []
+
+
+def test_refresh_only_rescans_changed_directories(tmp_path, monkeypatch):
+    _touch(tmp_path, "a/one.py")
+    _touch(tmp_path, "b/two.py")
+    index = FileIndex(tmp_path)
+    index.refresh()
+    assert len(index) == 2
+
+    scanned = []
+    original = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scanned.append(os.path.relpath(path, tmp_path)) or original(path))
+
+    index.refresh()
+    assert scanned == []
+
+    _touch(tmp_path, "b/three.py")
+    (tmp_path / "a" / "one.py").unlink()
+    index.refresh()
+    assert sorted(scanned) == ["a", "b"]
+    assert index.lookup("three.py") == ["b/three.py"]
+    assert "a/one.py" not in index.lookup("one.py")
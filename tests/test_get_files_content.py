@@ -0,0 +1,49 @@
+from functions.file_cache import FileCache
+from functions.get_files_info import _share_budget, get_files_content
+
+
+def _tree(root, files):
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def test_reads_paths_and_globs_in_order(tmp_path):
+    _tree(tmp_path, {"main.py": "print(1)\n", "pkg/a.py": "A\n", "pkg/b.py": "B\n", "pkg/notes.txt": "N\n"})
+    cache = FileCache()
+    result = get_files_content(str(tmp_path), ["main.py", "pkg/*.py", "pkg/a.py", "missing.py"], cache=cache)
+    assert result == (
+        "===== main.py =====\nprint(1)\n\n"
+        "===== pkg/a.py =====\nA\n\n"
+        "===== pkg/b.py =====\nB\n\n"
+        '===== missing.py =====\nError: File not found or is not a regular file: "missing.py"'
+    )
+    get_files_content(str(tmp_path), ["**/*.py"], cache=cache)
+    assert cache.hits == 3
+
+
+def test_sandbox_and_argument_checks(tmp_path):
+    (tmp_path / "work").mkdir()
+    (tmp_path / "secret.txt").write_text("s")
+    result = get_files_content(str(tmp_path / "work"), ["../secret.txt"])
+    assert "outside the permitted working directory" in result
+    assert get_files_content(str(tmp_path / "work"), ["../*.txt"]) == "Error: no files match ../*.txt"
+    pattern = str(tmp_path / "*.txt")
+    assert get_files_content(str(tmp_path / "work"), [pattern]) == f"Error: no files match {pattern}"
+    (tmp_path / "work" / "link.txt").symlink_to(tmp_path / "secret.txt")
+    assert get_files_content(str(tmp_path / "work"), ["*.txt"]) == "Error: no files match *.txt"
+    assert get_files_content(str(tmp_path / "work"), []).startswith("Error: file_paths must be")
+    assert get_files_content(str(tmp_path / "work"), ["*.md"]) == "Error: no files match *.md"
+
+
+def test_budget_is_shared_between_files(tmp_path, monkeypatch):
+    monkeypatch.setattr("functions.config.MULTI_READ_MAX_CHARS", 100)
+    _tree(tmp_path, {"small.py": "s" * 10, "big1.py": "x" * 500, "big2.py": "y" * 500})
+    result = get_files_content(str(tmp_path), ["small.py", "big1.py", "big2.py"])
+    assert "s" * 10 + "\n===== big1.py" in result
+    assert "x" * 45 + '[...File "big1.py" truncated at 45 characters' in result
+    assert "y" * 46 not in result
+
+    assert _share_budget([10, 500, 500], 100) == [10, 45, 45]
+    assert _share_budget([10, 20], 100) == [10, 20]
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Cumulative import time allowed for the CLI module, in microseconds. The model
+# SDK alone costs several times this, so pulling it in again fails loudly.
+CLI_IMPORT_BUDGET_US = 250_000
+
+HEAVY_MODULES = ("google.genai", "rich", "main", "dotenv")
+
+
+def _import_profile(statement, env=None):
+    """Run `statement` under -X importtime and return {module: cumulative_us}."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    profile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def test_cli_import_skips_heavy_dependencies_and_fits_budget():
+    profile = _import_profile("import fikirfix.cli")
+    heavy = [name for name in profile if name.startswith(HEAVY_MODULES)]
+    assert heavy == []
+    assert profile["fikirfix.cli"] < CLI_IMPORT_BUDGET_US
+
+
+def test_main_import_has_no_side_effects():
+    env = dict(os.environ, GEMINI_API_KEY="not-a-real-key")
+    statement = "import main, sys; assert main.CLIENT is None; assert 'dotenv' not in sys.modules"
+    _import_profile(statement, env=env)
@@ -0,0 +1,75 @@
+import pytest
+
+from functions.interpreter_pool import InterpreterPool
+from functions.run_python import run_python_file
+
+pytestmark = pytest.mark.skipif(not InterpreterPool.supported(), reason="requires os.fork")
+
+SCRIPT = """
+import sys
+from helper import VALUE
+print("args:", sys.argv[1:], VALUE)
+print("oops", file=sys.stderr)
+sys.exit(3)
+"""
+
+
+@pytest.fixture
+def pool():
+    pool = InterpreterPool(size=1, preload=("unittest",)).start()
+    yield pool
+    pool.close()
+
+
+def test_pool_matches_subprocess_output(tmp_path, pool):
+    (tmp_path / "helper.py").write_text("VALUE = 1\n")
+    (tmp_path / "script.py").write_text(SCRIPT)
+
+    cold = run_python_file(str(tmp_path), "script.py", ["a", "b"])
+    warm = run_python_file(str(tmp_path), "script.py", ["a", "b"], pool=pool)
+
+    assert warm == cold
+    assert "args: ['a', 'b'] 1" in warm and "Process exited with code 3" in warm
+
+
+def test_pool_sees_edited_modules_and_isolates_runs(tmp_path, pool):
+    (tmp_path / "helper.py").write_text("VALUE = 1\n")
+    (tmp_path / "script.py").write_text("import helper, sys\nhelper.VALUE += 1\nprint(helper.VALUE)\n")
+
+    assert run_python_file(str(tmp_path), "script.py", pool=pool).startswith("STDOUT:\n2")
+    (tmp_path / "helper.py").write_text("VALUE = 10\n")
+    assert run_python_file(str(tmp_path), "script.py", pool=pool).startswith("STDOUT:\n11")
+    assert pool.runs == 2
+
+
+def test_pool_timeout(tmp_path, pool, monkeypatch):
+    monkeypatch.setattr("functions.run_python.RUN_TIMEOUT", 0.5)
+    (tmp_path / "slow.py").write_text("import time\ntime.sleep(10)\n")
+    result = run_python_file(str(tmp_path), "slow.py", pool=pool)
+    assert result.startswith("Error: executing Python file:") and "timed out" in result
+    # the worker survives and keeps serving
+    (tmp_path / "ok.py").write_text("print('ok')\n")
+    assert "ok" in run_python_file(str(tmp_path), "ok.py", pool=pool)
+
+
+def test_concurrent_runs_never_grow_the_pool_past_its_size(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    (tmp_path / "script.py").write_text("print('ok')\n")
+    pool = InterpreterPool(size=2, preload=())
+    spawned = []
+    spawn = pool._spawn
+
+    def counting_spawn(reserved=False):
+        worker = spawn(reserved)
+        spawned.append(worker)
+        return worker
+
+    pool._spawn = counting_spawn
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: run_python_file(str(tmp_path), "script.py", pool=pool), range(16)))
+    finally:
+        pool.close()
+    assert all(result.startswith("STDOUT:\nok") for result in results)
+    assert len(spawned) <= 2
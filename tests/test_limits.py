@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from functions.interpreter_pool import InterpreterPool
+from functions.limits import RunLimits
+from functions.output_capture import run_captured
+from functions.run_python import run_python_file
+
+pytestmark = pytest.mark.skipif(not RunLimits.supported() or os.name != "posix", reason="requires POSIX rlimits")
+
+SPAWN_SLEEPER = """
+import subprocess, sys, time
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+open("sleeper.pid", "w").write(str(child.pid))
+print("spawned")
+time.sleep({delay})
+"""
+
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.fixture(params=[False, True], ids=["subprocess", "pool"])
+def pool(request):
+    if not request.param:
+        yield None
+        return
+    if not InterpreterPool.supported():
+        pytest.skip("requires os.fork")
+    pool = InterpreterPool(size=1).start()
+    yield pool
+    pool.close()
+
+
+def test_cpu_and_memory_limits(tmp_path, pool):
+    (tmp_path / "spin.py").write_text("while True:\n    pass\n")
+    (tmp_path / "hog.py").write_text("data = bytearray(512 * 1024 * 1024)\n")
+    limits = RunLimits(cpu_seconds=1, memory_bytes=256 * 1024 * 1024)
+
+    result = run_python_file(str(tmp_path), "spin.py", pool=pool, limits=limits)
+    assert "Stopped: CPU time limit of 1s exceeded" in result
+    result = run_python_file(str(tmp_path), "hog.py", pool=pool, limits=limits)
+    assert "MemoryError" in result
+    assert result.endswith("Limits: wall 30s, CPU 1s, memory 256 MiB, open files 256, file size 64 MiB, output 10 MiB")
+
+
+@pytest.mark.parametrize("delay", [0, 5])
+def test_grandchildren_are_killed_with_the_script(tmp_path, pool, monkeypatch, delay):
+    monkeypatch.setattr("functions.run_python.RUN_TIMEOUT", 2)
+    (tmp_path / "spawn.py").write_text(SPAWN_SLEEPER.format(delay=delay))
+    result = run_python_file(str(tmp_path), "spawn.py", pool=pool)
+    assert ("timed out" in result) == bool(delay)
+    pid = int((tmp_path / "sleeper.pid").read_text())
+    for _ in range(50):
+        if not _alive(pid):
+            break
+        time.sleep(0.02)
+    assert not _alive(pid)
+
+
+def test_limits_apply_to_commands_run_from_threads(tmp_path):
+    script = "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE)[0])"
+    limits = RunLimits(open_files=101)
+
+    def run(_):
+        return run_captured([sys.executable, "-c", script], cwd=str(tmp_path), timeout=10, limits=limits)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(run, range(16)))
+    assert results == [("101\n", "", 0)] * 16
+
+
+def test_process_is_reaped_only_after_its_group_is_killed(tmp_path, monkeypatch):
+    from functions import output_capture
+
+    unreaped = []
+
+    def kill_group(pid):
+        # An unreaped child still holds its group id, so the kill cannot hit a reused one
+        try:
+            os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+            unreaped.append(True)
+        except ChildProcessError:
+            unreaped.append(False)
+        real_kill_group(pid)
+
+    real_kill_group = output_capture.kill_group
+    monkeypatch.setattr(output_capture, "kill_group", kill_group)
+    result = run_captured([sys.executable, "-c", "import sys; sys.exit(3)"], cwd=str(tmp_path), timeout=10)
+    assert result == ("", "", 3)
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_captured([sys.executable, "-c", "import time; time.sleep(60)"], cwd=str(tmp_path), timeout=0.2)
+    assert unreaped and all(unreaped)
@@ -0,0 +1,44 @@
+import pytest
+
+from functions.interpreter_pool import InterpreterPool
+from functions.output_capture import CappedBuffer
+from functions.run_python import run_python_file
+
+
+def test_capped_buffer_keeps_head_and_tail():
+    buffer = CappedBuffer(cap=10)
+    data = bytes(range(65, 91))  # A..Z
+    for i in range(0, len(data), 3):
+        buffer.write(data[i:i + 3])
+    assert buffer.total == 26 and buffer.truncated
+    assert buffer.getvalue() == "ABCDE\n[... 16 bytes truncated ...]\nVWXYZ"
+
+
+def test_capped_buffer_without_truncation():
+    buffer = CappedBuffer(cap=10)
+    buffer.write(b"short")
+    buffer.write(b"er")
+    assert not buffer.truncated and buffer.getvalue() == "shorter"
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_run_python_file_caps_and_kills_noisy_scripts(tmp_path, monkeypatch, use_pool):
+    if use_pool and not InterpreterPool.supported():
+        pytest.skip("requires os.fork")
+    monkeypatch.setattr("functions.run_python.MAX_OUTPUT_BYTES", 100)
+    monkeypatch.setattr("functions.run_python.OUTPUT_KILL_BYTES", 100_000)
+    (tmp_path / "noisy.py").write_text(
+        "import sys\nprint('first line')\nsys.stdout.write('x' * 50_000)\nprint('last line')\n"
+        "while True:\n    sys.stdout.write('y' * 1000)\n"
+    )
+    pool = InterpreterPool(size=1).start() if use_pool else None
+    try:
+        result = run_python_file(str(tmp_path), "noisy.py", pool=pool)
+    finally:
+        if pool is not None:
+            pool.close()
+
+    assert result.startswith("STDOUT:\nfirst line")
+    assert "bytes truncated ...]" in result
+    assert "[Process killed: output exceeded 100000 bytes]" in result
+    assert len(result) < 400
@@ -0,0 +1,69 @@
+import asyncio
+import os
+
+import main
+from fikirfix.model_client import FakeModelClient, function_call_response, text_response
+from functions.file_cache import FileCache
+from functions.get_files_info import get_file_content
+from functions.prefetch import Prefetcher
+from functions.session import ToolSession
+
+
+def test_warms_small_text_files_inside_the_sandbox(tmp_path):
+    work = tmp_path / "work"
+    (work / "pkg").mkdir(parents=True)
+    (work / "a.py").write_text("A\n")
+    (work / "pkg" / "b.py").write_text("B\n")
+    (work / "big.py").write_text("x" * 100_000)
+    (work / "image.png").write_bytes(b"\x89PNG")
+    (tmp_path / "secret.txt").write_text("s")
+    os.symlink(tmp_path / "secret.txt", work / "link.txt")
+
+    cache = FileCache()
+    prefetcher = Prefetcher(cache)
+    assert prefetcher.after_listing(str(work)) == ["a.py"]
+    assert prefetcher.after_listing(str(work), "pkg") == [os.path.join("pkg", "b.py")]
+    assert prefetcher.after_listing(str(work), "..") == []
+    assert prefetcher.after_listing(str(work)) == []
+    prefetcher.close(wait=True)
+
+    hits = cache.hits
+    assert get_file_content(str(work), "a.py", cache=cache) == "A\n"
+    assert cache.hits == hits + 1
+    assert prefetcher.note_read(str(work), "a.py")
+    assert not prefetcher.note_read(str(work), "big.py")
+    # A second read would have been a hit without prefetching too
+    get_file_content(str(work), "a.py", cache=cache)
+    assert prefetcher.note_read(str(work), "./a.py")
+    assert prefetcher.stats() == {"prefetched": 2, "used": 1, "reads": 3, "hit_rate": 1 / 3}
+
+
+def test_only_valid_prefetched_entries_count_as_hits(tmp_path):
+    (tmp_path / "a.py").write_text("A\n")
+    cache = FileCache()
+    prefetcher = Prefetcher(cache)
+    prefetcher.after_listing(str(tmp_path))
+    prefetcher.close(wait=True)
+    (tmp_path / "a.py").write_text("changed\n")
+    assert get_file_content(str(tmp_path), "a.py", cache=cache) == "changed\n"
+    prefetcher.note_read(str(tmp_path), "a.py")
+    assert prefetcher.stats()["used"] == 0
+
+
+def test_agent_listing_prefetches_for_the_next_read(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    (tmp_path / "calculator" / "main.py").write_text("print(1)\n")
+    monkeypatch.chdir(tmp_path)
+    client = FakeModelClient([
+        function_call_response(("get_files_info", {})),
+        function_call_response(("get_file_content", {"file_path": "main.py"})),
+        text_response("done"),
+    ])
+    session = ToolSession()
+    session.prefetcher = Prefetcher(session.file_cache)
+    lines = []
+    echo = lambda *args, **kwargs: lines.append(" ".join(map(str, args)))
+    asyncio.run(main.run_agent(client, "look", verbose=True, session=session, echo=echo))
+    session.prefetcher.close()
+    assert session.prefetcher.stats()["used"] == 1
+    assert "Prefetch: 1 files warmed, 1 read (100% of 1 reads)" in lines
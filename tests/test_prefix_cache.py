@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+import main
+from fikirfix.model_client import FakeModelClient, GeminiModelClient, function_call_response, text_response
+from fikirfix.prefix_cache import FAILURE_RETRY_SECONDS, StaticPrefix
+
+
+async def _ready_config(prefix, client, model):
+    await prefix.config_for(client, model)
+    await prefix.wait_ready(client, model)
+    return await prefix.config_for(client, model)
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+def _script():
+    return [
+        function_call_response(("get_files_info", {}), prompt_tokens=1000, response_tokens=5),
+        text_response("done", prompt_tokens=1100, response_tokens=3),
+    ]
+
+
+def _sandbox(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    monkeypatch.chdir(tmp_path)
+
+
+def test_cached_prefix_is_created_once_and_reported(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    prefix = StaticPrefix(main.SYSTEM_PROMPT, [main.AVAILABLE_FUNCTIONS], min_tokens=0)
+    client = FakeModelClient(_script() + _script(), caching=True, cached_tokens=900)
+
+    async def two_sessions():
+        first = await main.run_agent(client, "list", echo=_quiet, prefix=prefix)
+        second = await main.run_agent(client, "list", echo=_quiet, prefix=prefix)
+        return first, second
+
+    first, second = asyncio.run(two_sessions())
+    # The first request goes out inline while the cache is created alongside it
+    assert (first.cached_tokens, second.cached_tokens) == (900, 1800)
+    assert list(client.caches) == ["cachedContents/fake-1"]
+    cache = client.caches["cachedContents/fake-1"]
+    assert cache["system_instruction"] == main.SYSTEM_PROMPT and cache["ttl"] == "3600s"
+    assert client.requests[0]["config"] is prefix.config
+    for request in client.requests[1:]:
+        assert request["config"].cached_content == "cachedContents/fake-1"
+        assert request["config"].system_instruction is None and request["config"].tools is None
+
+
+def test_falls_back_to_inline_prefix(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    prefix = StaticPrefix(main.SYSTEM_PROMPT, [main.AVAILABLE_FUNCTIONS], min_tokens=0)
+    client = FakeModelClient(_script())
+    result = asyncio.run(main.run_agent(client, "list", echo=_quiet, prefix=prefix))
+    assert result.final_text == "done" and result.cached_tokens == 0
+    assert all(request["config"] is prefix.config for request in client.requests)
+    assert prefix.unavailable_reason(client, main.MODEL_NAME).startswith("NotImplementedError")
+
+
+def test_small_prefix_is_not_registered(tmp_path, monkeypatch):
+    _sandbox(tmp_path, monkeypatch)
+    prefix = StaticPrefix(main.SYSTEM_PROMPT, [main.AVAILABLE_FUNCTIONS])
+    assert 0 < prefix.estimated_tokens < prefix.min_tokens
+    client = FakeModelClient(_script(), caching=True)
+    asyncio.run(main.run_agent(client, "list", echo=_quiet, prefix=prefix))
+    assert client.caches == {}
+    assert all(request["config"] is prefix.config for request in client.requests)
+    assert "below the 4096 token minimum" in prefix.unavailable_reason(client, main.MODEL_NAME)
+
+
+def test_first_request_does_not_wait_for_cache_creation():
+    prefix = StaticPrefix("system", [], min_tokens=0)
+    client = FakeModelClient([], caching=True)
+    release = None
+
+    async def create(**kwargs):
+        await release.wait()
+        return "cachedContents/slow"
+
+    client.create_cached_content = create
+
+    async def configs():
+        nonlocal release
+        release = asyncio.Event()
+        first = await asyncio.wait_for(prefix.config_for(client, "m"), 1)
+        release.set()
+        return first, await _ready_config(prefix, client, "m")
+
+    first, second = asyncio.run(configs())
+    assert first is prefix.config
+    assert second.cached_content == "cachedContents/slow"
+
+
+def test_expiring_prefix_is_recreated():
+    prefix = StaticPrefix("system", [], ttl_seconds=30, min_tokens=0)
+    client = FakeModelClient([], caching=True)
+
+    async def configs():
+        return [await _ready_config(prefix, client, "m") for _ in range(2)]
+
+    first, second = asyncio.run(configs())
+    assert (first.cached_content, second.cached_content) == ("cachedContents/fake-1", "cachedContents/fake-2")
+
+
+def test_failed_prefix_creation_is_retried_after_backoff(monkeypatch):
+    prefix = StaticPrefix("system", [], min_tokens=0)
+    client = FakeModelClient([], caching=True)
+    real_create = client.create_cached_content
+    failures = [ConnectionError("reset")]
+
+    async def create(**kwargs):
+        if failures:
+            raise failures.pop()
+        return await real_create(**kwargs)
+
+    client.create_cached_content = create
+    now = [1000.0]
+    monkeypatch.setattr("fikirfix.prefix_cache.time.time", lambda: now[0])
+
+    async def config():
+        return await _ready_config(prefix, client, "m")
+
+    assert asyncio.run(config()) is prefix.config
+    assert prefix.unavailable_reason(client, "m") == "ConnectionError: reset"
+    now[0] += FAILURE_RETRY_SECONDS - 1
+    assert asyncio.run(config()) is prefix.config
+    now[0] += 2
+    assert asyncio.run(config()).cached_content == "cachedContents/fake-1"
+    assert prefix.unavailable_reason(client, "m") is None
+
+
+def test_gemini_client_creates_cached_content():
+    calls = []
+
+    async def create(model, config):
+        calls.append((model, config))
+        return SimpleNamespace(name="cachedContents/abc")
+
+    sdk = SimpleNamespace(aio=SimpleNamespace(caches=SimpleNamespace(create=create)))
+    client = GeminiModelClient(client=sdk)
+    name = asyncio.run(client.create_cached_content(model="m", system_instruction="s", tools=[], ttl="60s"))
+    assert name == "cachedContents/abc"
+    assert calls[0][0] == "m" and calls[0][1].ttl == "60s"
@@ -0,0 +1,51 @@
+from functions.file_cache import FileCache
+from functions.get_files_info import get_file_content
+
+
+def _write_lines(tmp_path, count):
+    (tmp_path / "big.py").write_text("".join(f"line {i}\n" for i in range(1, count + 1)))
+
+
+def test_line_window(tmp_path):
+    _write_lines(tmp_path, 5000)
+    result = get_file_content(str(tmp_path), "big.py", start_line=4000, end_line=4002)
+    assert result == "line 4000\nline 4001\nline 4002\n"
+
+
+def test_line_window_is_capped_and_says_where_to_continue(tmp_path, monkeypatch):
+    monkeypatch.setattr("functions.config.MAX_CHARS", 30)
+    _write_lines(tmp_path, 100)
+    result = get_file_content(str(tmp_path), "big.py", start_line=10)
+    assert result.startswith("line 10\nline 11\nline 12\n")
+    assert result.endswith('[...Showing lines 10-12 of "big.py"; continue with start_line=13]')
+
+    last = get_file_content(str(tmp_path), "big.py", start_line=99)
+    assert last == "line 99\nline 100\n"
+    assert get_file_content(str(tmp_path), "big.py", start_line=101) == '[File "big.py" has only 100 lines]'
+
+
+def test_byte_window(tmp_path):
+    (tmp_path / "data.txt").write_text("0123456789")
+    assert get_file_content(str(tmp_path), "data.txt", offset=7) == "789"
+    assert get_file_content(str(tmp_path), "data.txt", offset=2, length=3) == (
+        '234\n[...Showing bytes 2-5 of 10 in "data.txt"; continue with offset=5]'
+    )
+
+
+def test_invalid_windows(tmp_path):
+    _write_lines(tmp_path, 3)
+    assert get_file_content(str(tmp_path), "big.py", start_line=0).startswith("Error:")
+    assert get_file_content(str(tmp_path), "big.py", start_line=3, end_line=2).startswith("Error:")
+    assert get_file_content(str(tmp_path), "big.py", offset=1, start_line=1).startswith("Error:")
+    assert get_file_content(str(tmp_path), "big.py", start_line="x").startswith("Error:")
+
+
+def test_line_index_is_cached_per_file_version(tmp_path):
+    _write_lines(tmp_path, 1000)
+    cache = FileCache()
+    get_file_content(str(tmp_path), "big.py", start_line=10, end_line=20, cache=cache)
+    assert get_file_content(str(tmp_path), "big.py", start_line=500, end_line=500, cache=cache) == "line 500\n"
+    assert cache.hits == 1
+
+    (tmp_path / "big.py").write_text("changed\nlines\n")
+    assert get_file_content(str(tmp_path), "big.py", start_line=2, end_line=2, cache=cache) == "lines\n"
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google.genai import errors, types
+
+from fikirfix.model_client import GeminiModelClient
+from fikirfix.retry import ResilientClient
+
+
+class StubModelServer:
+    """Local HTTP server answering generateContent requests from a script.
+
+    Each scripted step is (status, delay_seconds); 200 replies carry a text
+    answer, other statuses an API error body with Retry-After: 0.
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("content-length", 0)))
+                stub.hits += 1
+                status, delay = stub.steps.pop(0) if stub.steps else (200, 0)
+                time.sleep(delay)
+                if status == 200:
+                    payload = {"candidates": [{"content": {"role": "model", "parts": [{"text": f"reply {stub.hits}"}]}}]}
+                else:
+                    payload = {"error": {"code": status, "message": "stub error", "status": "UNAVAILABLE"}}
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                if status != 200:
+                    self.send_header("retry-after", "0")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def client(self, **kwargs):
+        base_url = f"http://127.0.0.1:{self.server.server_port}"
+        gemini = GeminiModelClient(api_key="test", http_options=types.HttpOptions(base_url=base_url))
+        return ResilientClient(gemini, **kwargs)
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(steps):
+        servers.append(StubModelServer(steps))
+        return servers[-1]
+
+    yield start
+    for stub in servers:
+        stub.server.shutdown()
+        stub.server.server_close()
+
+
+async def _no_sleep(delay):
+    pass
+
+
+def _ask(client):
+    return asyncio.run(client.generate_content(model="m", contents="hello", config=None))
+
+
+def test_retries_rate_limits_and_server_errors(stub_server):
+    stub = stub_server([(429, 0), (503, 0)])
+    client = stub.client(sleep=_no_sleep)
+    assert _ask(client).text == "reply 3"
+    assert (stub.hits, client.retries) == (3, 2)
+
+
+def test_client_errors_are_not_retried(stub_server):
+    stub = stub_server([(400, 0)])
+    client = stub.client(sleep=_no_sleep)
+    with pytest.raises(errors.ClientError):
+        _ask(client)
+    assert stub.hits == 1
+
+
+def test_gives_up_after_max_attempts(stub_server):
+    stub = stub_server([(500, 0)] * 3)
+    client = stub.client(sleep=_no_sleep, max_attempts=3)
+    with pytest.raises(errors.ServerError):
+        _ask(client)
+    assert stub.hits == 3
+
+
+def test_slow_attempt_hits_deadline_and_is_retried(stub_server):
+    stub = stub_server([(200, 1.0)])
+    client = stub.client(sleep=_no_sleep, deadline=0.2)
+    assert _ask(client).text == "reply 2"
+    assert client.retries == 1
+
+
+def test_hedged_request_returns_the_first_reply():
+    calls = []
+
+    class SlowThenFast:
+        async def generate_content(self, *, model, contents, config):
+            calls.append(time.perf_counter())
+            await asyncio.sleep(5 if len(calls) == 1 else 0)
+            return f"reply {len(calls)}"
+
+    client = ResilientClient(SlowThenFast(), hedge_after=0.05)
+    started = time.perf_counter()
+    assert _ask(client) == "reply 2"
+    assert time.perf_counter() - started < 1
+    assert client.hedges == 1
+
+
+def test_rate_limiter_wait_does_not_count_against_the_deadline():
+    class Limiter:
+        acquired = 0
+
+        async def acquire(self):
+            self.acquired += 1
+            await asyncio.sleep(0.3)
+
+    class Fast:
+        async def generate_content(self, *, model, contents, config):
+            await asyncio.sleep(0.05)
+            return "reply"
+
+    limiter = Limiter()
+    client = ResilientClient(Fast(), deadline=0.2, limiter=limiter)
+    assert _ask(client) == "reply"
+    assert client.retries == 0 and limiter.acquired == 1
+
+
+def test_hedge_deadline_starts_after_its_rate_limiter_token():
+    class Limiter:
+        acquired = 0
+
+        async def acquire(self):
+            self.acquired += 1
+            await asyncio.sleep(0 if self.acquired == 1 else 0.3)
+
+    class HangsThenFast:
+        calls = 0
+
+        async def generate_content(self, *, model, contents, config):
+            self.calls += 1
+            await asyncio.sleep(5 if self.calls == 1 else 0.05)
+            return f"reply {self.calls}"
+
+    limiter = Limiter()
+    client = ResilientClient(HangsThenFast(), deadline=0.2, hedge_after=0.05, limiter=limiter)
+    assert _ask(client) == "reply 2"
+    assert client.retries == 0 and client.hedges == 1 and limiter.acquired == 2
+
+
+def test_backoff_grows_exponentially_with_a_cap():
+    client = ResilientClient(None, base_delay=0.5, max_delay=3.0, rng=lambda: 1.0)
+    assert [client.backoff(n) for n in range(1, 5)] == [0.5, 1.0, 2.0, 3.0]
+    assert ResilientClient(None, rng=lambda: 0.0).backoff(1) == 0.0
@@ -0,0 +1,61 @@
+import asyncio
+
+import main
+from fikirfix.model_client import FakeModelClient, function_call_response, text_response
+from fikirfix.routing import CascadePolicy, FixedModel, make_policy
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+def test_cascade_escalates_on_errors_and_for_the_answer(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    (tmp_path / "calculator" / "main.py").write_text("print(1)\n")
+    monkeypatch.chdir(tmp_path)
+    client = FakeModelClient([
+        function_call_response(("get_file_content", {"file_path": "nope.py"}), prompt_tokens=10, response_tokens=1),
+        function_call_response(("get_file_content", {"file_path": "gone.py"}), prompt_tokens=20, response_tokens=1),
+        function_call_response(("get_files_info", {}), prompt_tokens=30, response_tokens=1),
+        text_response("draft", prompt_tokens=40, response_tokens=1),
+        text_response("final", prompt_tokens=40, response_tokens=9),
+    ])
+    policy = CascadePolicy("fast", "strong", escalate_after=2)
+    result = asyncio.run(main.run_agent(client, "look around", echo=_quiet, routing=policy))
+
+    assert [r["model"] for r in client.requests] == ["fast", "fast", "strong", "fast", "strong"]
+    assert result.final_text == "final"
+    assert result.iterations == 4
+    assert result.model_stats["fast"]["requests"] == 3
+    assert result.model_stats["fast"]["prompt_tokens"] == 70
+    assert result.model_stats["strong"]["response_tokens"] == 10
+    assert result.prompt_tokens == 140
+
+
+def test_default_routing_uses_one_model(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    monkeypatch.chdir(tmp_path)
+    client = FakeModelClient([text_response("hi")])
+    result = asyncio.run(main.run_agent(client, "hello", echo=_quiet))
+    assert [r["model"] for r in client.requests] == [main.MODEL_NAME]
+    assert list(result.model_stats) == [main.MODEL_NAME]
+
+
+def test_make_policy():
+    assert isinstance(make_policy("m"), FixedModel)
+    assert isinstance(make_policy("m", fast_model="m"), FixedModel)
+    policy = make_policy("strong", fast_model="fast", escalate_after=0)
+    assert isinstance(policy, CascadePolicy) and policy.escalate_after == 0
+    assert main.parse_args(["x", "--fast-model", "f", "--escalate-after", "3"])[2] == {
+        "fast_model": "f",
+        "escalate_after": 3,
+    }
+
+
+def test_verbose_run_reports_per_model_stats(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    monkeypatch.chdir(tmp_path)
+    lines = []
+    client = FakeModelClient([text_response("hi")])
+    asyncio.run(main.run_agent(client, "hello", verbose=True, echo=lines.append))
+    assert any(line.startswith(f"Model {main.MODEL_NAME}: 1 requests") for line in lines)
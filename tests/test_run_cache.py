@@ -0,0 +1,57 @@
+import os
+
+from functions.run_cache import CACHED_NOTE, RunCache, local_imports
+from functions.run_python import run_python_file
+from functions.session import ToolSession
+
+
+def _tree(root, files):
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def test_local_imports_follow_absolute_and_relative_imports(tmp_path):
+    _tree(tmp_path, {
+        "main.py": "import json\nfrom pkg import calc\nimport helper as h\n",
+        "helper.py": "VALUE = 1\n",
+        "pkg/__init__.py": "",
+        "pkg/calc.py": "from .render import show\nfrom . import util\n",
+        "pkg/render.py": "def show(): pass\n",
+        "pkg/util.py": "",
+        "pkg/unused.py": "",
+    })
+    found = [os.path.relpath(p, tmp_path) for p in local_imports(str(tmp_path / "main.py"), str(tmp_path))]
+    assert found == sorted(["helper.py", "pkg/__init__.py", "pkg/calc.py", "pkg/render.py", "pkg/util.py"])
+
+
+def test_unchanged_runs_are_served_from_the_cache(tmp_path):
+    _tree(tmp_path, {
+        "main.py": "import sys, time\nfrom helper import VALUE\nprint(VALUE, sys.argv[1:], time.time_ns())\n",
+        "helper.py": "VALUE = 1\n",
+        "notes.txt": "",
+    })
+    cache = RunCache()
+    first = run_python_file(str(tmp_path), "main.py", ["a"], run_cache=cache)
+    assert run_python_file(str(tmp_path), "main.py", ["a"], run_cache=cache) == f"{CACHED_NOTE}\n{first}"
+    assert not run_python_file(str(tmp_path), "main.py", ["b"], run_cache=cache).startswith(CACHED_NOTE)
+    assert not run_python_file(str(tmp_path), "main.py", ["a"], run_cache=cache, rerun=True).startswith(CACHED_NOTE)
+
+    (tmp_path / "helper.py").write_text("VALUE = 2\n")
+    changed = run_python_file(str(tmp_path), "main.py", ["a"], run_cache=cache)
+    assert changed.startswith("STDOUT:\n2 ['a']")
+    assert cache.stats() == {"hits": 1, "misses": 3, "entries": 3}
+
+    session = ToolSession(run_cache=cache)
+    session.file_written(str(tmp_path), "helper.py")
+    assert cache.stats()["entries"] == 3
+    session.file_written(str(tmp_path), "notes.txt")
+    assert cache.stats()["entries"] == 0
+
+
+def test_scripts_killed_by_a_signal_are_not_cached(tmp_path):
+    (tmp_path / "crash.py").write_text("import os, signal\nos.kill(os.getpid(), signal.SIGTERM)\n")
+    cache = RunCache()
+    run_python_file(str(tmp_path), "crash.py", run_cache=cache)
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,71 @@
+import os
+import time
+
+import pytest
+
+from functions.limits import RunLimits
+from functions.run_tests import run_tests
+
+SUITE = """\
+import time
+import unittest
+
+
+class Calc(unittest.TestCase):
+    def test_add(self):
+        self.assertEqual(1 + 1, 2)
+
+    def test_mul(self):
+        self.assertEqual(3 * 2, 7)
+
+    def test_skip(self):
+        self.skipTest("later")
+
+    def test_slow(self):
+        time.sleep({delay})
+"""
+
+
+def test_unittest_suite_is_sharded_and_summarized(tmp_path):
+    (tmp_path / "tests.py").write_text(SUITE.format(delay=0))
+    (tmp_path / "test_broken.py").write_text("import missing_module\n")
+    (tmp_path / "helpers.py").write_text("raise SystemExit('not a test file')\n")
+    result = run_tests(str(tmp_path), runner="unittest", workers=2)
+    assert result.startswith("Ran 5 tests (unittest, 2 processes)")
+    assert ": 1 failed, 1 error, 1 skipped, 2 passed\n" in result
+    assert "FAILED: tests.Calc.test_mul" in result and "AssertionError: 6 != 7" in result
+    assert "ERROR: test_broken.py" in result and "missing_module" in result
+    assert "test_add" not in result
+
+
+def test_pytest_runner_reports_node_ids(tmp_path):
+    (tmp_path / "tests.py").write_text(SUITE.format(delay=0))
+    result = run_tests(str(tmp_path), "tests.py", runner="pytest", workers=2)
+    assert ": 1 failed, 1 skipped, 2 passed\n" in result
+    assert "FAILED: tests.py::Calc::test_mul" in result
+
+
+def test_unfinished_tests_are_reported_at_the_deadline(tmp_path):
+    (tmp_path / "test_slow.py").write_text(SUITE.format(delay=30))
+    started = time.perf_counter()
+    result = run_tests(str(tmp_path), runner="unittest", workers=1, timeout=3)
+    assert time.perf_counter() - started < 10
+    assert "TIMEOUT: test_slow.Calc.test_slow" in result
+
+
+@pytest.mark.skipif(not RunLimits.supported() or os.name != "posix", reason="requires POSIX rlimits")
+def test_test_processes_run_under_limits(tmp_path):
+    (tmp_path / "test_spin.py").write_text(
+        "import unittest\n\n\nclass Spin(unittest.TestCase):\n    def test_spin(self):\n        while True:\n            pass\n"
+    )
+    result = run_tests(str(tmp_path), runner="unittest", workers=1, limits=RunLimits(cpu_seconds=1))
+    assert "ERROR: test_spin.Spin.test_spin" in result
+    assert "Stopped: CPU time limit of 1s exceeded" in result
+    assert result.endswith("Limits: wall 30s, CPU 1s, memory 1024 MiB, open files 256, file size 64 MiB")
+
+
+def test_argument_checks(tmp_path):
+    (tmp_path / "work").mkdir()
+    assert "outside the permitted working directory" in run_tests(str(tmp_path / "work"), "..")
+    assert run_tests(str(tmp_path / "work"), runner="nose").startswith("Error: Unknown test runner")
+    assert run_tests(str(tmp_path / "work")).startswith("No test files matching")
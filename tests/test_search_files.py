@@ -0,0 +1,87 @@
+import os
+
+from functions.file_index import FileIndex
+from functions.search_files import search_files
+from functions.session import ToolSession
+from functions.trigram_index import TrigramIndex, required_literals
+
+
+def _tree(root, files):
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(text.encode() if isinstance(text, str) else text)
+
+
+def test_literal_and_regex_search_report_file_and_line(tmp_path):
+    _tree(tmp_path, {
+        "pkg/render.py": "import os\n\ndef render(expr):\n    return expr\n",
+        "pkg/calc.py": "from pkg.render import render\nrender(1)\n",
+        "notes.txt": "nothing here\n",
+        "blob.bin": b"def render\0\x01",
+    })
+    result = search_files(str(tmp_path), "def render")
+    assert result.splitlines()[1:] == ["pkg/render.py:3: def render(expr):"]
+    assert result.startswith('1 match(es) for "def render" (1 of 3 indexed files scanned)')
+
+    result = search_files(str(tmp_path), r"^render\(\d\)", regex=True)
+    assert "pkg/calc.py:2: render(1)" in result
+
+    assert search_files(str(tmp_path), "RENDER(", ignore_case=True).count("\n") == 2
+    assert search_files(str(tmp_path), "missing_symbol").startswith('No matches for "missing_symbol"')
+    assert search_files(str(tmp_path), "render", directory="../").startswith("Error: Cannot search")
+    assert search_files(str(tmp_path), "(", regex=True).startswith("Error: invalid regular expression")
+
+
+def test_results_are_capped(tmp_path):
+    _tree(tmp_path, {"many.py": "".join(f"x{n} = {n}\n" for n in range(20))})
+    result = search_files(str(tmp_path), "x", max_results=5)
+    lines = result.splitlines()
+    assert len(lines) == 7
+    assert lines[-1].startswith("[...Results capped at 5 matches")
+
+
+def test_required_literals_skip_optional_parts():
+    assert required_literals(r"def\s+render_(\w+)") == ["def", "render_"]
+    assert required_literals(r"(?:foo|bar)baz") == ["baz"]
+    assert required_literals(r"(value)+ = 1") == ["value", " = 1"]
+    assert required_literals(r"ab?c") == []
+
+
+def test_index_updates_incrementally(tmp_path, monkeypatch):
+    _tree(tmp_path, {"a.py": "alpha = 1\n", "b.py": "beta = 2\n"})
+    index = TrigramIndex(FileIndex(tmp_path))
+    index.refresh()
+    assert index.candidates(["alpha"]) == ["a.py"]
+
+    reads = []
+    original = index._read_text
+    monkeypatch.setattr(index, "_read_text", lambda path: reads.append(path) or original(path))
+    (tmp_path / "b.py").write_text("beta = 2\nalphabet = 3\n")
+    index.update("b.py")
+    index.refresh()
+    assert reads == [os.path.join(str(tmp_path), "b.py")]
+    assert index.candidates(["alpha"]) == ["a.py", "b.py"]
+
+    (tmp_path / "a.py").unlink()
+    index.refresh()
+    assert index.candidates(["alpha"]) == ["b.py"]
+
+
+def test_session_index_follows_tool_writes(tmp_path, monkeypatch):
+    from google.genai import types
+
+    import main
+
+    _tree(tmp_path, {"calculator/pkg/ops.py": "def add(a, b):\n    return a + b\n"})
+    monkeypatch.chdir(tmp_path)
+    session = ToolSession()
+
+    def call(name, **args):
+        content = main.call_function(types.FunctionCall(name=name, args=args), session=session, echo=lambda *a: None)
+        return content.parts[0].function_response.response["result"]
+
+    assert "pkg/ops.py:1: def add(a, b):" in call("search_files", query="def add")
+    call("edit_file", file_path="pkg/ops.py", edits=[{"search": "def add", "replace": "def plus"}])
+    assert call("search_files", query="def add").startswith("No matches")
+    assert "pkg/ops.py:1: def plus(a, b):" in call("search_files", query="plus", directory="pkg")
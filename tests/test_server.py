@@ -0,0 +1,124 @@
+import asyncio
+import http.client
+import json
+import os
+import stat
+
+import pytest
+
+import main
+from fikirfix.model_client import FakeModelClient, function_call_response, text_response
+from fikirfix.server import AgentServer, request_session
+
+
+def _script(n):
+    responses = []
+    for _ in range(n):
+        responses += [function_call_response(("get_file_content", {"file_path": "calc.py"})), text_response("done")]
+    return FakeModelClient(responses)
+
+
+async def _with_server(tmp_path, client, talk):
+    stop = asyncio.Event()
+    listening = asyncio.Event()
+    server = AgentServer(main, client, allowed_directories=[str(tmp_path / "work")], token="t0ken")
+    ports = []
+
+    def ready(server, listeners):
+        ports.append(listeners[-1].sockets[0].getsockname()[1])
+        listening.set()
+
+    serving = asyncio.create_task(
+        server.serve(
+            socket_path=str(tmp_path / "s.sock"), port=0, stop=stop, ready=ready, token_file=str(tmp_path / "token")
+        )
+    )
+    await listening.wait()
+    try:
+        return server, await asyncio.to_thread(talk, str(tmp_path / "s.sock"), ports[0])
+    finally:
+        stop.set()
+        await serving
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.setenv("FIKIRFIX_SESSIONS_DIR", str(tmp_path / "sessions"))
+    (tmp_path / "work").mkdir()
+    (tmp_path / "work" / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    return str(tmp_path / "work")
+
+
+def test_socket_sessions_stream_output_and_share_caches(tmp_path, workdir):
+    def talk(socket_path, port):
+        lines = []
+        request = {"type": "run", "prompt": "read calc", "working_directory": workdir}
+        first = request_session(socket_path, request, on_echo=lines.append)
+        second = request_session(socket_path, request, on_echo=lines.append)
+        status = request_session(socket_path, {"type": "status"})
+        outside = request_session(socket_path, {**request, "working_directory": str(tmp_path)})
+        modes = [stat.S_IMODE(os.stat(path).st_mode) for path in (socket_path, tmp_path / "token")]
+        return lines, first, second, status, outside, modes
+
+    server, (lines, first, second, status, outside, modes) = asyncio.run(_with_server(tmp_path, _script(2), talk))
+    assert outside["event"] == "error" and "not allowed" in outside["message"]
+    assert modes == [0o600, 0o600]
+    assert not (tmp_path / "token").exists()
+    assert first["event"] == "result" and first["final_text"] == "done" and first["error"] is None
+    assert first["session_id"] != second["session_id"]
+    assert " - Calling function: get_file_content" in lines and "done" in lines
+    assert status["sessions_served"] == 2
+    assert status["working_directories"][workdir]["file_cache"]["hits"] == 1
+    assert not (tmp_path / "s.sock").exists()
+
+
+AUTH = {"Authorization": "Bearer t0ken", "Content-Type": "application/json"}
+
+
+def _http(port, method, path, body=None, headers=AUTH):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request(method, path, body=json.dumps(body) if body else None, headers=headers)
+    response = conn.getresponse()
+    reply = (response.status, json.loads(response.read()))
+    conn.close()
+    return reply
+
+
+def test_http_run_and_errors(tmp_path, workdir):
+    def talk(socket_path, port):
+        return [
+            _http(port, "POST", "/run", {"prompt": "read calc", "working_directory": workdir}),
+            _http(port, "POST", "/run", {"prompt": "x", "working_directory": workdir + "/missing"}),
+            _http(port, "GET", "/nope"),
+        ]
+
+    _, replies = asyncio.run(_with_server(tmp_path, _script(1), talk))
+    (ok, run), (bad, error), (missing, _) = replies
+    assert ok == 200 and run["final_text"] == "done" and "Final response:" in run["output"]
+    assert bad == 400 and "working directory not found" in error["error"]
+    assert missing == 404
+
+
+def test_http_refuses_unauthenticated_and_cross_site_requests(tmp_path, workdir):
+    run = {"prompt": "read calc", "working_directory": workdir}
+
+    def talk(socket_path, port):
+        return [
+            _http(port, "POST", "/run", run, headers={"Content-Type": "application/json"})[0],
+            _http(port, "GET", "/status", headers={"Authorization": "Bearer wrong"})[0],
+            _http(port, "POST", "/run", run, headers={**AUTH, "Origin": "https://evil.example"})[0],
+            _http(port, "POST", "/run", run, headers={**AUTH, "Host": "evil.example:80"})[0],
+            _http(port, "POST", "/run", run, headers={**AUTH, "Content-Type": "text/plain"})[0],
+            _http(port, "POST", "/run", {**run, "working_directory": str(tmp_path)})[0],
+            _http(port, "GET", "/status")[0],
+        ]
+
+    client = _script(0)
+    _, statuses = asyncio.run(_with_server(tmp_path, client, talk))
+    assert statuses == [401, 401, 403, 403, 415, 403, 200]
+    assert client.requests == []
+
+
+def test_client_reports_a_missing_server(tmp_path):
+    with pytest.raises(OSError):
+        request_session(str(tmp_path / "none.sock"), {"type": "status"})
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+import main
+from fikirfix.model_client import FakeModelClient, function_call_response, text_response
+from fikirfix.session_log import RESUME_PROMPT, SessionLog, load_session, resolve_session
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+def _interrupted_session(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    (tmp_path / "calculator" / "main.py").write_text("print(1)\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("FIKIRFIX_SESSIONS_DIR", str(tmp_path / "sessions"))
+    log = SessionLog.create("inspect the calculator", session_id="s1")
+    client = FakeModelClient([function_call_response(("get_files_info", {"directory": "."}))])
+    result = asyncio.run(
+        main.run_agent(client, "inspect the calculator", max_iterations=1, echo=_quiet, session_log=log)
+    )
+    assert result.error == "reached max iterations without a final response"
+    return log
+
+
+def test_resume_replays_history_without_rerunning_tools(tmp_path, monkeypatch):
+    log = _interrupted_session(tmp_path, monkeypatch)
+    assert log.messages == 3
+    assert resolve_session("s1") == log.path
+
+    header, history = load_session(log.path)
+    assert header["prompt"] == "inspect the calculator"
+    assert [m.role for m in history] == ["user", "model", "user"]
+    assert "main.py" in history[2].parts[0].function_response.response["result"]
+
+    client = FakeModelClient([text_response("main.py prints 1")])
+    result = asyncio.run(main.run_agent(client, "", echo=_quiet, history=history, session_log=SessionLog(log.path)))
+    assert result.final_text == "main.py prints 1"
+    assert result.tool_calls == []
+    assert len(client.requests[0]["contents"]) == 3
+
+    _, history = load_session(log.path)
+    assert [m.role for m in history] == ["user", "model", "user", "model"]
+
+    # A finished session can be continued; a bare resume nudges the model
+    client = FakeModelClient([text_response("ok")])
+    asyncio.run(main.run_agent(client, "", echo=_quiet, history=history))
+    assert client.requests[0]["contents"][-1].parts[0].text == RESUME_PROMPT
+
+
+def test_load_drops_torn_lines_and_unanswered_calls(tmp_path, monkeypatch):
+    log = _interrupted_session(tmp_path, monkeypatch)
+    _, history = load_session(log.path)
+    with open(log.path, "a", encoding="utf-8") as f:
+        # The process died after the model asked for a tool, mid-way through the next line
+        call = history[1].model_dump(mode="json", exclude_none=True)
+        f.write(json.dumps({"type": "message", "content": call}) + "\n")
+        f.write('{"type": "message", "content": {"ro')
+
+    _, history = load_session(log.path)
+    assert [m.role for m in history] == ["user", "model", "user"]
+
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write("\nnot json\n")
+    with pytest.raises(ValueError):
+        load_session(log.path)
+
+
+def test_resume_twice_after_torn_write(tmp_path, monkeypatch):
+    log = _interrupted_session(tmp_path, monkeypatch)
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "message", "content": {"ro')
+
+    for answer, roles in (("first", 4), ("second", 6)):
+        _, history = load_session(log.path)
+        client = FakeModelClient([text_response(answer)])
+        asyncio.run(main.run_agent(client, "", echo=_quiet, history=history, session_log=SessionLog(log.path)))
+        _, history = load_session(log.path)
+        assert len(history) == roles
+        assert history[-1].parts[0].text == answer
+    with open(log.path, encoding="utf-8") as f:
+        assert all(json.loads(line) for line in f)
+
+
+def test_prompt_is_optional_when_resuming():
+    assert main.parse_args(["--resume", "s1"]) == ("", False, {"resume": "s1"})
+    with pytest.raises(SystemExit):
+        main.parse_args(["--verbose"])
+
+
+def test_resuming_a_file_that_is_not_a_session_log_leaves_it_alone(tmp_path):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("keep me\nno newline at the end")
+    with pytest.raises(ValueError, match="not a session log"):
+        load_session(str(notes))
+    with pytest.raises(ValueError, match="not a session log"):
+        SessionLog(str(notes))
+    assert notes.read_text() == "keep me\nno newline at the end"
+
+
+def test_main_refuses_to_resume_a_file_that_is_not_a_session_log(tmp_path, monkeypatch, capsys):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("keep me")
+    monkeypatch.setattr("sys.argv", ["main.py", "--resume", str(notes)])
+    with pytest.raises(SystemExit) as exit_info:
+        main.main()
+    assert exit_info.value.code == 1
+    assert "not a session log" in capsys.readouterr().out
+    assert notes.read_text() == "keep me"
+
+
+def test_non_object_entries_are_invalid(tmp_path):
+    log = tmp_path / "s.jsonl"
+    log.write_text('{"type": "session", "id": "s"}\n[1, 2]\n{"type": "message", "content": {"role": "user"}}\n')
+    with pytest.raises(ValueError, match="s.jsonl:2: invalid session log entry"):
+        load_session(str(log))
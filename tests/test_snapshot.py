@@ -0,0 +1,95 @@
+import asyncio
+import os
+
+import pytest
+
+import main
+from fikirfix.fanout import best_attempt, run_fanout
+from fikirfix.model_client import function_call_response, text_response
+from fikirfix.snapshot import apply_changes, changed_files, create_snapshot
+from functions.edit_file import edit_file
+from functions.get_files_info import write_file
+from functions.session import ToolSession
+
+TESTS = """\
+import unittest
+from calc import add
+
+
+class Add(unittest.TestCase):
+    def test_add(self):
+        self.assertEqual(add(2, 3), 5)
+"""
+
+
+def _source(tmp_path):
+    source = tmp_path / "repo"
+    (source / "pkg").mkdir(parents=True)
+    (source / "__pycache__").mkdir()
+    (source / "calc.py").write_text("def add(a, b):\n    return a - b\n")
+    (source / "pkg" / "notes.txt").write_text("notes\n")
+    (source / "__pycache__" / "calc.pyc").write_bytes(b"\0")
+    (source / "tests.py").write_text(TESTS)
+    return source
+
+
+@pytest.mark.parametrize("mode", ["auto", "hardlink", "copy"])
+def test_snapshot_writes_do_not_reach_the_source(tmp_path, mode):
+    source = _source(tmp_path)
+    snapshot = tmp_path / "snap"
+    used = create_snapshot(str(source), str(snapshot), mode)
+    assert used in ("reflink", "hardlink", "copy") and (mode == "auto" or used == mode)
+    assert not (snapshot / "__pycache__").exists()
+
+    edit_file(str(snapshot), "calc.py", [{"search": "a - b", "replace": "a + b"}])
+    write_file(str(snapshot), "pkg/new.txt", "new\n")
+    os.unlink(snapshot / "pkg" / "notes.txt")
+    assert (source / "calc.py").read_text() == "def add(a, b):\n    return a - b\n"
+    assert changed_files(str(source), str(snapshot)) == (["calc.py", "pkg/new.txt"], ["pkg/notes.txt"])
+
+    apply_changes(str(snapshot), str(source), *changed_files(str(source), str(snapshot)))
+    assert "a + b" in (source / "calc.py").read_text()
+    assert (source / "pkg" / "new.txt").exists() and not (source / "pkg" / "notes.txt").exists()
+
+
+def test_auto_snapshot_is_not_hardlinked(tmp_path):
+    source = _source(tmp_path)
+    snapshot = tmp_path / "snap"
+    assert create_snapshot(str(source), str(snapshot)) in ("reflink", "copy")
+    assert not os.path.samefile(snapshot / "calc.py", source / "calc.py")
+
+    # A script writing into an existing file must not reach the source
+    with open(snapshot / "calc.py", "r+") as f:
+        f.write("def sub")
+    assert (source / "calc.py").read_text() == "def add(a, b):\n    return a - b\n"
+    assert changed_files(str(source), str(snapshot)) == (["calc.py"], [])
+
+
+def test_session_working_directory_confines_tools(tmp_path):
+    source = _source(tmp_path)
+    session = ToolSession(working_directory=str(source))
+    call = function_call_response(("get_file_content", {"file_path": "calc.py"})).function_calls[0]
+    result = main.call_function(call, session=session, echo=lambda *a, **k: None)
+    assert "return a - b" in result.parts[0].function_response.response["result"]
+
+
+def test_fanout_keeps_the_attempt_whose_tests_pass(tmp_path):
+    source = _source(tmp_path)
+    fixes = iter(["a + b", "a * b"])
+
+    class Client:
+        async def generate_content(self, *, model, contents, config):
+            if len(contents) == 1:
+                edit = {"search": "a - b", "replace": next(fixes)}
+                return function_call_response(("edit_file", {"file_path": "calc.py", "edits": [edit]}))
+            return text_response("done")
+
+    records = asyncio.run(
+        run_fanout("fix add", main.run_agent, Client(), str(source), str(tmp_path / "runs"), attempts=2, check="tests.py")
+    )
+    assert [r["attempt"] for r in records] == [1, 2]
+    assert all(r["changed"] == ["calc.py"] and r["error"] is None for r in records)
+    best = best_attempt(records)
+    assert best["tests"]["passed"] == 1
+    assert "a + b" in (tmp_path / "runs" / f"attempt-{best['attempt']}" / "calc.py").read_text()
+    assert "a - b" in (source / "calc.py").read_text()
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import main
+from fikirfix.model_client import FakeModelClient, function_call_response, text_response
+from fikirfix.tracing import NULL_TRACER, Tracer
+
+
+def _traced_run(tmp_path, monkeypatch):
+    (tmp_path / "calculator").mkdir()
+    (tmp_path / "calculator" / "a.py").write_text("A = 1\n")
+    (tmp_path / "calculator" / "b.py").write_text("B = 2\n")
+    monkeypatch.chdir(tmp_path)
+    client = FakeModelClient([
+        function_call_response(
+            ("get_file_content", {"file_path": "a.py"}),
+            ("get_file_content", {"file_path": "b.py"}),
+            prompt_tokens=120,
+            response_tokens=8,
+        ),
+        text_response("done", prompt_tokens=180, response_tokens=4),
+    ])
+    tracer = Tracer()
+    result = asyncio.run(main.run_agent(client, "read both", echo=lambda *a, **k: None, tracer=tracer))
+    assert result.final_text == "done"
+    return tracer
+
+
+def test_spans_form_session_iteration_hierarchy(tmp_path, monkeypatch):
+    tracer = _traced_run(tmp_path, monkeypatch)
+    by_name = {}
+    for span in tracer.spans:
+        by_name.setdefault(span.name, []).append(span)
+
+    (session,) = by_name["session"]
+    assert session.parent_id is None
+    assert session.attrs["iterations"] == 2
+    assert session.attrs["prompt_tokens"] == 300
+
+    iterations = by_name["iteration"]
+    assert [s.attrs["iteration"] for s in iterations] == [1, 2]
+    assert all(s.parent_id == session.id for s in iterations)
+
+    requests = by_name["model_request"]
+    assert {s.parent_id for s in requests} == {s.id for s in iterations}
+    assert requests[0].attrs["prompt_tokens"] == 120
+    assert requests[0].attrs["request_bytes"] > 0
+
+    tools = by_name["tool:get_file_content"]
+    assert len(tools) == 2
+    assert all(s.parent_id == iterations[0].id for s in tools)
+    assert all(s.attrs["result_bytes"] > 0 for s in tools)
+    assert all(s.end >= s.start for s in tracer.spans)
+
+
+def test_export_formats(tmp_path, monkeypatch):
+    tracer = _traced_run(tmp_path, monkeypatch)
+
+    tracer.export(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert len(events) == len(tracer.spans)
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+    assert {e["cat"] for e in events} == {"session", "iteration", "model", "tool"}
+
+    tracer.export(tmp_path / "trace.jsonl")
+    lines = (tmp_path / "trace.jsonl").read_text().splitlines()
+    spans = [json.loads(line) for line in lines]
+    assert spans[0]["name"] == "session"
+    assert [s["start_ms"] for s in spans] == sorted(s["start_ms"] for s in spans)
+
+
+def test_null_tracer_records_nothing():
+    with NULL_TRACER.span("session") as span:
+        span.attrs["ignored"] = 1
+    assert span.attrs == {}
+    assert NULL_TRACER.current() is None